@@ -5,8 +5,14 @@ Achieve GIF - Simple Tetris Animation Creator
 A streamlined tool to create GIF animations from Tetris screenshots.
 This is a simplified version of create_tetris_animation.py focusing on quick GIF creation.
 
+Frames are streamed: worker threads decode and label a bounded window of
+screenshots ahead of the writer, each frame is quantized to one global palette
+and written immediately, so memory use does not grow with the session length.
+MP4 and WebM output go through imageio's ffmpeg writer.
+
 Usage:
-    python achieve_gif.py [SESSION_DIR] [OUTPUT_PATH] [--fps FPS]
+    python achieve_gif.py [SESSION_DIR] [OUTPUT_PATH] [--fps FPS] [--format gif|mp4|webm]
+    python achieve_gif.py --batch "claude_tetris_outputs/session_*" [--processes N] [--force]
 
 If SESSION_DIR is not provided, it will scan for the latest session directory.
 If OUTPUT_PATH is not provided, it will create a GIF in the session's animations folder.
@@ -18,8 +24,16 @@ import glob
 import argparse
 import time
 from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from tools.animation import GifStreamWriter, VideoStreamWriter
+from tools.overlay import draw_label
+
+FORMATS = ["gif", "mp4", "webm"]
+DEFAULT_WORKERS = 4
+DEFAULT_WINDOW = 16
 
 def find_latest_session(base_dir="game_logs"):
     """Find the most recent session directory"""
@@ -77,108 +91,143 @@ def collect_screenshots(session_dir):
     
     return sorted(image_paths, key=get_iteration_number)
 
-def enhance_frames(image_paths):
-    """Add labels and enhance frames for the animation"""
-    frames = []
+def label_frame(path, index, size=None):
+    """Open one screenshot, resize it to `size` if needed and draw its label"""
+    # Converting to RGB already gives a new image to draw on, no extra copy needed
+    img = Image.open(path).convert("RGB")
+    if size is not None and img.size != size:
+        img = img.resize(size, Image.LANCZOS)
     
-    for i, path in enumerate(image_paths):
-        try:
-            # Open image
-            img = Image.open(path)
-            
-            # Create a copy for drawing
-            draw_img = img.copy()
-            draw = ImageDraw.Draw(draw_img)
-            
-            # Determine frame type
-            filename = os.path.basename(path)
-            if "post_execution" in filename:
-                frame_type = "After Move"
-            elif "pre_execution" in filename or "screenshot" in filename:
-                frame_type = "Before Move"
-            elif "simulated_iter" in filename:
-                frame_type = "Simulated"
-            else:
-                frame_type = "Frame"
-            
-            # Get iteration number if available
-            iter_match = re.search(r'(?:iter|screenshot|execution)_(\d+)', filename)
-            iter_num = iter_match.group(1) if iter_match else f"{i+1}"
-            
-            # Add label text
-            label = f"Iteration {iter_num}: {frame_type}"
-            
-            # Try to load a nice font, fall back to default
+    # Determine frame type
+    filename = os.path.basename(path)
+    if "post_execution" in filename:
+        frame_type = "After Move"
+    elif "pre_execution" in filename or "screenshot" in filename:
+        frame_type = "Before Move"
+    elif "simulated_iter" in filename:
+        frame_type = "Simulated"
+    else:
+        frame_type = "Frame"
+    
+    # Get iteration number if available
+    iter_match = re.search(r'(?:iter|screenshot|execution)_(\d+)', filename)
+    iter_num = iter_match.group(1) if iter_match else f"{index+1}"
+    
+    # Add label text
+    return draw_label(img, f"Iteration {iter_num}: {frame_type}")
+
+def enhance_frames(image_paths, size=None, workers=DEFAULT_WORKERS, window=DEFAULT_WINDOW):
+    """
+    Yield labelled frames in order. Frames are decoded and labelled by `workers`
+    threads at most `window` frames ahead of the consumer, so memory stays bounded
+    no matter how long the session is.
+    """
+    if not image_paths:
+        return
+    if size is None:
+        with Image.open(image_paths[0]) as first:
+            size = first.size
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        paths = iter(enumerate(image_paths))
+        while True:
+            while len(pending) < window:
+                try:
+                    i, path = next(paths)
+                except StopIteration:
+                    break
+                pending.append((path, pool.submit(label_frame, path, i, size)))
+            if not pending:
+                return
+            path, future = pending.popleft()
             try:
-                font = ImageFont.truetype("arial.ttf", 16)
-            except:
-                font = ImageFont.load_default()
-            
-            # Add semi-transparent background for text
-            text_width = len(label) * 8
-            text_height = 20
-            draw.rectangle([(10, 10), (10 + text_width, 10 + text_height)], fill=(0, 0, 0, 128))
-            
-            # Draw text
-            draw.text((15, 12), label, fill=(255, 255, 255), font=font)
-            
-            # Add to frames list
-            frames.append(draw_img)
-            
+                yield future.result()
+            except Exception as e:
+                print(f"Error processing {path}: {e}")
+
+def build_palette(image_paths, samples=16, colors=256):
+    """
+    One global palette for the whole animation, quantized from a few labelled
+    frames spread over the session (scaled down; game screens use few colors).
+    """
+    step = max(1, len(image_paths) // samples)
+    thumbnails = []
+    for i in range(0, len(image_paths), step):
+        try:
+            frame = label_frame(image_paths[i], i)
         except Exception as e:
-            print(f"Error processing {path}: {e}")
-            try:
-                # Try to add unmodified image
-                frames.append(Image.open(path))
-            except:
-                pass
-    
-    return frames
+            print(f"Error sampling {image_paths[i]} for the palette: {e}")
+            continue
+        frame.thumbnail((240, 240), Image.NEAREST)
+        thumbnails.append(frame)
+    if not thumbnails:
+        return None
+    sheet = Image.new("RGB", (max(t.width for t in thumbnails), sum(t.height for t in thumbnails)))
+    y = 0
+    for thumbnail in thumbnails:
+        sheet.paste(thumbnail, (0, y))
+        y += thumbnail.height
+    return sheet.quantize(colors=colors, method=Image.Quantize.MEDIANCUT)
 
-def create_gif(frames, output_path, fps=2):
-    """Create a GIF animation from the frames"""
-    if not frames:
-        print("No frames to create GIF")
-        return False
+def output_format_for(output_path, output_format=None):
+    if output_format:
+        return output_format
+    extension = os.path.splitext(output_path)[1].lower().lstrip(".")
+    return extension if extension in FORMATS else "gif"
+
+def create_gif(frames, output_path, fps=2, palette=None, output_format=None):
+    """
+    Stream frames (any iterable of equally sized images) into a GIF, MP4 or WebM
+    file. Frames are written as they arrive and never all kept in memory.
+    """
+    output_format = output_format_for(output_path, output_format)
     
     # Create output directory if it doesn't exist
     output_dir = os.path.dirname(output_path)
     if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
-    # Calculate duration between frames in milliseconds
-    duration = int(1000 / fps)
-    
-    # Ensure all frames are the same size
-    base_size = frames[0].size
-    uniform_frames = []
-    
-    for frame in frames:
-        if frame.size != base_size:
-            # Resize to match first frame
-            frame = frame.resize(base_size, Image.LANCZOS)
-        uniform_frames.append(frame)
-    
-    # Save as GIF
-    print(f"Creating GIF with {len(uniform_frames)} frames at {fps} fps...")
-    
+    print(f"Creating {output_format.upper()} at {fps} fps...")
+    start_time = time.time()
+    count = 0
+    writer = None
+    # Written under a temporary name and renamed when complete, so an interrupted
+    # run never leaves a truncated file that looks up to date
+    base, extension = os.path.splitext(output_path)
+    partial_path = f"{base}.partial{extension}"
     try:
-        uniform_frames[0].save(
-            output_path,
-            save_all=True,
-            append_images=uniform_frames[1:],
-            optimize=True,
-            duration=duration,
-            loop=0  # Loop forever
-        )
-        print(f"GIF successfully saved to: {output_path}")
-        return True
+        if output_format == "gif":
+            writer = GifStreamWriter(partial_path, fps, palette)
+        else:
+            writer = VideoStreamWriter(partial_path, fps, output_format)
+        for frame in frames:
+            writer.write(frame)
+            count += 1
+            if count % 100 == 0:
+                print(f"  {count} frames written ({time.time() - start_time:.1f}s)")
+        writer.close()
+        writer = None
     except Exception as e:
-        print(f"Error creating GIF: {e}")
+        print(f"Error creating {output_format.upper()}: {e}")
+        return False
+    finally:
+        if writer is not None:
+            writer.close()
+        if (writer is not None or not count) and os.path.exists(partial_path):
+            os.remove(partial_path)
+    
+    if not count:
+        print(f"No frames to create {output_format.upper()}")
         return False
+    os.replace(partial_path, output_path)
+    print(f"{output_format.upper()} with {count} frames successfully saved to: {output_path} "
+          f"({time.time() - start_time:.1f}s)")
+    return True
 
-def achieve_gif(session_dir=None, output_path=None, fps=2):
-    """Main function to create a GIF animation from a session directory"""
+def achieve_gif(session_dir=None, output_path=None, fps=2, output_format=None,
+                workers=DEFAULT_WORKERS, window=DEFAULT_WINDOW):
+    """Main function to create a GIF (or MP4/WebM) animation from a session directory"""
     # Find latest session if none provided
     if not session_dir:
         session_dir = find_latest_session()
@@ -195,7 +244,8 @@ def achieve_gif(session_dir=None, output_path=None, fps=2):
         os.makedirs(animations_dir, exist_ok=True)
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_path = os.path.join(animations_dir, f"tetris_animation_{timestamp}.gif")
+        output_path = os.path.join(animations_dir, f"tetris_animation_{timestamp}.{output_format or 'gif'}")
+    output_format = output_format_for(output_path, output_format)
     
     # Collect screenshots
     image_paths = collect_screenshots(session_dir)
@@ -206,21 +256,94 @@ def achieve_gif(session_dir=None, output_path=None, fps=2):
     
     print(f"Found {len(image_paths)} screenshots")
     
-    # Enhance frames with labels
-    frames = enhance_frames(image_paths)
+    # Frames are labelled in worker threads and written as they are ready
+    palette = build_palette(image_paths) if output_format == "gif" else None
+    frames = enhance_frames(image_paths, workers=workers, window=window)
+    return create_gif(frames, output_path, fps, palette=palette, output_format=output_format)
+
+def is_up_to_date(output_path, image_paths):
+    """True if output_path exists and is newer than every screenshot it is made from"""
+    if not os.path.exists(output_path):
+        return False
+    newest_input = max(os.path.getmtime(path) for path in image_paths)
+    return os.path.getmtime(output_path) >= newest_input
+
+def render_session(session_dir, fps=2, output_format="gif", workers=DEFAULT_WORKERS,
+                   window=DEFAULT_WINDOW, force=False):
+    """
+    Render one session of a batch into <session_dir>/animations/tetris_animation.<format>.
+    Runs in a worker process; returns (session_dir, status, seconds).
+    """
+    start_time = time.time()
+    output_path = os.path.join(session_dir, "animations", f"tetris_animation.{output_format}")
+    image_paths = collect_screenshots(session_dir)
+    if not image_paths:
+        return session_dir, "no screenshots", 0.0
+    if not force and is_up_to_date(output_path, image_paths):
+        return session_dir, "up to date", 0.0
+    try:
+        ok = achieve_gif(session_dir, output_path, fps, output_format, workers, window)
+    except Exception as e:
+        print(f"Error rendering {session_dir}: {e}")
+        ok = False
+    return session_dir, "rendered" if ok else "failed", time.time() - start_time
+
+def render_batch(patterns, fps=2, output_format="gif", processes=None, workers=DEFAULT_WORKERS,
+                 window=DEFAULT_WINDOW, force=False):
+    """
+    Render every session directory matching the glob `patterns` across a process
+    pool (frames within a session are still labelled by `workers` threads).
+    Sessions whose animation is newer than their screenshots are skipped, so an
+    interrupted batch can simply be run again.
+    """
+    session_dirs = sorted({path for pattern in patterns for path in glob.glob(pattern) if os.path.isdir(path)})
+    if not session_dirs:
+        print(f"No session directories match {' '.join(patterns)}")
+        return False
     
-    # Create GIF
-    return create_gif(frames, output_path, fps)
+    processes = processes or os.cpu_count() or 1
+    print(f"Rendering {len(session_dirs)} sessions with {processes} processes...")
+    start_time = time.time()
+    results = {}
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(render_session, session_dir, fps, output_format, workers, window, force)
+                   for session_dir in session_dirs]
+        for future in as_completed(futures):
+            session_dir, status, seconds = future.result()
+            results[status] = results.get(status, 0) + 1
+            print(f"[{sum(results.values())}/{len(session_dirs)}] {session_dir}: {status}"
+                  + (f" in {seconds:.1f}s" if status == "rendered" else ""))
+    
+    print(f"Batch finished in {time.time() - start_time:.1f}s: "
+          + ", ".join(f"{count} {status}" for status, count in results.items()))
+    return "failed" not in results
 
 def main():
     parser = argparse.ArgumentParser(description="Create a GIF animation from Tetris screenshots")
     parser.add_argument("session_dir", nargs='?', help="Path to the session directory (optional)")
     parser.add_argument("output_path", nargs='?', help="Path to save the GIF (optional)")
     parser.add_argument("--fps", type=int, default=2, help="Frames per second (default: 2)")
+    parser.add_argument("--format", choices=FORMATS, default=None,
+                        help="Output format (default: from the output path's extension, else gif)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Threads decoding and labelling frames (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW,
+                        help=f"Frames decoded ahead of the writer, bounds memory use (default: {DEFAULT_WINDOW})")
+    parser.add_argument("--batch", nargs="+", metavar="PATTERN",
+                        help="Render every session directory matching these globs, e.g. 'claude_tetris_outputs/session_*'")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Sessions rendered in parallel in batch mode (default: CPU count)")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-render sessions whose animation is already up to date (batch mode)")
     
     args = parser.parse_args()
     
-    achieve_gif(args.session_dir, args.output_path, args.fps)
+    if args.batch:
+        ok = render_batch(args.batch, args.fps, args.format or "gif", args.processes,
+                          args.workers, args.window, args.force)
+        sys.exit(0 if ok else 1)
+    
+    achieve_gif(args.session_dir, args.output_path, args.fps, args.format, args.workers, args.window)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -5,6 +5,7 @@ import argparse
 import numpy as np
 from tools.utils import encode_image, log_output
 from tools.serving.api_providers import anthropic_completion, openai_completion, gemini_completion
+from tools.pipeline import Pipeline, Stage
 import subprocess
 import multiprocessing
 import re
@@ -97,20 +98,16 @@ def capture_screenshot():
     return screenshot_path
 from collections import deque
 
-def get_best_move(system_prompt, api_provider, model_name, move_history):
+def build_move_prompt(move_history):
     """
-    Takes a screenshot, sends it to the LLM, and extracts the best move and reasoning,
-    considering the previous four moves and thoughts.
+    Builds the user prompt for one move from the previous moves and thoughts.
     """
-    screenshot_path = capture_screenshot()
-    base64_image = encode_image(screenshot_path)
-
     # Format the move history
     history_prompt = "\n".join(
         [f"{i+1}. move: {entry['move']}, thought: {entry['thought']}" for i, entry in enumerate(move_history)]
     ) if move_history else "No previous moves."
 
-    move_prompt = (
+    return (
     f"Your last four moves and thoughts:\n{history_prompt}\n\n"
     "Analyze the 2048 game state from the image and determine the best move: 'up', 'right', 'left', or 'down'.\n"
     "Avoid repeating mistakes and prioritize flexible, strategic moves that maximize tile merging and board control.\n\n"
@@ -134,14 +131,21 @@ def get_best_move(system_prompt, api_provider, model_name, move_history):
     "Provide your response in the strict format: move: \"<direction>\", thought: \"<brief reasoning>\"."
     )
 
+def request_move(system_prompt, api_provider, model_name, base64_image, move_history):
+    """
+    Sends an encoded screenshot to the LLM and extracts the move and reasoning.
+    """
+    move_prompt = build_move_prompt(move_history)
+
     start_time = time.time()
 
+    # The completion helpers return (extracted code, full response); the move is in the full text
     if api_provider == "anthropic":
-        response = anthropic_completion(system_prompt, model_name, base64_image, move_prompt)
+        _, response = anthropic_completion(system_prompt, model_name, base64_image, move_prompt)
     elif api_provider == "openai":
-        response = openai_completion(system_prompt, model_name, base64_image, move_prompt)
+        _, response = openai_completion(system_prompt, model_name, base64_image, move_prompt)
     elif api_provider == "gemini":
-        response = gemini_completion(system_prompt, model_name, base64_image, move_prompt)
+        _, response = gemini_completion(system_prompt, model_name, base64_image, move_prompt)
     else:
         raise NotImplementedError(f"API provider '{api_provider}' is not supported.")
 
@@ -160,6 +164,60 @@ def get_best_move(system_prompt, api_provider, model_name, move_history):
 
     return move, thought
 
+def get_best_move(system_prompt, api_provider, model_name, move_history):
+    """
+    Takes a screenshot, sends it to the LLM, and extracts the best move and reasoning,
+    considering the previous four moves and thoughts.
+    """
+    screenshot_path = capture_screenshot()
+    base64_image = encode_image(screenshot_path)
+    return request_move(system_prompt, api_provider, model_name, base64_image, move_history)
+
+def execute_move(move, thought, move_history):
+    """
+    Presses the chosen key and records the move in the history.
+    """
+    move_history.append({"move": move, "thought": thought})  # Add move to history
+
+    if move in ["up", "right", "left", "down"]:
+        pyautogui.press(move)
+        print(f"Executed move: {move}")
+        print(f"Thought: {thought}")  # Print the reasoning for the move
+    else:
+        print(f"Invalid move received: {move}, Thought: {thought}")
+
+def run_pipelined(args, move_history):
+    """
+    Runs capture/encode, the LLM request and move execution as separate pipeline
+    stages, so the next screenshot is captured and encoded while the model is
+    still thinking about the previous one.
+
+    Note that a frame captured while a move is still pending can be one move
+    behind by the time it is answered; use --request_workers 1 and a short
+    --loop_interval to keep that window small.
+    """
+    def capture():
+        time.sleep(args.loop_interval)  # Pace capturing like the sequential loop
+        screenshot_path = capture_screenshot()
+        return {"capture_time": time.time(), "image": encode_image(screenshot_path)}
+
+    def request(frame):
+        frame["move"], frame["thought"] = request_move(system_prompt, args.api_provider, args.model_name,
+                                                       frame["image"], list(move_history))
+        return frame
+
+    def execute(frame):
+        execute_move(frame["move"], frame["thought"], move_history)
+        print(f"[INFO] Frame age at execution: {time.time() - frame['capture_time']:.2f}s")
+        return frame
+
+    pipeline = Pipeline([
+        Stage("capture", capture),
+        Stage("request", request, workers=args.request_workers),
+        Stage("execute", execute),
+    ], name="2048", report_interval=args.report_interval)
+    pipeline.run()
+
 def main():
     """
     Runs a single AI worker for 2048 in a loop without concurrency,
@@ -172,6 +230,12 @@ def main():
                         help="Model name.")
     parser.add_argument("--loop_interval", type=float, default=0.5,
                         help="Time in seconds between moves.")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Overlap screenshot capture/encoding with the LLM request using a staged pipeline.")
+    parser.add_argument("--request_workers", type=int, default=1,
+                        help="Concurrent LLM requests in pipeline mode.")
+    parser.add_argument("--report_interval", type=float, default=10.0,
+                        help="Seconds between pipeline stage status lines (0 disables).")
 
     args = parser.parse_args()
 
@@ -180,17 +244,14 @@ def main():
 
     move_history = deque(maxlen=4)  # Store the last 4 moves
 
+    if args.pipeline:
+        run_pipelined(args, move_history)
+        return
+
     try:
         while True:
             move, thought = get_best_move(system_prompt, args.api_provider, args.model_name, list(move_history))
-            move_history.append({"move": move, "thought": thought})  # Add move to history
-
-            if move in ["up", "right", "left", "down"]:
-                pyautogui.press(move)
-                print(f"Executed move: {move}")
-                print(f"Thought: {thought}")  # Print the reasoning for the move
-            else:
-                print(f"Invalid move received: {move}, Thought: {thought}")
+            execute_move(move, thought, move_history)
 
             time.sleep(args.loop_interval)  # Delay before next move
 
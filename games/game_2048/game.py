@@ -1,4 +1,5 @@
 import json
+import random
 import sys
 import time
 from copy import deepcopy
@@ -19,11 +20,63 @@ constants_path = os.path.join(BASE_DIR, "constants.json")
 c = json.load(open(constants_path, "r"))
 screen = pygame.display.set_mode(
     (c["size"], c["size"]))
-my_font = pygame.font.SysFont(c["font"], c["font_size"], bold=True)
 WHITE = (255, 255, 255)
 
+# Font objects and pre-rendered tile surfaces, created once and reused
+_fonts = {}
+_tiles = {}
+# Board, theme and size last drawn by display(); None forces a full redraw
+_drawn = {"board": None, "theme": None, "size": None}
 
-def winCheck(board, status, theme, text_col, size):
+
+def getFont(size):
+    """
+    Return a cached bold font of the configured family.
+
+    Parameters:
+        size (int): font size
+    Returns:
+        (pygame.font.Font): font object
+    """
+    if size not in _fonts:
+        _fonts[size] = pygame.font.SysFont(c["font"], size, bold=True)
+    return _fonts[size]
+
+
+def getTile(value, theme, box):
+    """
+    Return a cached surface for one grid cell: background, padded tile and number.
+
+    Parameters:
+        value (int): tile value (0 for empty)
+        theme (str): game interface theme
+        box (int): size of one grid cell in pixels
+    Returns:
+        (pygame.Surface): rendered cell
+    """
+    key = (value, theme, box)
+    if key not in _tiles:
+        padding = box // 10  # Set padding relative to box size
+        tile = pygame.Surface((box, box))
+        tile.fill(tuple(c["colour"][theme]["background"]))
+        colour = tuple(c["colour"][theme].get(str(value), c["colour"][theme]["2048"]))
+        pygame.draw.rect(tile, colour, (padding, padding, box - 2 * padding, box - 2 * padding), 0)
+
+        if value != 0:
+            if value in (2, 4):
+                text_colour = tuple(c["colour"][theme]["dark"])
+            else:
+                text_colour = tuple(c["colour"][theme]["light"])
+
+            # Font size proportional to the tile but not too small
+            text_surface = getFont(max(box // 3, 24)).render(f"{value}", True, text_colour)
+            tile.blit(text_surface, ((box - text_surface.get_width()) // 2,
+                                     (box - text_surface.get_height()) // 2))
+        _tiles[key] = tile
+    return _tiles[key]
+
+
+def winCheck(board, status, theme, text_col, size, rng=random):
     """
     Check game status and display win/lose result.
 
@@ -33,6 +86,7 @@ def winCheck(board, status, theme, text_col, size):
         theme (str): game interface theme
         text_col (tuple): text colour
         size (tuple): (width, height) of the game window
+        rng (random.Random): random stream for new tiles
     Returns:
         board (list): updated game board
         status (str): game status
@@ -47,8 +101,8 @@ def winCheck(board, status, theme, text_col, size):
         title_font_size = max(size[0] // 10, 36)  # Scale with screen width
         subtitle_font_size = max(size[0] // 20, 24)  # Slightly smaller for prompts
 
-        title_font = pygame.font.SysFont(c["font"], title_font_size, bold=True)
-        subtitle_font = pygame.font.SysFont(c["font"], subtitle_font_size, bold=True)
+        title_font = getFont(title_font_size)
+        subtitle_font = getFont(subtitle_font_size)
 
         # Display win/lose message
         msg = "YOU WIN!" if status == "WIN" else "GAME OVER!"
@@ -78,14 +132,14 @@ def winCheck(board, status, theme, text_col, size):
 
                 if event.type == pygame.KEYDOWN and event.key == pygame.K_y:
                     # 'Y' is pressed to start a new game
-                    board = newGame(theme, text_col, size)
+                    board = newGame(theme, text_col, size, rng)
                     return board, "PLAY"
 
     return board, status
 
 
 
-def newGame(theme, text_col, size):
+def newGame(theme, text_col, size, rng=random):
     """
     Start a new game by resetting the board.
 
@@ -93,16 +147,17 @@ def newGame(theme, text_col, size):
         theme (str): game interface theme
         text_col (tuple): text colour
         size (tuple): (width, height) of the game window
+        rng (random.Random): random stream for new tiles
     Returns:
         board (list): new game board
     """
     # Clear the board to start a new game
     board = [[0] * 4 for _ in range(4)]
-    display(board, theme, size)
+    display(board, theme, size, full=True)
 
     # Dynamically adjust font size based on window size
     font_size = max(size[0] // 15, 24)  # Scales with screen width, min size 24
-    title_font = pygame.font.SysFont(c["font"], font_size, bold=True)
+    title_font = getFont(font_size)
 
     # Render "NEW GAME!" text
     new_game_text = title_font.render("NEW GAME!", True, text_col)
@@ -119,79 +174,77 @@ def newGame(theme, text_col, size):
     time.sleep(1)
 
     # Fill two random tiles at the beginning
-    board = fillTwoOrFour(board, iter=2)
-    display(board, theme, size)
+    # (full redraw to clear the "NEW GAME!" text from tiles that did not change)
+    board = fillTwoOrFour(board, iter=2, rng=rng)
+    display(board, theme, size, full=True)
 
     return board
 
 
-def restart(board, theme, text_col, size):
+def restart(board, theme, text_col, size, rng=random):
     """
     Restart the game immediately when 'N' is pressed.
     """
     print("Restarting game...")  # Debugging output
-    return newGame(theme, text_col, size)
+    return newGame(theme, text_col, size, rng)
 
-def display(board, theme, size):
+def display(board, theme, size, full=False):
     """
     Display the board 'matrix' on the game window.
 
+    Only the cells that changed since the previous call are redrawn and
+    pushed to the screen with pygame.display.update(rects).
+
     Parameters:
         board (list): game board
         theme (str): game interface theme
         size (tuple): (width, height) of the game window
+        full (bool): redraw the whole window, e.g. after an overlay was drawn
     """
-    screen.fill(tuple(c["colour"][theme]["background"]))
-    
     grid_size = 4  # 2048 is a 4x4 grid
     box = size[0] // grid_size  # Adjust tile size dynamically based on window size
-    padding = box // 10  # Set padding relative to box size
 
-    # Update font size dynamically based on tile size
-    font_size = max(box // 3, 24)  # Ensure font is proportional but not too small
-    my_font = pygame.font.SysFont(c["font"], font_size, bold=True)
+    previous = _drawn["board"]
+    if full or previous is None or _drawn["theme"] != theme or _drawn["size"] != size:
+        screen.fill(tuple(c["colour"][theme]["background"]))
+        previous = None
 
+    rects = []
     for i in range(grid_size):
         for j in range(grid_size):
-            colour = tuple(c["colour"][theme][str(board[i][j])])
-            pygame.draw.rect(screen, colour, (j * box + padding,
-                                              i * box + padding,
-                                              box - 2 * padding,
-                                              box - 2 * padding), 0)
-
-            if board[i][j] != 0:
-                if board[i][j] in (2, 4):
-                    text_colour = tuple(c["colour"][theme]["dark"])
-                else:
-                    text_colour = tuple(c["colour"][theme]["light"])
-
-                # Render number text centered within tile
-                text_surface = my_font.render(f"{board[i][j]}", True, text_colour)
-                
-                # Calculate center position dynamically
-                text_x = j * box + (box - text_surface.get_width()) // 2
-                text_y = i * box + (box - text_surface.get_height()) // 2
-                
-                screen.blit(text_surface, (text_x, text_y))
-    
-    pygame.display.update()
+            if previous is None or previous[i][j] != board[i][j]:
+                rects.append(screen.blit(getTile(board[i][j], theme, box), (j * box, i * box)))
+
+    if previous is None:
+        pygame.display.update()
+    elif rects:
+        pygame.display.update(rects)
 
+    _drawn["board"] = [row[:] for row in board]
+    _drawn["theme"] = theme
+    _drawn["size"] = size
 
-def playGame(theme, difficulty, size):
+
+def playGame(theme, difficulty, size, rng=None):
     """
     Main game loop function.
 
     Parameters:
         theme (str): game interface theme
         difficulty (int): game difficulty, i.e., max. tile to get
+        rng (random.Random): random stream for new tiles, default = a new unseeded stream
     """
+    # Every tile comes from the game's own random stream
+    if rng is None:
+        rng = random.Random()
+
     # Initialise game status
     status = "PLAY"
 
     # Set text colour according to theme
     text_col = (0, 0, 0) if theme == "light" else (255, 255, 255)
 
-    board = newGame(theme, text_col, size)
+    board = newGame(theme, text_col, size, rng)
 
     # Define movement key mappings
     movement_keys = {
@@ -216,7 +269,7 @@ def playGame(theme, difficulty, size):
 
                 if event.key == pygame.K_LCTRL or event.key == pygame.K_RCTRL:
                     print("Restarting game...")
-                    board = restart(board, theme, text_col, size)
+                    board = restart(board, theme, text_col, size, rng)
                     continue
 
                 # Handle Movement Keys
@@ -229,11 +282,11 @@ def playGame(theme, difficulty, size):
 
                     # Only update board if there was a change
                     if new_board != board:
-                        board = fillTwoOrFour(new_board)
+                        board = fillTwoOrFour(new_board, rng=rng)
                         display(board, theme, size)
 
                         # Update game status
                         status = checkGameStatus(board, difficulty)
 
                         # Check win/lose
-                        board, status = winCheck(board, status, theme, text_col, size)
+                        board, status = winCheck(board, status, theme, text_col, size, rng)
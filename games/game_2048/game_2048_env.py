@@ -0,0 +1,258 @@
+"""
+Gymnasium environment for 2048
+
+Wraps the pure board functions in logic.py so the game can be stepped
+headlessly, without a pygame window, screenshots or key presses.
+Observations are either symbolic (log2 tile exponents) or a rendered RGB
+frame using the tile colours from constants.json.
+
+Usage:
+    from games.game_2048.game_2048_env import Game2048Env, make_vector_env
+
+    env = Game2048Env(obs_type="symbolic")
+    obs, info = env.reset()
+    obs, reward, terminated, truncated, info = env.step(env.action_space.sample())
+
+    envs = make_vector_env(8, asynchronous=True)
+
+Benchmark (random policy):
+    python -m games.game_2048.game_2048_env --num-envs 8 --steps 20000 --async
+"""
+
+import argparse
+import functools
+import json
+import math
+import os
+import random
+import time
+
+import numpy as np
+import gymnasium as gym
+from gymnasium import spaces
+
+from games.game_2048.logic import move, checkGameStatus, fillTwoOrFour, snapshot, restore
+
+ENV_ID = "GamingAgent/2048-v0"
+
+# Discrete action index -> (direction name, logic.move key)
+ACTIONS = [("up", "w"), ("down", "s"), ("left", "a"), ("right", "d")]
+
+BOARD_SIZE = 4
+MAX_EXPONENT = 17  # 2**17 is the largest tile reachable on a 4x4 board
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+with open(os.path.join(BASE_DIR, "constants.json"), "r") as f:
+    CONSTANTS = json.load(f)
+
+
+def tile_score(value):
+    """
+    Total merge score accumulated while building a single tile from 2s.
+
+    A merge of two tiles v into 2v scores 2v, and tile_score(2v) - 2 * tile_score(v)
+    equals 2v, so the change in the summed tile_score over the board is exactly the
+    merge reward of a move.
+
+    Parameters:
+        value (int): tile value
+    Returns:
+        (int): accumulated score for the tile
+    """
+    if value < 4:
+        return 0
+    return value * (int(math.log2(value)) - 1)
+
+
+def board_score(board):
+    """
+    Sum of tile_score over every tile on the board.
+
+    Parameters:
+        board (list): game board
+    Returns:
+        (int): accumulated merge score of the board
+    """
+    return sum(tile_score(cell) for row in board for cell in row)
+
+
+class Game2048Env(gym.Env):
+    """
+    Headless 2048 environment.
+
+    Args:
+        obs_type (str): "symbolic" for a 4x4 array of log2 tile exponents
+            (0=empty), or "rgb" for a rendered frame.
+        render_mode (str, optional): "rgb_array" to enable render().
+        tile_size (int): Pixel size of one tile in rendered frames.
+        theme (str): Colour theme from constants.json ("light" or "dark").
+        max_tile (int): Tile value that wins the game and ends the episode.
+        invalid_move_penalty (float): Reward for a move that changes nothing.
+        max_steps (int): Truncate the episode after this many steps (0=never).
+    """
+
+    metadata = {"render_modes": ["rgb_array"], "render_fps": 30}
+
+    def __init__(self, obs_type="symbolic", render_mode=None, tile_size=64, theme="light",
+                 max_tile=2048, invalid_move_penalty=0.0, max_steps=0):
+        if obs_type not in ("symbolic", "rgb"):
+            raise ValueError(f"Unsupported obs_type: {obs_type}")
+        if render_mode is not None and render_mode not in self.metadata["render_modes"]:
+            raise ValueError(f"Unsupported render_mode: {render_mode}")
+
+        self.obs_type = obs_type
+        self.render_mode = render_mode
+        self.tile_size = tile_size
+        self.max_tile = max_tile
+        self.invalid_move_penalty = invalid_move_penalty
+        self.max_steps = max_steps
+
+        self.action_space = spaces.Discrete(len(ACTIONS))
+        if obs_type == "symbolic":
+            self.observation_space = spaces.Box(0, MAX_EXPONENT, (BOARD_SIZE, BOARD_SIZE), dtype=np.int8)
+        else:
+            frame_size = BOARD_SIZE * tile_size
+            self.observation_space = spaces.Box(0, 255, (frame_size, frame_size, 3), dtype=np.uint8)
+
+        # Colour lookup table indexed by tile exponent
+        colours = CONSTANTS["colour"][theme]
+        self._background = np.array(colours["background"], dtype=np.uint8)
+        self._palette = np.zeros((MAX_EXPONENT + 1, 3), dtype=np.uint8)
+        for exponent in range(MAX_EXPONENT + 1):
+            key = "0" if exponent == 0 else str(2 ** exponent)
+            # Tiles above 2048 reuse the 2048 colour
+            self._palette[exponent] = colours.get(key, colours["2048"])
+
+        # Tile padding mask, same proportions as game.display
+        padding = tile_size // 10
+        tile_mask = np.zeros((tile_size, tile_size), dtype=bool)
+        tile_mask[padding:tile_size - padding, padding:tile_size - padding] = True
+        self._tile_mask = np.tile(tile_mask, (BOARD_SIZE, BOARD_SIZE))
+
+        self.board = None
+        self.rng = None
+        self.score = 0
+        self.steps = 0
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        # Tile spawns come from a dedicated stream seeded from np_random
+        self.rng = random.Random(int(self.np_random.integers(0, 2 ** 63 - 1)))
+        self.board = fillTwoOrFour([[0] * BOARD_SIZE for _ in range(BOARD_SIZE)], iter=2, rng=self.rng)
+        self.score = 0
+        self.steps = 0
+        return self._get_obs(), self._get_info(valid_move=True)
+
+    def get_state(self):
+        """
+        Snapshot the board, score and tile RNG position.
+
+        Returns:
+            tuple: Opaque state accepted by set_state().
+        """
+        return snapshot(self.board, self.rng), self.score, self.steps
+
+    def set_state(self, state):
+        """
+        Restore a state returned by get_state(), e.g. to branch a rollout.
+
+        Args:
+            state (tuple): State from get_state().
+        """
+        snap, self.score, self.steps = state
+        self.board = restore(snap, self.rng)
+
+    def step(self, action):
+        direction, key = ACTIONS[int(action)]
+        new_board = move(key, [row[:] for row in self.board])
+        self.steps += 1
+
+        valid_move = new_board != self.board
+        if valid_move:
+            reward = float(board_score(new_board) - board_score(self.board))
+            self.score += int(reward)
+            self.board = fillTwoOrFour(new_board, rng=self.rng)
+        else:
+            reward = float(self.invalid_move_penalty)
+
+        status = checkGameStatus(self.board, self.max_tile)
+        terminated = status != "PLAY"
+        truncated = bool(self.max_steps) and self.steps >= self.max_steps and not terminated
+        return self._get_obs(), reward, terminated, truncated, self._get_info(valid_move, status)
+
+    def render(self):
+        if self.render_mode == "rgb_array":
+            return self._render_frame()
+        return None
+
+    def _exponents(self):
+        return np.array(
+            [[int(math.log2(cell)) if cell else 0 for cell in row] for row in self.board],
+            dtype=np.int8,
+        )
+
+    def _render_frame(self):
+        tiles = self._palette[self._exponents()]
+        frame = tiles.repeat(self.tile_size, axis=0).repeat(self.tile_size, axis=1)
+        frame[~self._tile_mask] = self._background
+        return frame
+
+    def _get_obs(self):
+        if self.obs_type == "rgb":
+            return self._render_frame()
+        return self._exponents()
+
+    def _get_info(self, valid_move, status="PLAY"):
+        return {
+            "score": self.score,
+            "max_tile": max(cell for row in self.board for cell in row),
+            "valid_move": valid_move,
+            "status": status,
+        }
+
+
+def make_vector_env(num_envs, asynchronous=False, **env_kwargs):
+    """
+    Create a vectorized Game2048Env.
+
+    Args:
+        num_envs (int): Number of environment copies.
+        asynchronous (bool): Run each copy in its own subprocess (AsyncVectorEnv)
+            instead of stepping them in-process (SyncVectorEnv).
+        **env_kwargs: Passed through to Game2048Env.
+
+    Returns:
+        gymnasium.vector.VectorEnv: The vectorized environment.
+    """
+    env_fns = [functools.partial(Game2048Env, **env_kwargs) for _ in range(num_envs)]
+    if asynchronous:
+        return gym.vector.AsyncVectorEnv(env_fns)
+    return gym.vector.SyncVectorEnv(env_fns)
+
+
+if ENV_ID not in gym.registry:
+    gym.register(id=ENV_ID, entry_point="games.game_2048.game_2048_env:Game2048Env")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the headless 2048 environment with a random policy")
+    parser.add_argument("--num-envs", type=int, default=1, help="Number of vectorized environments")
+    parser.add_argument("--steps", type=int, default=10000, help="Total environment steps to run")
+    parser.add_argument("--obs-type", type=str, default="symbolic", choices=["symbolic", "rgb"])
+    parser.add_argument("--async", dest="asynchronous", action="store_true", help="Use AsyncVectorEnv")
+    args = parser.parse_args()
+
+    envs = make_vector_env(args.num_envs, asynchronous=args.asynchronous, obs_type=args.obs_type)
+    envs.reset(seed=0)
+    start_time = time.time()
+    for _ in range(max(1, args.steps // args.num_envs)):
+        envs.step(envs.action_space.sample())
+    elapsed = time.time() - start_time
+    envs.close()
+
+    total_steps = max(1, args.steps // args.num_envs) * args.num_envs
+    print(f"{total_steps} steps in {elapsed:.2f}s ({total_steps / elapsed:.0f} steps/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import json
+import random
 import sys
 import argparse
 import pygame
@@ -18,6 +19,7 @@ c = json.load(open(constants_path, "r"))
 parser = argparse.ArgumentParser(description="Run 2048 Game with custom window size")
 parser.add_argument("-wd", "--width", type=int, default=DEFAULT_WIDTH, help="Set window width")
 parser.add_argument("-ht", "--height", type=int, default=DEFAULT_HEIGHT, help="Set window height")  # Changed -h to -ht
+parser.add_argument("--seed", type=int, default=None, help="Random seed for the tile sequence")
 args = parser.parse_args()
 
 # Set window size
@@ -32,4 +34,4 @@ screen = pygame.display.set_mode(size)
 my_font = pygame.font.SysFont(c["font"], c["font_size"], bold=True)
 
 if __name__ == "__main__":
-    playGame("light", 2048, size)
+    playGame("light", 2048, size, rng=random.Random(args.seed))
@@ -49,30 +49,62 @@ def checkGameStatus(board, max_tile=2048):
         return "PLAY"
 
 
-def fillTwoOrFour(board, iter=1):
+def fillTwoOrFour(board, iter=1, rng=random):
     """
     Randomly fill 2 or 4 in available spaces on the board.
 
     Parameters:
         board (list): game board
         iter (int): number of times to repeat the process
+        rng (random.Random): random stream to draw from, default = global random
     Returns:
         board (list): updated game board
     """
     for _ in range(iter):
-        a = random.randint(0, 3)
-        b = random.randint(0, 3)
+        a = rng.randint(0, 3)
+        b = rng.randint(0, 3)
         while(board[a][b] != 0):
-            a = random.randint(0, 3)
-            b = random.randint(0, 3)
+            a = rng.randint(0, 3)
+            b = rng.randint(0, 3)
 
         if sum([cell for row in board for cell in row]) in (0, 2):
             board[a][b] = 2
         else:
-            board[a][b] = random.choice((2, 4))
+            board[a][b] = rng.choice((2, 4))
     return board
 
 
+def snapshot(board, rng=None):
+    """
+    Capture the board (and optionally the random stream position) so it can be
+    restored later, e.g. to branch a search or replay an identical tile sequence.
+
+    Parameters:
+        board (list): game board
+        rng (random.Random): random stream to capture, default = None
+    Returns:
+        (tuple): immutable (board, rng_state) snapshot
+    """
+    return (tuple(tuple(row) for row in board),
+            rng.getstate() if rng is not None else None)
+
+
+def restore(snap, rng=None):
+    """
+    Rebuild a board from a snapshot and rewind the random stream.
+
+    Parameters:
+        snap (tuple): snapshot returned by snapshot()
+        rng (random.Random): random stream to rewind, default = None
+    Returns:
+        board (list): restored game board
+    """
+    board, rng_state = snap
+    if rng is not None and rng_state is not None:
+        rng.setstate(rng_state)
+    return [list(row) for row in board]
+
+
 def moveLeft(board):
     """
     Move and merge tiles to the left.
@@ -0,0 +1,157 @@
+"""
+Key-event IPC channel for the pygame games
+
+Lets an agent deliver key events straight into a running game's pygame
+event queue instead of synthesizing OS-level key presses (pyautogui sleeps
+PAUSE=0.1s after every call and needs the window focused). The game starts
+a KeyEventServer on a local UDP port; every datagram is one command:
+
+    press left        KEYDOWN + KEYUP
+    keyDown x         KEYDOWN
+    keyUp x           KEYUP
+
+A datagram may carry several commands separated by newlines; they are posted
+in order, so a whole macro arrives in one frame. Key names are
+pyautogui-style ("left", "space", "enter", "x").
+pygame.event.post is thread-safe, so the server thread posts events
+directly and the game loop picks them up on its next pygame.event.get().
+
+Usage (game side):
+    from games.key_ipc import KeyEventServer
+    KeyEventServer(port=DEFAULT_PORT).start()
+
+Client side: tools.input_backends.IPCBackend, or in-process
+tools.input_backends.PygameEventBackend.
+"""
+
+import socket
+import threading
+
+import pygame
+
+DEFAULT_PORT = 47800
+
+# pyautogui key names that differ from SDL's
+KEY_ALIASES = {
+    "enter": "return",
+    "esc": "escape",
+    "shift": "left shift",
+    "shiftleft": "left shift",
+    "shiftright": "right shift",
+    "ctrl": "left ctrl",
+    "ctrlleft": "left ctrl",
+    "ctrlright": "right ctrl",
+    "alt": "left alt",
+    "altleft": "left alt",
+    "altright": "right alt",
+    "pageup": "page up",
+    "pagedown": "page down",
+}
+
+# Common keys resolved up front; anything else goes through pygame.key.key_code
+KEY_CODES = {
+    "left": pygame.K_LEFT,
+    "right": pygame.K_RIGHT,
+    "up": pygame.K_UP,
+    "down": pygame.K_DOWN,
+    "space": pygame.K_SPACE,
+    "return": pygame.K_RETURN,
+    "escape": pygame.K_ESCAPE,
+}
+
+COMMANDS = ("press", "keyDown", "keyUp")
+
+
+def key_code(name):
+    """pygame key constant for a pyautogui-style key name."""
+    name = KEY_ALIASES.get(name.lower(), name.lower())
+    if name in KEY_CODES:
+        return KEY_CODES[name]
+    return pygame.key.key_code(name)
+
+
+def post_key(op, name):
+    """
+    Post a key command into the pygame event queue of the current process.
+
+    Args:
+        op (str): "press", "keyDown" or "keyUp".
+        name (str): Key name, e.g. "left" or "x".
+    """
+    key = key_code(name)
+    if op in ("press", "keyDown"):
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key, mod=0, unicode="", scancode=0))
+    if op in ("press", "keyUp"):
+        pygame.event.post(pygame.event.Event(pygame.KEYUP, key=key, mod=0, unicode="", scancode=0))
+
+
+class KeyEventServer:
+    """
+    Receives key commands on a local UDP port and posts them as pygame events.
+
+    Args:
+        port (int): UDP port to listen on.
+        host (str): Interface to bind; loopback by default.
+    """
+    def __init__(self, port=DEFAULT_PORT, host="127.0.0.1"):
+        self.address = (host, port)
+        self.sock = None
+        self.thread = None
+        self.running = False
+        self.received = 0
+        self.errors = 0
+
+    def start(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(self.address)
+        self.sock.settimeout(0.2)
+        self.running = True
+        self.thread = threading.Thread(target=self._serve, daemon=True, name="KeyEventServer")
+        self.thread.start()
+        print(f"Key event server listening on udp://{self.address[0]}:{self.address[1]}")
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(1.0)
+        if self.sock is not None:
+            self.sock.close()
+
+    def _serve(self):
+        while self.running:
+            try:
+                data, _ = self.sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                commands = data.decode("utf-8").splitlines()
+            except UnicodeDecodeError as e:
+                self.errors += 1
+                print(f"[KeyEventServer] Ignoring {data!r}: {e}")
+                continue
+            for command in commands:
+                try:
+                    op, name = command.split(None, 1)
+                    if op not in COMMANDS:
+                        raise ValueError(f"unknown command '{op}'")
+                    post_key(op, name.strip())
+                    self.received += 1
+                except (ValueError, pygame.error) as e:
+                    self.errors += 1
+                    print(f"[KeyEventServer] Ignoring {command!r}: {e}")
+
+
+def add_ipc_arguments(parser):
+    """Add the --ipc-port option to an argparse parser."""
+    parser.add_argument("--ipc-port", type=int, default=0,
+                        help=f"Accept key events over UDP on this port (e.g. {DEFAULT_PORT}); 0 disables")
+
+
+def server_from_args(args):
+    """Start a KeyEventServer if --ipc-port was given; returns it or None."""
+    if not args.ipc_port:
+        return None
+    return KeyEventServer(port=args.ipc_port).start()
@@ -0,0 +1,118 @@
+"""
+Simulation clock for the pygame games
+
+Decouples game time from wall time so the same game loop can run
+interactively or as fast as the CPU allows:
+
+- "realtime": game time is wall time, frames are paced to the target FPS
+  (the previous behaviour of clock.tick(60) + time.time()).
+- "fixed": every frame advances game time by exactly 1/fps seconds and is
+  paced to wall time, so a run looks the same as realtime but is deterministic.
+- "fast": every frame advances game time by 1/fps seconds with no sleeping,
+  and rendering is throttled to every Nth frame (or skipped entirely).
+
+Usage:
+    from games.sim_clock import SimClock
+
+    clock = SimClock(mode="fast", fps=60, render_every=0)
+    while running:
+        game_state.update(clock.now())
+        if clock.should_render():
+            renderer.render()
+        clock.tick()
+"""
+
+import time
+
+REALTIME = "realtime"
+FIXED = "fixed"
+FAST = "fast"
+MODES = (REALTIME, FIXED, FAST)
+
+
+class SimClock:
+    """
+    Virtual clock driving a game loop.
+
+    Args:
+        mode (str): "realtime", "fixed" or "fast".
+        fps (int): Target frame rate. In "fixed" and "fast" mode each frame is
+            exactly 1/fps seconds of game time. 0 leaves realtime mode uncapped.
+        render_every (int): In "fast" mode, render every Nth frame; 0 never
+            renders. Ignored in the other modes, which render every frame.
+    """
+
+    def __init__(self, mode=REALTIME, fps=60, render_every=1):
+        if mode not in MODES:
+            raise ValueError(f"Unsupported clock mode: {mode} (expected one of {', '.join(MODES)})")
+        if mode != REALTIME and fps <= 0:
+            raise ValueError(f"{mode} mode needs a positive fps")
+
+        self.mode = mode
+        self.fps = fps
+        self.render_every = render_every
+        self.step = 1.0 / fps if fps > 0 else 0.0
+        self.frame = 0
+        self.virtual_time = 0.0
+        self._next_deadline = None
+        self._last_tick = None
+
+    def now(self):
+        """Current game time in seconds."""
+        if self.mode == REALTIME:
+            return time.time()
+        return self.virtual_time
+
+    def tick(self):
+        """
+        End the current frame: advance game time and, unless fast-forwarding,
+        sleep until the next frame is due.
+
+        Returns:
+            float: Game time elapsed during the frame, in milliseconds
+            (like pygame.time.Clock.tick).
+        """
+        self.frame += 1
+        if self.mode != FAST and self.step:
+            self._wait_for_next_frame()
+
+        if self.mode == REALTIME:
+            current = time.perf_counter()
+            elapsed = current - self._last_tick if self._last_tick is not None else self.step
+            self._last_tick = current
+            return elapsed * 1000
+
+        self.virtual_time += self.step
+        return self.step * 1000
+
+    def should_render(self):
+        """Whether the frame that is about to be drawn should be rendered."""
+        if self.mode != FAST:
+            return True
+        return self.render_every > 0 and self.frame % self.render_every == 0
+
+    def _wait_for_next_frame(self):
+        current = time.perf_counter()
+        if self._next_deadline is None:
+            self._next_deadline = current
+        self._next_deadline += self.step
+        delay = self._next_deadline - current
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # Running behind: start pacing again from now instead of bursting to catch up
+            self._next_deadline = current
+
+
+def add_clock_arguments(parser):
+    """Add --clock, --fps and --render-every options to an argparse parser."""
+    parser.add_argument("--clock", type=str, default=REALTIME, choices=MODES,
+                        help="Game clock: realtime, fixed-step, or uncapped fast-forward")
+    parser.add_argument("--fps", type=int, default=60, help="Frames per second of game time (default: 60)")
+    parser.add_argument("--render-every", type=int, default=1,
+                        help="In fast mode, render every Nth frame; 0 disables rendering (default: 1)")
+
+
+def clock_from_args(args):
+    """Build a SimClock from options added by add_clock_arguments()."""
+    return SimClock(mode=args.clock, fps=args.fps, render_every=args.render_every)
@@ -4,6 +4,12 @@ import concurrent.futures
 import argparse
 
 from games.superMario.workers import worker_short, worker_long
+from games.superMario.scheduler import DecisionScheduler
+from tools.serving.concurrency import AdaptiveConcurrencyController
+from tools.serving.rate_limiter import RateLimiter
+from tools.serving.cancellation import CancellationToken
+from tools.input_backends import add_input_arguments, backend_from_args
+from tools.input_executor import configure_input_executor
 
 # System prompt remains constant
 system_prompt = (
@@ -12,7 +18,8 @@ system_prompt = (
 
 def main():
     """
-    Spawns a number of short-term and/or long-term workers based on user-defined parameters.
+    Runs the central decision scheduler, or (with --free_running) spawns a number of
+    short-term and/or long-term workers based on user-defined parameters.
     """
     parser = argparse.ArgumentParser(
         description="Super Mario gameplay agent with configurable concurrent workers."
@@ -27,37 +34,81 @@ def main():
                         help="Estimated API response latency in seconds.")
     parser.add_argument("--policy", type=str, default="alternate", choices=["mixed", "alternate", "long", "short"],
                         help="Worker policy: 'long', or 'short'. In 'long' or 'short' modes only those workers are enabled.")
+    parser.add_argument("--max_staleness", type=float, default=0.0,
+                        help="Drop plans that cannot start within this many seconds of their screenshot (0 disables).")
+    parser.add_argument("--max_in_flight", type=int, default=16,
+                        help="Upper bound on concurrent requests; the scheduler adapts the actual number "
+                             "to the measured latency and error rate.")
+    parser.add_argument("--rate_limit", type=float, default=0.0,
+                        help="Maximum requests started per second (0 disables).")
+    parser.add_argument("--request_timeout", type=float, default=0.0,
+                        help="Give up on a single API request after this many seconds (0 disables).")
+    parser.add_argument("--free_running", action="store_true",
+                        help="Use independent staggered workers that each execute their own responses "
+                             "instead of the central scheduler.")
+    parser.add_argument("--max_lateness", type=float, default=0.2,
+                        help="Skip key presses that would be issued more than this many seconds after their "
+                             "scheduled time in a plan (0 never skips).")
+    add_input_arguments(parser)
 
     args = parser.parse_args()
 
     num_threads = int(args.api_response_latency_estimate / args.concurrency_interval)
     offsets = [i * args.concurrency_interval for i in range(num_threads)]
 
-    print(f"Starting with {num_threads} threads using policy '{args.policy}'...")
     print(f"API Provider: {args.api_provider}, Model Name: {args.model_name}")
+    # Plans are played as absolute-time key events; presses that are already too late are dropped
+    configure_input_executor(backend_from_args(args), max_lateness=args.max_lateness or None)
+    print(f"Input backend: {args.input_backend}")
+
+    if not args.free_running:
+        # One request per interval; the in-flight limit starts from the latency estimate and then
+        # follows the measured latency (AIMD). Only the freshest response is executed.
+        rate_limiter = RateLimiter(args.rate_limit) if args.rate_limit > 0 else None
+        controller = AdaptiveConcurrencyController(args.concurrency_interval,
+                                                   initial_latency=args.api_response_latency_estimate,
+                                                   max_limit=args.max_in_flight,
+                                                   rate_limiter=rate_limiter)
+        scheduler = DecisionScheduler(system_prompt, args.api_provider, args.model_name,
+                                      interval=args.concurrency_interval,
+                                      max_in_flight=args.max_in_flight,
+                                      policy=args.policy,
+                                      max_staleness=args.max_staleness or None,
+                                      controller=controller,
+                                      rate_limiter=rate_limiter,
+                                      request_timeout=args.request_timeout or None)
+        scheduler.run()
+        return
+
+    print(f"Starting with {num_threads} threads using policy '{args.policy}'...")
+
+    # Cancelled on Ctrl+C so workers abandon their in-flight requests instead of
+    # blocking the pool shutdown for a whole API round trip
+    stop_token = CancellationToken()
 
     with concurrent.futures.ThreadPoolExecutor(max_workers=num_threads) as executor:
         for i in range(num_threads):
             if args.policy == "mixed":
                 if i % 2 == 0:
-                    executor.submit(worker_long, i, offsets[i], system_prompt, args.api_provider, args.model_name)
-                executor.submit(worker_short, i, offsets[i], system_prompt, args.api_provider, args.model_name)
+                    executor.submit(worker_long, i, offsets[i], system_prompt, args.api_provider, args.model_name, stop_token)
+                executor.submit(worker_short, i, offsets[i], system_prompt, args.api_provider, args.model_name, stop_token)
             if args.policy == "alternate":
                 # Alternate between long and short workers.
                 if i % 2 == 0:
-                    executor.submit(worker_long, i, offsets[i], system_prompt, args.api_provider, args.model_name)
+                    executor.submit(worker_long, i, offsets[i], system_prompt, args.api_provider, args.model_name, stop_token)
                 else:    
-                    executor.submit(worker_short, i, offsets[i], system_prompt, args.api_provider, args.model_name)
+                    executor.submit(worker_short, i, offsets[i], system_prompt, args.api_provider, args.model_name, stop_token)
             elif args.policy == "long":
-                executor.submit(worker_long, i, offsets[i], system_prompt, args.api_provider, args.model_name)
+                executor.submit(worker_long, i, offsets[i], system_prompt, args.api_provider, args.model_name, stop_token)
             elif args.policy == "short":
-                executor.submit(worker_short, i, offsets[i], system_prompt, args.api_provider, args.model_name)
+                executor.submit(worker_short, i, offsets[i], system_prompt, args.api_provider, args.model_name, stop_token)
 
         try:
             while True:
                 time.sleep(0.25)
         except KeyboardInterrupt:
             print("\nMain thread interrupted. Exiting all threads...")
+            stop_token.cancel("interrupted by user")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
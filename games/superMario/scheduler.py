@@ -0,0 +1,322 @@
+import concurrent.futures
+import os
+import threading
+import time
+
+import numpy as np
+import pyautogui
+
+from tools.utils import encode_image, log_output, extract_python_code
+from tools.actions import compile_actions, trim, to_dsl
+from tools.input_executor import get_input_executor
+from tools.serving.concurrency import AdaptiveConcurrencyController
+from tools.serving.cancellation import CancellationToken, RequestCancelled, RequestTimeout
+from games.superMario.workers import SHORT_PROMPT, LONG_PROMPT, request_plan
+
+HORIZON_PROMPTS = {"short": SHORT_PROMPT, "long": LONG_PROMPT}
+# Plans are cut to the horizon they were asked for before they run
+HORIZON_SECONDS = {"short": 1.0, "long": 2.0}
+
+
+class Plan:
+    """
+    A model response together with the frame it was decided on.
+    """
+    def __init__(self, seq, horizon, capture_time, code, latency):
+        self.seq = seq
+        self.horizon = horizon
+        self.capture_time = capture_time
+        self.code = code
+        self.latency = latency
+
+
+class DecisionScheduler:
+    """
+    Central scheduler for the Mario agent.
+
+    Instead of free-running workers that each exec their code whenever it arrives,
+    one dispatcher captures a frame every `interval` seconds and sends it to the model.
+    The number of requests in flight is bounded by an AIMD controller that measures
+    latency and errors and keeps just enough requests outstanding to hold the interval
+    (and, with a rate limiter, only starts a request when a token is available).
+    Every response is tagged with the
+    capture time of its frame, and only the freshest one is executed: responses for
+    frames older than what is already running are discarded, and a fresher plan is
+    submitted to the shared input executor with cancel-and-replace, preempting the
+    running one. Requests for frames older than a submitted plan can no longer win,
+    so they are cancelled right away instead of holding an in-flight slot until
+    their response arrives, and stop() abandons every open request immediately.
+    An abandoned provider call keeps running until it returns, so it keeps its
+    in-flight slot until then and the limits bound real concurrent calls.
+
+    Args:
+        system_prompt (str): System prompt for every request.
+        api_provider (str): "anthropic", "openai" or "gemini".
+        model_name (str): Model name.
+        interval (float): Seconds between captured frames / issued requests.
+        max_in_flight (int): Upper bound on concurrent requests (thread pool size); ticks
+            are skipped while the controller's current limit is reached.
+        policy (str): Prompt horizon per tick: "short", "long", "alternate" (long on even
+            ticks, short on odd ones) or "mixed" (short every tick plus long on even ticks).
+        max_staleness (float, optional): Drop a plan that could not start within this
+            many seconds of its frame being captured.
+        input_executor (InputExecutor, optional): Executor that owns the keyboard.
+            Defaults to the shared one.
+        controller (AdaptiveConcurrencyController, optional): In-flight limit controller.
+            Defaults to one targeting `interval` with `max_in_flight` as its ceiling.
+        rate_limiter (RateLimiter, optional): Token bucket a request must draw from
+            before it is issued.
+        request_timeout (float, optional): Give up on a request after this many seconds
+            (counted as an error by the controller).
+    """
+    def __init__(self, system_prompt, api_provider, model_name, interval=0.5, max_in_flight=4, policy="alternate",
+                 max_staleness=None, input_executor=None, controller=None, rate_limiter=None, request_timeout=None):
+        self.system_prompt = system_prompt
+        self.api_provider = api_provider
+        self.model_name = model_name
+        self.interval = interval
+        self.max_in_flight = max(1, max_in_flight)
+        self.policy = policy
+        self.max_staleness = max_staleness
+        self.input_executor = input_executor or get_input_executor()
+        self.rate_limiter = rate_limiter
+        self.request_timeout = request_timeout
+        self.controller = controller or AdaptiveConcurrencyController(
+            interval, max_limit=self.max_in_flight, rate_limiter=rate_limiter)
+        self.max_in_flight = max(self.max_in_flight, self.controller.max_limit)
+
+        self.cond = threading.Condition()
+        self.stop_event = threading.Event()
+        self.stop_token = CancellationToken()
+        self.open_requests = {}  # seq -> (capture_time, CancellationToken)
+        self.current_ticket = None  # action sequence of the freshest plan
+        self.newest_capture = 0.0   # capture time of the newest plan submitted
+        self.in_flight = 0
+
+        self.stats = {"issued": 0, "skipped_ticks": 0, "rate_limited": 0, "executed": 0, "discarded": 0,
+                      "preempted": 0, "cancelled": 0,
+                      "timeouts": 0, "errors": 0}
+        self.staleness = []
+        self.latencies = []
+        self.limits = []  # in-flight limit at every tick
+        self.start_time = None
+
+    def horizons_for_tick(self, tick):
+        if self.policy == "short":
+            return ["short"]
+        if self.policy == "long":
+            return ["long"]
+        if self.policy == "mixed":
+            return ["short", "long"] if tick % 2 == 0 else ["short"]
+        return ["long"] if tick % 2 == 0 else ["short"]
+
+    def run(self):
+        """
+        Issue requests at a fixed cadence until interrupted, then print a report.
+        """
+        self.start_time = time.time()
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_in_flight)
+
+        print(f"[Scheduler] Issuing requests every {self.interval}s, "
+              f"{self.controller.in_flight_limit} in flight (adaptive, max {self.max_in_flight}), "
+              f"policy '{self.policy}'")
+        tick = 0
+        next_tick = time.monotonic()
+        try:
+            while not self.stop_event.is_set():
+                self._issue(pool, tick)
+                tick += 1
+
+                next_tick += self.interval
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_tick = time.monotonic()
+        except KeyboardInterrupt:
+            print("\n[Scheduler] Interrupted by user. Exiting...")
+        finally:
+            self.stop()
+            pool.shutdown(wait=False, cancel_futures=True)
+            self.report()
+
+    def _count(self, key):
+        with self.cond:
+            self.stats[key] += 1
+
+    def stop(self):
+        self.stop_event.set()
+        self.stop_token.cancel("scheduler stopped")
+        with self.cond:
+            ticket = self.current_ticket
+        if ticket is not None:
+            self.input_executor.cancel(ticket)
+
+    def _issue(self, pool, tick):
+        horizons = self.horizons_for_tick(tick)
+        limit = self.controller.in_flight_limit
+        with self.cond:
+            self.limits.append(limit)
+            free = limit - self.in_flight
+            if free <= 0:
+                self.stats["skipped_ticks"] += 1
+                return
+            horizons = horizons[:free]
+            if self.rate_limiter is not None:
+                horizons = [h for h in horizons if self.rate_limiter.try_acquire()]
+                if not horizons:
+                    self.stats["rate_limited"] += 1
+                    return
+            self.in_flight += len(horizons)
+
+        try:
+            screen_width, screen_height = pyautogui.size()
+            screenshot = pyautogui.screenshot(region=(0, 0, screen_width, screen_height))
+            capture_time = time.time()
+
+            folder = "cache/mario/scheduler"
+            os.makedirs(folder, exist_ok=True)
+            screenshot_path = os.path.join(folder, "screenshot.png")
+            screenshot.save(screenshot_path)
+            base64_image = encode_image(screenshot_path)
+        except Exception as e:
+            print(f"[Scheduler] Error capturing frame: {e}")
+            with self.cond:
+                self.in_flight -= len(horizons)
+            return
+
+        for horizon in horizons:
+            with self.cond:
+                seq = self.stats["issued"]
+                self.stats["issued"] += 1
+                token = self.stop_token.child()
+                self.open_requests[seq] = (capture_time, token)
+            pool.submit(self._request, seq, horizon, capture_time, base64_image, token)
+
+    def _request(self, seq, horizon, capture_time, base64_image, token):
+        start_time = time.time()
+        released = []
+
+        def release():
+            # Called when the provider call returns, which can be after this request was abandoned
+            with self.cond:
+                if not released:
+                    released.append(True)
+                    self.in_flight -= 1
+
+        try:
+            generated_code_str = request_plan(self.system_prompt, self.api_provider, self.model_name,
+                                              base64_image, HORIZON_PROMPTS[horizon],
+                                              token=token, timeout=self.request_timeout, on_done=release)
+            if generated_code_str == "error":
+                # The completion helpers swallow API errors (rate limits, timeouts) and return "error"
+                raise RuntimeError("API call returned an error")
+        except RequestCancelled as e:
+            # Superseded by a fresher plan or shut down; not a provider failure
+            self._count("cancelled")
+            if not self.stop_event.is_set():
+                print(f"[Scheduler] Request #{seq} cancelled after {time.time() - start_time:.2f}s ({e})")
+            return
+        except RequestTimeout as e:
+            self._count("timeouts")
+            self._record(time.time() - start_time, ok=False)
+            print(f"[Scheduler] Request #{seq} timed out: {e}")
+            return
+        except Exception as e:
+            # The provider call has finished (or never started)
+            release()
+            self._count("errors")
+            self._record(time.time() - start_time, ok=False)
+            print(f"[Scheduler] Request #{seq} failed: {e}")
+            return
+        finally:
+            with self.cond:
+                self.open_requests.pop(seq, None)
+
+        release()
+        latency = time.time() - start_time
+        self.latencies.append(latency)
+        self._record(latency, ok=True)
+        print(f"[Scheduler] Response #{seq} ({horizon.upper()}) after {latency:.2f}s")
+        try:
+            self._deliver(Plan(seq, horizon, capture_time, extract_python_code(generated_code_str), latency))
+        except Exception as e:
+            self._count("errors")
+            print(f"[Scheduler] Could not deliver plan #{seq}: {e}")
+
+    def _record(self, latency, ok):
+        previous = self.controller.in_flight_limit
+        limit = self.controller.record(latency, ok=ok)
+        if limit != previous and not self.stop_event.is_set():
+            status = self.controller.status()
+            print(f"[Scheduler] In-flight limit {previous} -> {limit} "
+                  f"(latency {status['latency'] or 0:.2f}s, error rate {status['error_rate']:.0%})")
+
+    def _deliver(self, plan):
+        actions = trim(compile_actions(plan.code), HORIZON_SECONDS[plan.horizon])
+        with self.cond:
+            if self.stop_event.is_set():
+                return
+            if plan.capture_time <= self.newest_capture:
+                # A plan for a newer frame was already submitted
+                self.stats["discarded"] += 1
+                print(f"[Scheduler] Discarding stale plan #{plan.seq} "
+                      f"({self.newest_capture - plan.capture_time:.2f}s older than current)")
+                return
+            if not actions:
+                self.stats["errors"] += 1
+                print(f"[Scheduler] Plan #{plan.seq} contains no executable actions")
+                return
+
+            previous = self.current_ticket
+            if previous is not None and previous.status == "running":
+                self.stats["preempted"] += 1
+                print(f"[Scheduler] Plan #{plan.seq} preempts running plan {previous.source}")
+            elif previous is not None and previous.status == "queued":
+                self.stats["discarded"] += 1
+                print(f"[Scheduler] Plan #{plan.seq} supersedes queued plan {previous.source}")
+
+            self.newest_capture = plan.capture_time
+            # Anything still waiting on an older frame would be discarded on arrival
+            for seq, (capture_time, token) in self.open_requests.items():
+                if capture_time < plan.capture_time:
+                    token.cancel(f"superseded by plan #{plan.seq}")
+            deadline = plan.capture_time + self.max_staleness if self.max_staleness else None
+            self.current_ticket = self.input_executor.submit(
+                actions,
+                priority=1 if plan.horizon == "short" else 0,
+                deadline=deadline,
+                replace=True,
+                source=f"#{plan.seq}",
+                on_start=lambda ticket: self._on_start(plan, ticket),
+            )
+
+    def _on_start(self, plan, ticket):
+        staleness = ticket.start_time - plan.capture_time
+        with self.cond:
+            self.staleness.append(staleness)
+            self.stats["executed"] += 1
+        message = (f"[Scheduler] Executing plan #{plan.seq} ({plan.horizon.upper()}): "
+                   f"frame captured {staleness:.2f}s ago, model latency {plan.latency:.2f}s, "
+                   f"{len(ticket.actions)} actions")
+        print(message)
+        log_output("scheduler", f"{message}\n{to_dsl(ticket.actions)}\n", "mario")
+
+    def report(self):
+        elapsed = max(time.time() - (self.start_time or time.time()), 1e-9)
+        print("\n[Scheduler] ---- Summary ----")
+        for key, value in self.stats.items():
+            print(f"[Scheduler] {key}: {value}")
+        print(f"[Scheduler] Request rate: {self.stats['issued'] / elapsed:.2f}/s, "
+              f"effective control rate: {self.stats['executed'] / elapsed:.2f}/s")
+        if self.limits:
+            print(f"[Scheduler] In-flight limit: mean {np.mean(self.limits):.1f}, "
+                  f"min {np.min(self.limits)}, max {np.max(self.limits)}, final {self.limits[-1]}")
+        if self.latencies:
+            print(f"[Scheduler] Model latency: mean {np.mean(self.latencies):.2f}s, "
+                  f"p95 {np.percentile(self.latencies, 95):.2f}s")
+        if self.staleness:
+            print(f"[Scheduler] Staleness at execution: mean {np.mean(self.staleness):.2f}s, "
+                  f"p50 {np.percentile(self.staleness, 50):.2f}s, "
+                  f"p95 {np.percentile(self.staleness, 95):.2f}s, max {np.max(self.staleness):.2f}s")
+        self.input_executor.report()
@@ -4,45 +4,99 @@ import pyautogui
 import numpy as np
 
 from tools.utils import encode_image, log_output, extract_python_code
+from tools.actions import compile_actions
+from tools.input_executor import get_input_executor
 from tools.serving.api_providers import anthropic_completion, openai_completion, gemini_completion
+from tools.serving.cancellation import CancellationToken, RequestCancelled, call_cancellable
+
+# Short-term (1 second) and long-term (2 seconds) motion control prompts
+SHORT_PROMPT = (
+    "Analyze the current game state and generate PyAutoGUI code to control Mario "
+    "for the next 1 second.\n"
+    "Mario's position most likely has moved forward when the generated code gets to execute.\n"
+    "Your objective is to avoid obstacles, enemies, and hazards.\n"
+
+    "### General Controls:\n"
+    "- Press 'Enter' to start the game ONLY IF the game hasn't started.\n"
+    "  Otherwise the game will be paused.\n"
+    "- Press the right arrow to move forward.\n"
+    "- Press 'X' along with right/left arrow to jump over obstacles or gaps. Be very careful with gaps, do lopped jumps if necessary.\n\n"
+
+    "### Strategies and Caveats:\n"
+    "- Whenever a gap is detected, AVOID jumping over the gap. Only do small position adjustments to prepare for big jump.\n"
+    "- If an obstacle or enemy is near, move/jump left to dodge.\n"
+    "- If an enemy is detected, do one big jump ONLY IF very confident, ortherwise do consecutive short jumps.\n"
+    "- If in doubt, take a more defensive approaches like moving to the left (move back).\n"
+    "- Sleep and do nothing if no obvious danger."
+
+    "### Output Format:\n"
+    "- Output ONLY the Python code for PyAutoGUI commands.\n"
+    "- Include brief comments for each action.\n"
+)
+
+LONG_PROMPT = (
+    "Analyze the current game state and generate PyAutoGUI code to control Mario "
+    "for the next 2 seconds.\n"
+    "Mario's position most likely has moved forward when the generated code gets to execute.\n"
+    "Your objective is to make progress while avoiding obstacles, enemies, and hazards.\n"
+
+    "### General Controls:\n"
+    "- Press 'Enter' to start the game ONLY IF the game hasn't started.\n"
+    "  Otherwise the game will be paused.\n"
+    "- Press the right arrow to move forward.\n"
+    "- Press 'X' along with right/left arrow to jump over obstacles or gaps. Be very careful with gaps, do lopped jumps if necessary.\n\n"
+
+    "### Strategies and Caveats:\n"
+    "- Don't move too fast, as unseen enemies may appear from off-screen.\n"
+    "- If an obstacle or enemy is near, move forward in small increments and be ready to jump.\n"
+    "- Avoid walking forward without jumping as Mario can run into off-screen enemies.\n"
+    "- If a gap is detected, make sure to leave room for acceleration and then jump. Otherwise, move left first to get more space for acceleration.\n"
+    "- If in doubt, take a more defensive approaches like moving to the left (move back).\n"
+    "- Secondary goal: only if very safe, collect as many question mark blocks as possible.\n\n"
+
+    "### Output Format:\n"
+    "- Output ONLY the Python code for PyAutoGUI commands.\n"
+    "- Include brief comments for each action.\n"
+)
+
+COMPLETIONS = {
+    "anthropic": anthropic_completion,
+    "openai": openai_completion,
+    "gemini": gemini_completion,
+}
+
+def request_plan(system_prompt, api_provider, model_name, base64_image, prompt, token=None, timeout=None,
+                 on_done=None):
+    """
+    Send one screenshot + prompt to the selected provider and return the generated text.
 
-def worker_short(thread_id, offset, system_prompt, api_provider, model_name):
+    Raises RequestCancelled as soon as `token` is cancelled and RequestTimeout after
+    `timeout` seconds, without waiting for the API round trip to finish.
+    `on_done` is called once the API call itself has returned (see call_cancellable).
+    """
+    if api_provider not in COMPLETIONS:
+        raise NotImplementedError(f"API provider: {api_provider} is not supported.")
+    generated_code_str, _ = call_cancellable(COMPLETIONS[api_provider], system_prompt, model_name,
+                                             base64_image, prompt, token=token, timeout=timeout,
+                                             on_done=on_done)
+    return generated_code_str
+
+def worker_short(thread_id, offset, system_prompt, api_provider, model_name, stop_token=None):
     """
     Worker function for short-term (1 second) motion control.
     1) Sleeps 'offset' seconds before starting (to stagger starts).
     2) Continuously takes screenshots, calls Anthropic with streaming output, logs latency, executes returned code, etc.
+    3) Exits as soon as stop_token is cancelled, abandoning any in-flight request.
     """
     all_response_time = []
+    stop_token = stop_token or CancellationToken()
 
-    time.sleep(offset)
+    if stop_token.wait(offset):
+        return
     print(f"[Thread {thread_id} - SHORT] Starting after {offset}s delay...")
 
-    short_prompt = (
-        f"Analyze the current game state and generate PyAutoGUI code to control Mario "
-        "for the next 1 second.\n"
-        "Mario's position most likely has moved forward when the generated code gets to execute.\n"
-        "Your objective is to avoid obstacles, enemies, and hazards.\n"
-
-        "### General Controls:\n"
-        "- Press 'Enter' to start the game ONLY IF the game hasn't started.\n"
-        "  Otherwise the game will be paused.\n"
-        "- Press the right arrow to move forward.\n"
-        "- Press 'X' along with right/left arrow to jump over obstacles or gaps. Be very careful with gaps, do lopped jumps if necessary.\n\n"
-
-        "### Strategies and Caveats:\n"
-        "- Whenever a gap is detected, AVOID jumping over the gap. Only do small position adjustments to prepare for big jump.\n"
-        "- If an obstacle or enemy is near, move/jump left to dodge.\n"
-        "- If an enemy is detected, do one big jump ONLY IF very confident, ortherwise do consecutive short jumps.\n"
-        "- If in doubt, take a more defensive approaches like moving to the left (move back).\n"
-        "- Sleep and do nothing if no obvious danger."
-
-        "### Output Format:\n"
-        "- Output ONLY the Python code for PyAutoGUI commands.\n"
-        "- Include brief comments for each action.\n"
-    )
-
     try:
-        while True:
+        while not stop_token.is_cancelled:
             screen_width, screen_height = pyautogui.size()
             region = (0, 0, screen_width, screen_height)
             screenshot = pyautogui.screenshot(region=region)
@@ -57,14 +111,8 @@ def worker_short(thread_id, offset, system_prompt, api_provider, model_name):
 
             start_time = time.time()
 
-            if api_provider == "anthropic":
-                generated_code_str = anthropic_completion(system_prompt, model_name, base64_image, short_prompt)
-            elif api_provider == "openai":
-                generated_code_str = openai_completion(system_prompt, model_name, base64_image, short_prompt)
-            elif api_provider == "gemini":
-                generated_code_str = gemini_completion(system_prompt, model_name, base64_image, short_prompt)
-            else:
-                raise NotImplementedError(f"API provider: {api_provider} is not supported.")
+            generated_code_str = request_plan(system_prompt, api_provider, model_name, base64_image, SHORT_PROMPT,
+                                              token=stop_token)
 
             end_time = time.time()
             latency = end_time - start_time
@@ -81,52 +129,37 @@ def worker_short(thread_id, offset, system_prompt, api_provider, model_name):
             log_output(thread_id, f"[Thread {thread_id} - SHORT] Python code to be executed:\n{clean_code}\n", "mario")
             print(f"[Thread {thread_id} - SHORT] Python code to be executed:\n{clean_code}\n")
 
-            try:
-                exec(clean_code)
-            except Exception as e:
-                print(f"[Thread {thread_id} - SHORT] Error executing code: {e}")
-
+            # The shared input executor owns the keyboard; the plan is dropped if it
+            # cannot start within its 1 second horizon
+            executor = get_input_executor()
+            ticket = executor.submit(compile_actions(clean_code), priority=1,
+                                     deadline=time.time() + 1,
+                                     source=f"thread {thread_id} SHORT")
+            executor.wait(ticket, token=stop_token)
+            print(f"[Thread {thread_id} - SHORT] Actions {ticket.status} in {ticket.duration:.2f}s "
+                  f"({ticket.timing_summary()})")
+
+    except RequestCancelled:
+        print(f"[Thread {thread_id} - SHORT] Request cancelled. Exiting...")
     except KeyboardInterrupt:
         print(f"[Thread {thread_id} - SHORT] Interrupted by user. Exiting...")
 
-def worker_long(thread_id, offset, system_prompt, api_provider, model_name):
+def worker_long(thread_id, offset, system_prompt, api_provider, model_name, stop_token=None):
     """
     Worker function for long-term (2 seconds) motion control.
     1) Sleeps 'offset' seconds before starting (to stagger starts).
     2) Continuously takes screenshots, calls Anthropic with streaming output, logs latency, executes returned code, etc.
+    3) Exits as soon as stop_token is cancelled, abandoning any in-flight request.
     """
     all_response_time = []
+    stop_token = stop_token or CancellationToken()
 
-    time.sleep(offset)
+    if stop_token.wait(offset):
+        return
     print(f"[Thread {thread_id} - LONG] Starting after {offset}s delay...")
 
-    long_prompt = (
-        f"Analyze the current game state and generate PyAutoGUI code to control Mario "
-        "for the next 2 seconds.\n"
-        "Mario's position most likely has moved forward when the generated code gets to execute.\n"
-        "Your objective is to make progress while avoiding obstacles, enemies, and hazards.\n"
-
-        "### General Controls:\n"
-        "- Press 'Enter' to start the game ONLY IF the game hasn't started.\n"
-        "  Otherwise the game will be paused.\n"
-        "- Press the right arrow to move forward.\n"
-        "- Press 'X' along with right/left arrow to jump over obstacles or gaps. Be very careful with gaps, do lopped jumps if necessary.\n\n"
-
-        "### Strategies and Caveats:\n"
-        "- Don't move too fast, as unseen enemies may appear from off-screen.\n"
-        "- If an obstacle or enemy is near, move forward in small increments and be ready to jump.\n"
-        "- Avoid walking forward without jumping as Mario can run into off-screen enemies.\n"
-        "- If a gap is detected, make sure to leave room for acceleration and then jump. Otherwise, move left first to get more space for acceleration.\n"
-        "- If in doubt, take a more defensive approaches like moving to the left (move back).\n"
-        "- Secondary goal: only if very safe, collect as many question mark blocks as possible.\n\n"
-
-        "### Output Format:\n"
-        "- Output ONLY the Python code for PyAutoGUI commands.\n"
-        "- Include brief comments for each action.\n"
-    )
-
     try:
-        while True:
+        while not stop_token.is_cancelled:
             screen_width, screen_height = pyautogui.size()
             region = (0, 0, screen_width, screen_height)
             screenshot = pyautogui.screenshot(region=region)
@@ -141,14 +174,8 @@ def worker_long(thread_id, offset, system_prompt, api_provider, model_name):
 
             start_time = time.time()
 
-            if api_provider == "anthropic":
-                generated_code_str = anthropic_completion(system_prompt, model_name, base64_image, long_prompt)
-            elif api_provider == "openai":
-                generated_code_str = openai_completion(system_prompt, model_name, base64_image, long_prompt)
-            elif api_provider == "gemini":
-                generated_code_str = gemini_completion(system_prompt, model_name, base64_image, long_prompt)
-            else:
-                raise NotImplementedError(f"API provider: {api_provider} is not supported.")
+            generated_code_str = request_plan(system_prompt, api_provider, model_name, base64_image, LONG_PROMPT,
+                                              token=stop_token)
 
             end_time = time.time()
             latency = end_time - start_time
@@ -165,10 +192,17 @@ def worker_long(thread_id, offset, system_prompt, api_provider, model_name):
             log_output(thread_id, f"[Thread {thread_id} - LONG] Python code to be executed:\n{clean_code}\n", "mario")
             print(f"[Thread {thread_id} - LONG] Python code to be executed:\n{clean_code}\n")
 
-            try:
-                exec(clean_code)
-            except Exception as e:
-                print(f"[Thread {thread_id} - LONG] Error executing code: {e}")
-
+            # The shared input executor owns the keyboard; the plan is dropped if it
+            # cannot start within its 2 second horizon
+            executor = get_input_executor()
+            ticket = executor.submit(compile_actions(clean_code), priority=0,
+                                     deadline=time.time() + 2,
+                                     source=f"thread {thread_id} LONG")
+            executor.wait(ticket, token=stop_token)
+            print(f"[Thread {thread_id} - LONG] Actions {ticket.status} in {ticket.duration:.2f}s "
+                  f"({ticket.timing_summary()})")
+
+    except RequestCancelled:
+        print(f"[Thread {thread_id} - LONG] Request cancelled. Exiting...")
     except KeyboardInterrupt:
         print(f"[Thread {thread_id} - LONG] Interrupted by user. Exiting...")
\ No newline at end of file
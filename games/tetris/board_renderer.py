@@ -0,0 +1,282 @@
+"""
+Sprite-atlas renderer for the simulated Tetris boards
+
+The tetris_*_iterator.py scripts show the model a simulated board after every
+move. That image used to be drawn from scratch each time: one
+ImageDraw.rectangle per filled cell, with the color and piece tables rebuilt on
+every call. BoardRenderer draws everything that never changes once (grid,
+side panel, captions) and keeps a block sprite per color in an atlas. Each
+render updates a reused buffer with NumPy slice assignments, touching only
+the cells that changed since the previous render, so a piece moving down costs
+a handful of cell copies. The pixels are the same as the old ImageDraw version.
+
+render_bytes() returns an encoded PNG directly (see encode_png), for saving
+screenshots and generating datasets without going through a file.
+A renderer reuses its buffer, so use one per thread.
+
+Usage:
+    from games.tetris.board_renderer import BoardRenderer
+
+    renderer = BoardRenderer()
+    image = renderer.render_image(board_state, current_piece, next_piece)
+    png = renderer.render_bytes(board_state, current_piece, next_piece)
+
+python -m tools.board_renderer_benchmark compares it with the old renderer.
+"""
+
+import struct
+import zlib
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from tools.overlay import draw_text
+
+# Colors for Tetris pieces
+COLORS = {
+    0: (0, 0, 0),         # Empty (black)
+    1: (0, 240, 240),     # I - Cyan
+    2: (0, 0, 240),       # J - Blue
+    3: (240, 160, 0),     # L - Orange
+    4: (240, 240, 0),     # O - Yellow
+    5: (0, 240, 0),       # S - Green
+    6: (160, 0, 240),     # T - Purple
+    7: (240, 0, 0),       # Z - Red
+    8: (100, 100, 100),   # Ghost piece (gray)
+    9: (50, 50, 50)       # Grid line (dark gray)
+}
+
+# Tetris piece shapes (different rotations), as (x, y) offsets
+PIECE_SHAPES = {
+    'I': [
+        [(0, 0), (1, 0), (2, 0), (3, 0)],  # Horizontal
+        [(1, -1), (1, 0), (1, 1), (1, 2)]  # Vertical
+    ],
+    'J': [
+        [(0, 0), (0, 1), (1, 1), (2, 1)],  # ┌──
+        [(1, 0), (2, 0), (1, 1), (1, 2)],  # │└─
+        [(0, 1), (1, 1), (2, 1), (2, 2)],  # ──┘
+        [(1, 0), (1, 1), (1, 2), (0, 2)]   # ─┐
+    ],                                       # └┘
+    'L': [
+        [(0, 1), (1, 1), (2, 1), (2, 0)],  # ──┐
+        [(1, 0), (1, 1), (1, 2), (2, 2)],  # └─┘
+        [(0, 1), (1, 1), (2, 1), (0, 2)],  # ┌──
+        [(0, 0), (1, 0), (1, 1), (1, 2)]   # │└─
+    ],
+    'O': [
+        [(0, 0), (1, 0), (0, 1), (1, 1)]   # Square
+    ],
+    'S': [
+        [(1, 0), (2, 0), (0, 1), (1, 1)],  # ─┐
+        [(1, 0), (1, 1), (2, 1), (2, 2)]   # └┘
+    ],
+    'T': [
+        [(1, 0), (0, 1), (1, 1), (2, 1)],  # ─┬─
+        [(1, 0), (1, 1), (2, 1), (1, 2)],  # └┼─
+        [(0, 1), (1, 1), (2, 1), (1, 2)],  # ─┼┘
+        [(1, 0), (0, 1), (1, 1), (1, 2)]   # ─┼┐
+    ],                                      # └┘
+    'Z': [
+        [(0, 0), (1, 0), (1, 1), (2, 1)],  # ┌─┐
+        [(2, 0), (1, 1), (2, 1), (1, 2)]   # └─┘
+    ]
+}
+
+# Mapping from piece type to color index
+PIECE_COLORS = {
+    'I': 1,
+    'J': 2,
+    'L': 3,
+    'O': 4,
+    'S': 5,
+    'T': 6,
+    'Z': 7
+}
+
+PANEL_COLOR = (30, 30, 30)
+TEXT_SIZE = 20
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _png_chunk(chunk_type, data):
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def encode_png(image):
+    """
+    Encode an RGB PIL image as PNG, tuned for flat images like these boards.
+
+    Every row uses the PNG "Up" filter (difference to the row above), which
+    turns the many repeated rows into zeros, and the data is compressed with
+    zlib's run-length strategy. For a board that is about twice as fast as
+    PIL's PNG encoder (adaptive filtering) and the files are smaller.
+    """
+    width, height = image.size
+    pixels = np.frombuffer(image.tobytes(), dtype=np.uint8).reshape(height, width * 3)
+    rows = np.empty((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 0] = 2  # filter type Up
+    rows[0, 1:] = pixels[0]
+    np.subtract(pixels[1:], pixels[:-1], out=rows[1:, 1:])
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 15, 9, zlib.Z_RLE)
+    data = compressor.compress(rows) + compressor.flush()
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)  # 8-bit RGB
+    return PNG_SIGNATURE + _png_chunk(b"IHDR", header) + _png_chunk(b"IDAT", data) + _png_chunk(b"IEND", b"")
+
+
+class BoardRenderer:
+    """
+    Renders simulated boards into a reused buffer.
+
+    The buffer is RGBX (4 bytes per pixel, the layout PIL uses for RGB), so
+    PIL can wrap it without converting. Only what changed since the previous
+    render is redrawn: the cells whose color changed, the next-piece preview
+    and the score/level values.
+
+    Args:
+        cell_size (int): Cell size in pixels.
+        width, height (int): Board size in cells.
+        panel_cells (int): Width of the side panel (NEXT/SCORE/LEVEL) in cells.
+    """
+    def __init__(self, cell_size=30, width=10, height=20, panel_cells=6):
+        self.cell_size = cell_size
+        self.width = width
+        self.height = height
+        self.board_width = width * cell_size
+        self.board_height = height * cell_size
+        self.panel_width = panel_cells * cell_size
+        self.size = (self.board_width + self.panel_width, self.board_height)
+
+        self.background = self._draw_background()
+        self.buffer = self.background.copy()
+        self.rgb = self.buffer[..., :3]
+        # Board area seen as (row, pixel row, column, pixel column, RGBX); a block
+        # sprite fills a cell inside its grid lines, i.e. pixels 1..cell_size-1
+        self.cells = self.buffer[:self.board_height, :self.board_width].reshape(
+            height, cell_size, width, cell_size, 4)[:, 1:, :, 1:]
+
+        # Block sprites indexed by color; index 0 (empty) is plain background
+        self.atlas = np.full((len(COLORS), cell_size - 1, cell_size - 1, 4), 255, dtype=np.uint8)
+        for index, color in COLORS.items():
+            self.atlas[index, ..., :3] = color
+
+        # Top-left corner of the next-piece preview in the panel
+        self.next_x = self.board_width + self.panel_width // 2 - cell_size
+        self.next_y = 60
+        self.score_y = 210
+        self.level_y = 290
+
+        # What the buffer currently shows
+        self.grid = np.zeros((height, width), dtype=np.intp)
+        self.drawn_grid = np.zeros((height, width), dtype=np.intp)
+        self.drawn_next = None
+        self.drawn_text = {}
+
+    def _draw_background(self):
+        """Grid lines, side panel and the captions that never change"""
+        image = Image.new('RGB', self.size, COLORS[0])
+        draw = ImageDraw.Draw(image)
+        cell_size = self.cell_size
+
+        for x in range(self.width + 1):
+            draw.line([(x * cell_size, 0), (x * cell_size, self.board_height)], fill=COLORS[9], width=1)
+        for y in range(self.height + 1):
+            draw.line([(0, y * cell_size), (self.board_width, y * cell_size)], fill=COLORS[9], width=1)
+
+        ui_start_x = self.board_width
+        draw.rectangle([ui_start_x, 0, self.size[0], self.size[1]], fill=PANEL_COLOR)
+        draw_text(image, (ui_start_x + 20, 20), "NEXT", size=TEXT_SIZE)
+        draw_text(image, (ui_start_x + 10, 180), "SCORE", size=TEXT_SIZE)
+        draw_text(image, (ui_start_x + 10, 260), "LEVEL", size=TEXT_SIZE)
+        # Watermark to indicate this is a simulated board
+        draw_text(image, (ui_start_x + 10, self.board_height - 30), "SIMULATED", size=TEXT_SIZE, fill=(255, 100, 100))
+        return np.array(image.convert('RGBX'))
+
+    def _restore(self, top, bottom, left=None, right=None):
+        """Copy part of the background back into the buffer"""
+        left = self.board_width if left is None else left
+        right = self.size[0] if right is None else right
+        self.buffer[top:bottom, left:right] = self.background[top:bottom, left:right]
+
+    def _draw_next(self, next_piece):
+        piece_type = next_piece['type'] if next_piece else None
+        if piece_type == self.drawn_next:
+            return
+        # The preview spans at most 4x3 cells
+        self._restore(self.next_y, self.next_y + 3 * self.cell_size)
+        if piece_type:
+            sprite = self.atlas[PIECE_COLORS[piece_type]]
+            # Draw only the first rotation
+            for x, y in PIECE_SHAPES[piece_type][0]:
+                left = self.next_x + x * self.cell_size + 1
+                top = self.next_y + y * self.cell_size + 1
+                self.buffer[top:top + self.cell_size - 1, left:left + self.cell_size - 1] = sprite
+        self.drawn_next = piece_type
+
+    def _draw_value(self, y, value):
+        text = str(value)
+        if self.drawn_text.get(y) == text:
+            return
+        # Values sit in a band of their own between the captions
+        self._restore(y, y + 2 * TEXT_SIZE)
+        draw_text(self.rgb, (self.board_width + 10, y), text, size=TEXT_SIZE)
+        self.drawn_text[y] = text
+
+    def render(self, board_state, current_piece=None, next_piece=None, score=0, level=1):
+        """
+        Render a board into the internal buffer.
+
+        Args:
+            board_state: 2D list (or array) of color indices, height x width.
+            current_piece: Dict with 'type', 'x', 'y', 'rotation', drawn over the board.
+            next_piece: Dict with 'type', shown in the panel.
+            score, level: Values shown under SCORE and LEVEL.
+
+        Returns:
+            numpy.ndarray: The HxWx3 RGB view of the buffer. It is overwritten by
+            the next render, so copy it to keep it, and do not modify it.
+        """
+        grid = self.grid
+        grid[:] = board_state
+        if current_piece:
+            piece_type = current_piece['type']
+            shapes = PIECE_SHAPES[piece_type]
+            rotation = current_piece.get('rotation', 0) % len(shapes)
+            for x, y in shapes[rotation]:
+                x, y = current_piece['x'] + x, current_piece['y'] + y
+                # Cells above or beside the board are not visible
+                if 0 <= x < self.width and 0 <= y < self.height:
+                    grid[y, x] = PIECE_COLORS[piece_type]
+
+        # One sprite per changed cell
+        rows, columns = np.nonzero(grid != self.drawn_grid)
+        if len(rows):
+            self.cells[rows, :, columns] = self.atlas[grid[rows, columns]]
+            self.drawn_grid[:] = grid
+
+        self._draw_next(next_piece)
+        self._draw_value(self.score_y, score)
+        self._draw_value(self.level_y, level)
+        return self.rgb
+
+    def render_image(self, board_state, current_piece=None, next_piece=None, score=0, level=1):
+        """Render a board as a new PIL image"""
+        self.render(board_state, current_piece, next_piece, score, level)
+        # RGBX is PIL's own RGB layout, so this is a plain copy
+        return Image.frombytes('RGB', self.size, self.buffer, 'raw', 'RGBX')
+
+    def render_bytes(self, board_state, current_piece=None, next_piece=None, score=0, level=1,
+                     format="PNG", **save_options):
+        """
+        Render a board straight to encoded image bytes. PNG without options
+        goes through encode_png(); other formats and options use PIL's encoder.
+        """
+        image = self.render_image(board_state, current_piece, next_piece, score, level)
+        if format.upper() == "PNG" and not save_options:
+            return encode_png(image)
+        buffer = BytesIO()
+        image.save(buffer, format=format, **save_options)
+        return buffer.getvalue()
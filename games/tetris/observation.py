@@ -0,0 +1,330 @@
+"""
+Text observations of the simulated Tetris board
+
+With a simulated board the iterators already know the exact board_state,
+current_piece and next_piece, yet they render them to a PNG and ask a vision
+model to read them back. This module encodes the same state as a compact
+text grid or JSON, builds the prompt for it with a template per provider
+family, and computes the board features used to compare move quality.
+
+Observation modes (--observation in tetris_ai_iterator.py):
+    image   the rendered board as a PNG (previous behaviour)
+    text    a text grid plus piece, heights and holes
+    json    the same as JSON
+text and json can also carry a downscaled image (--observation-image-scale).
+
+Each response record in the session log carries the observation mode, the
+prompt/image size and the token usage reported by the API; each move logs a
+"quality" record (lines cleared, holes, heights, bumpiness). The report
+command compares them per model and mode:
+
+Usage:
+    python -m games.tetris.observation show --format text
+    python -m games.tetris.observation report gemini_tetris_outputs o3_tetris_outputs
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+
+import numpy as np
+from PIL import Image
+
+from games.tetris.board_renderer import PIECE_SHAPES, BoardRenderer
+
+OBSERVATION_MODES = ("image", "text", "json")
+
+# The instruction prompts end with this line; text observations replace it
+IMAGE_MARKER = "Here's the current Tetris game state image:"
+
+EMPTY, FILLED, CURRENT = ".", "#", "@"
+
+# Prompt wording per provider family. Claude follows XML-tagged inputs closely;
+# the OpenAI and Gemini models take fenced blocks; Qwen-VL tends to describe
+# an image it was promised, so its template says plainly where the board is.
+PROMPT_TEMPLATES = {
+    "anthropic": ("The current game state is given as {description}{image_note}.\n"
+                  "<tetris_state>\n{observation}\n</tetris_state>"),
+    "openai": "Current game state ({description}{image_note}):\n```{fence}\n{observation}\n```",
+    "gemini": ("Current game state as {description}{image_note}. Row 0 is the top of the board "
+               "and columns are numbered 0-9 from the left.\n```{fence}\n{observation}\n```"),
+    "qwen": ("The Tetris board is written out below as {description}{image_note}, one board row "
+             "per line from the top (row 0) to the bottom (row 19).\n```{fence}\n{observation}\n```"),
+    "default": "Current game state ({description}{image_note}):\n```{fence}\n{observation}\n```",
+}
+
+# The board is exact, so the "describe what you see" step only costs output tokens
+SKIP_DESCRIPTION = "The state above is exact: skip describing the board and go straight to your move."
+
+# The providers' built-in system prompts ask for a description of the image first
+DESCRIBE_STEP = re.compile(r"^([ \t]*)(?:IMPORTANT: )?First,? (?:briefly )?describe what you see on the board[^\n]*\n"
+                           r"[ \t]*Then (\w)", re.MULTILINE)
+
+DESCRIPTIONS = {"text": "a text grid", "json": "JSON"}
+IMAGE_NOTE = ", with a downscaled image of the same board for reference"
+
+
+def prompt_family(model, provider_name=None):
+    """Template family for a model name (and provider name, for direct APIs)."""
+    name = (model or "").lower()
+    if "claude" in name or "anthropic" in name:
+        return "anthropic"
+    if "gemini" in name:
+        return "gemini"
+    if "qwen" in name:
+        return "qwen"
+    if provider_name == "OpenAI" or "openai" in name or "gpt" in name or "o3" in name:
+        return "openai"
+    return "default"
+
+
+def piece_cells(piece):
+    """Board cells (x, y) covered by a piece dict ('type', 'x', 'y', 'rotation')."""
+    shapes = PIECE_SHAPES[piece['type']]
+    rotation = piece.get('rotation', 0) % len(shapes)
+    return [(piece['x'] + x, piece['y'] + y) for x, y in shapes[rotation]]
+
+
+def board_features(board_state):
+    """
+    Heights, holes and bumpiness of a board (list of rows, top row first).
+
+    Returns:
+        dict: heights (per column), max_height, aggregate_height, holes
+        (empty cells below the top filled cell of their column) and bumpiness
+        (sum of height differences between neighbouring columns).
+    """
+    filled = np.asarray(board_state) > 0
+    rows = filled.shape[0]
+    has_block = filled.any(axis=0)
+    top = np.where(has_block, filled.argmax(axis=0), rows)
+    heights = rows - top
+    holes = int(heights.sum() - filled.sum())
+    return {
+        "heights": heights.tolist(),
+        "max_height": int(heights.max()),
+        "aggregate_height": int(heights.sum()),
+        "holes": holes,
+        "bumpiness": int(np.abs(np.diff(heights)).sum()),
+    }
+
+
+def encode_text(board_state, current_piece=None, next_piece=None):
+    """The state as a text grid with column/row numbers, followed by the pieces and features."""
+    width = len(board_state[0])
+    grid = [[FILLED if cell > 0 else EMPTY for cell in row] for row in board_state]
+    cells = piece_cells(current_piece) if current_piece else []
+    for x, y in cells:
+        if 0 <= y < len(grid) and 0 <= x < width:
+            grid[y][x] = CURRENT
+
+    features = board_features(board_state)
+    lines = [f'Board {width}x{len(grid)}, row 0 at the top. "{EMPTY}" empty, "{FILLED}" filled, '
+             f'"{CURRENT}" current piece.',
+             "    " + "".join(str(x % 10) for x in range(width))]
+    lines += [f"{y:>2}  " + "".join(row) for y, row in enumerate(grid)]
+    if current_piece:
+        lines.append(f"Current piece: {current_piece['type']}, rotation {current_piece.get('rotation', 0)}, "
+                     f"cells " + " ".join(f"({x},{y})" for x, y in cells))
+    if next_piece:
+        lines.append(f"Next piece: {next_piece['type']}")
+    lines.append("Column heights: " + " ".join(str(h) for h in features["heights"]))
+    lines.append(f"Holes: {features['holes']}")
+    return "\n".join(lines)
+
+
+def encode_json(board_state, current_piece=None, next_piece=None):
+    """The state as compact JSON: rows as strings (same symbols as the text grid), pieces and features."""
+    features = board_features(board_state)
+    state = {
+        "rows": ["".join(FILLED if cell > 0 else EMPTY for cell in row) for row in board_state],
+        "current": None,
+        "next": next_piece['type'] if next_piece else None,
+        "heights": features["heights"],
+        "holes": features["holes"],
+    }
+    if current_piece:
+        state["current"] = {"type": current_piece['type'], "rotation": current_piece.get('rotation', 0),
+                            "x": current_piece['x'], "y": current_piece['y'],
+                            "cells": [list(cell) for cell in piece_cells(current_piece)]}
+    return json.dumps(state, separators=(",", ":"))
+
+
+ENCODERS = {"text": encode_text, "json": encode_json}
+
+
+def encode_observation(mode, board_state, current_piece=None, next_piece=None):
+    return ENCODERS[mode](board_state, current_piece, next_piece)
+
+
+def build_prompt(instruction_prompt, observation, mode, family="default", with_image=False):
+    """
+    Put an encoded observation into an instruction prompt, in place of the
+    "game state image" line (or at the end if the prompt has none).
+    """
+    state = PROMPT_TEMPLATES.get(family, PROMPT_TEMPLATES["default"]).format(
+        description=DESCRIPTIONS[mode], image_note=IMAGE_NOTE if with_image else "",
+        fence="json" if mode == "json" else "", observation=observation)
+    state += "\n\n" + SKIP_DESCRIPTION
+    if IMAGE_MARKER in instruction_prompt:
+        return instruction_prompt.replace(IMAGE_MARKER, state)
+    return instruction_prompt.rstrip() + "\n\n" + state + "\n"
+
+
+def adapt_system_prompt(system_prompt, mode):
+    """
+    A provider's system prompt for an observation mode. For text and json the
+    "describe what you see" step and the "game state image" line are dropped:
+    the user prompt from build_prompt() carries the state and says whether an
+    image comes with it.
+    """
+    if mode == "image":
+        return system_prompt
+    system_prompt = DESCRIBE_STEP.sub(lambda match: match.group(1) + match.group(2).upper(), system_prompt)
+    return system_prompt.replace(IMAGE_MARKER, "").rstrip() + "\n"
+
+
+def downscale(image, scale):
+    """The board image scaled by `scale` (box filter), to send alongside a text observation."""
+    width, height = image.size
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return image.resize(size, Image.BOX)
+
+
+def estimate_image_tokens(size, family):
+    """
+    Rough input tokens for one image, from the providers' published sizing rules
+    (OpenAI high detail, Claude, Gemini 2.0, Qwen2.5-VL). Actual counts come
+    from the API usage logged with each response.
+    """
+    width, height = size
+    if family == "openai":
+        scale = min(1.0, 2048 / max(width, height))
+        width, height = width * scale, height * scale
+        scale = min(1.0, 768 / min(width, height))
+        return 85 + 170 * math.ceil(width * scale / 512) * math.ceil(height * scale / 512)
+    if family == "anthropic":
+        scale = min(1.0, 1568 / max(width, height))
+        return math.ceil(width * scale * height * scale / 750)
+    if family == "gemini":
+        if width <= 384 and height <= 384:
+            return 258
+        return 258 * math.ceil(width / 768) * math.ceil(height / 768)
+    # Qwen2.5-VL and default: one token per 28x28 patch
+    return math.ceil(width / 28) * math.ceil(height / 28) + 2
+
+
+def text_token_counter():
+    """(count, name): tiktoken's o200k_base encoding if available, else about 4 characters per token."""
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("o200k_base")
+        return (lambda text: len(encoding.encode(text))), "tiktoken o200k_base"
+    except Exception:
+        return (lambda text: math.ceil(len(text) / 4)), "~4 characters per token"
+
+
+def show(mode, scale, seed):
+    """Print an observation for a random board and the request size of each mode."""
+    rng = random.Random(seed)
+    board = [[rng.randint(1, 7) if y > 11 and rng.random() < 0.6 else 0 for x in range(10)] for y in range(20)]
+    current_piece = {'type': rng.choice("IJLOSTZ"), 'x': 4, 'y': 0, 'rotation': 0}
+    next_piece = {'type': rng.choice("IJLOSTZ")}
+    image = BoardRenderer().render_image(board, current_piece, next_piece)
+    count_text_tokens, tokenizer = text_token_counter()
+
+    print(encode_observation(mode, board, current_piece, next_piece) if mode != "image" else f"(image {image.size})")
+    print()
+    print(f"{'observation':<22}" + "".join(f"{family:>11}" for family in PROMPT_TEMPLATES if family != "default"))
+    for variant in ("image", "text", "json", f"text+image@{scale}", f"json+image@{scale}"):
+        row = f"{variant:<22}"
+        for family in PROMPT_TEMPLATES:
+            if family == "default":
+                continue
+            tokens = 0
+            if variant != "image":
+                text_mode = variant.split("+")[0]
+                tokens += count_text_tokens(encode_observation(text_mode, board, current_piece, next_piece))
+            if variant == "image":
+                tokens += estimate_image_tokens(image.size, family)
+            elif "+image" in variant:
+                tokens += estimate_image_tokens(downscale(image, scale).size, family)
+            row += f"{tokens:>11}"
+        print(row)
+    print(f"(input tokens for the board only; text counted with {tokenizer}, "
+          f"images estimated from published sizing rules)")
+
+
+def read_session(path):
+    """Per-iteration records of one session log, grouped as (model, observation) -> list of dicts."""
+    model, observation = None, "image"
+    rows = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            event = record.get("event")
+            if event == "session_start":
+                model = record.get("model", model)
+                observation = record.get("observation", observation)
+            elif event in ("response", "quality"):
+                iteration = record.get("iteration")
+                row = rows.setdefault(iteration, {"model": model, "observation": record.get("observation", observation)})
+                row.update({key: value for key, value in record.items() if key not in ("event", "ts", "iteration")})
+    return list(rows.values())
+
+
+def report(roots):
+    """Token usage, latency and move quality per (model, observation) over all session logs under `roots`."""
+    groups = {}
+    for root in roots:
+        for directory, _, files in os.walk(root):
+            if "session_log.jsonl" in files:
+                for row in read_session(os.path.join(directory, "session_log.jsonl")):
+                    groups.setdefault((row.get("model"), row.get("observation") or "image"), []).append(row)
+
+    def mean(rows, key):
+        values = [row[key] for row in rows if row.get(key) is not None]
+        return f"{np.mean(values):.1f}" if values else "-"
+
+    def p50(rows, key):
+        values = [row[key] for row in rows if row.get(key) is not None]
+        return f"{np.percentile(values, 50):.2f}" if values else "-"
+
+    columns = ["model", "observation", "n", "prompt_tok", "output_tok", "latency_p50",
+               "lines/move", "holes", "max_height", "bumpiness", "no_action"]
+    print("  ".join(columns))
+    for (model, observation), rows in sorted(groups.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+        moves = [row for row in rows if "holes" in row]
+        no_action = sum(1 for row in moves if not row.get("pieces"))
+        print("  ".join([str(model), observation, str(len(rows)), mean(rows, "prompt_tokens"),
+                         mean(rows, "completion_tokens"), p50(rows, "latency"), mean(moves, "lines"),
+                         mean(moves, "holes"), mean(moves, "max_height"), mean(moves, "bumpiness"),
+                         f"{no_action}/{len(moves)}"]))
+    return groups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text observations of the simulated Tetris board")
+    commands = parser.add_subparsers(dest="command", required=True)
+    show_parser = commands.add_parser("show", help="Print an observation and the board's token cost per mode")
+    show_parser.add_argument("--format", choices=OBSERVATION_MODES, default="text", help="Observation to print.")
+    show_parser.add_argument("--scale", type=float, default=0.5, help="Scale of the image sent with text/json.")
+    show_parser.add_argument("--seed", type=int, default=0, help="Seed for the random board.")
+    report_parser = commands.add_parser("report", help="Compare recorded sessions per model and observation mode")
+    report_parser.add_argument("roots", nargs="+", help="Output directories to search for session_log.jsonl")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        show(args.format, args.scale, args.seed)
+    else:
+        report(args.roots)
+
+
+if __name__ == "__main__":
+    main()
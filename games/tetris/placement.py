@@ -0,0 +1,301 @@
+"""
+Precomputed Tetris placement macros
+
+A Tetris move is really a target placement (piece orientation and column),
+but models spell it out as long runs of left/right/up presses. A
+PlacementTable is built once per rule set by a breadth-first search over
+the engine's own move/rotate/kick rules starting from the spawn position.
+It maps (piece, spawn, orientation, column) to the shortest key sequence
+that gets there, so a model can answer with placements only:
+
+    place T 1 3          T piece, rotated once, leftmost cell in column 3
+    place I 0 0
+
+Each placement expands to its macro plus a hard drop ("space") and the
+whole response is submitted as one action sequence. Macros assume the
+spawn area is clear, which is the normal case right after a piece spawns.
+
+Rule sets:
+- GameStateRules: games/tetris/simple_tetris.py (the engine itself is
+  stepped; rotation has no kicks and pieces spawn centred per width).
+- OffsetRules: the simulated boards of the tetris_*_iterator.py scripts
+  (offset tables, rotation kicks one column right, then left).
+
+Usage:
+    from games.tetris.placement import simple_tetris_table
+
+    table = simple_tetris_table()
+    table.macro("T", 1, 3)            # ('left', 'up')
+    actions = table.compile(response_code)
+"""
+
+import functools
+import re
+from collections import deque
+
+from tools.actions import compile_actions
+
+# Keys the search may use, in tie-break order (prefer sideways moves and rotations over soft drops)
+MOVE_KEYS = ("left", "right", "up", "down")
+
+# Soft drops allowed while reaching a placement (needed where a rotation does not fit at the top row)
+MAX_DROP = 2
+
+PLACEMENT_PATTERN = re.compile(r"^\s*place\s+([IJLOSTZ])\s+(\d+)\s+(-?\d+)\s*(?:#.*)?$", re.IGNORECASE | re.MULTILINE)
+
+
+def normalize(cells):
+    """Cells shifted so the top-left of their bounding box is (0, 0)."""
+    min_x = min(x for x, _ in cells)
+    min_y = min(y for _, y in cells)
+    return frozenset((x - min_x, y - min_y) for x, y in cells)
+
+
+class GameStateRules:
+    """
+    Rules of games/tetris/simple_tetris.py, applied by stepping a GameState
+    with an empty grid. States are (rotation, shape, x, y).
+    """
+    name = "simple_tetris"
+    PIECES = "IOTSZJL"  # order of simple_tetris.SHAPES
+
+    def __init__(self):
+        from games.tetris.simple_tetris import GameState, SHAPES, SHAPE_COLORS
+        self.shapes = SHAPES
+        self.colors = SHAPE_COLORS
+        self.game = GameState(seed=0)
+        self.width = len(self.game.grid[0])
+
+    def pieces(self):
+        return self.PIECES
+
+    def _load(self, piece, state):
+        rotation, shape, x, y = state
+        index = self.PIECES.index(piece)
+        self.game.current_piece = {'index': index, 'shape': [list(row) for row in shape],
+                                   'color': self.colors[index], 'rotation': rotation}
+        self.game.piece_x, self.game.piece_y = x, y
+
+    def _save(self):
+        piece = self.game.current_piece
+        return (piece['rotation'], tuple(tuple(row) for row in piece['shape']), self.game.piece_x, self.game.piece_y)
+
+    def spawn(self, piece):
+        index = self.PIECES.index(piece)
+        self.game.next_piece = {'index': index, 'shape': self.shapes[index], 'color': self.colors[index], 'rotation': 0}
+        self.game.spawn_piece()
+        return self._save()
+
+    def step(self, piece, state, key):
+        """State after pressing `key`, or None if the engine rejects the move."""
+        self._load(piece, state)
+        if key == "left":
+            moved = self.game.move_left()
+        elif key == "right":
+            moved = self.game.move_right()
+        elif key == "up":
+            moved = self.game.rotate_piece()
+        else:
+            # move_down() would lock the piece on failure, so only test the position
+            self.game.piece_y += 1
+            moved = self.game.is_valid_position()
+        return self._save() if moved else None
+
+    def cells(self, piece, state):
+        _, shape, x, y = state
+        return [(x + cx, y + cy) for cy, row in enumerate(shape) for cx, cell in enumerate(row) if cell]
+
+    def depth(self, state, spawn):
+        return state[3] - spawn[3]
+
+
+class OffsetRules:
+    """
+    Rules of the simulated boards in the tetris_*_iterator.py scripts: pieces
+    are lists of (x, y) offsets per rotation, spawn at (4, 0), and a blocked
+    rotation is retried one column right, then one column left. States are
+    (rotation, x, y).
+
+    Args:
+        piece_shapes (dict): Piece type -> list of rotations, each a list of (x, y) offsets.
+        width, height (int): Board size.
+        spawn_x, spawn_y (int): Spawn position of every piece.
+    """
+    name = "iterator"
+
+    def __init__(self, piece_shapes, width=10, height=20, spawn_x=4, spawn_y=0):
+        self.piece_shapes = piece_shapes
+        self.width = width
+        self.height = height
+        self.spawn_x = spawn_x
+        self.spawn_y = spawn_y
+
+    def pieces(self):
+        return "".join(sorted(self.piece_shapes))
+
+    def spawn(self, piece):
+        return (0, self.spawn_x, self.spawn_y)
+
+    def cells(self, piece, state):
+        rotation, x, y = state
+        return [(x + dx, y + dy) for dx, dy in self.piece_shapes[piece][rotation]]
+
+    def _valid(self, piece, state):
+        return all(0 <= x < self.width and 0 <= y < self.height for x, y in self.cells(piece, state))
+
+    def step(self, piece, state, key):
+        rotation, x, y = state
+        if key == "up":
+            rotation = (rotation + 1) % len(self.piece_shapes[piece])
+            for kick in (0, 1, -1):
+                if self._valid(piece, (rotation, x + kick, y)):
+                    return (rotation, x + kick, y)
+            return None
+        moved = {"left": (rotation, x - 1, y), "right": (rotation, x + 1, y), "down": (rotation, x, y + 1)}[key]
+        return moved if self._valid(piece, moved) else None
+
+    def depth(self, state, spawn):
+        return state[2] - spawn[2]
+
+
+class PlacementTable:
+    """
+    Shortest key sequences to every reachable (orientation, column) of every
+    piece, searched once per spawn position.
+
+    Orientation i is the shape reached by pressing "up" i times from the
+    piece's current orientation (the spawn orientation unless macro() is
+    given the live piece's state); column is the leftmost column the piece
+    occupies.
+
+    Args:
+        rules: GameStateRules or OffsetRules.
+        max_drop (int): Soft drops the search may use.
+    """
+    def __init__(self, rules, max_drop=MAX_DROP):
+        self.rules = rules
+        self.max_drop = max_drop
+        self.orientations = {}
+        self.table = {}
+        self.searched = set()
+        for piece in rules.pieces():
+            self._search(piece, rules.spawn(piece))
+
+    def _shape(self, piece, state):
+        return normalize(self.rules.cells(piece, state))
+
+    def _orientations(self, piece, spawn):
+        # Rotate in open space (a few rows down) so every orientation fits
+        state = spawn
+        for _ in range(self.max_drop + 2):
+            state = self.rules.step(piece, state, "down") or state
+        shapes = []
+        for _ in range(8):
+            shape = self._shape(piece, state)
+            if shape not in shapes:
+                shapes.append(shape)
+            state = self.rules.step(piece, state, "up")
+            if state is None:
+                break
+        return shapes
+
+    def _search(self, piece, spawn):
+        if piece not in self.orientations:
+            self.orientations[piece] = self._orientations(piece, spawn)
+        shapes = self.orientations[piece]
+        self.searched.add((piece, spawn))
+
+        paths = {spawn: ()}
+        queue = deque([spawn])
+        while queue:
+            state = queue.popleft()
+            path = paths[state]
+            cells = self.rules.cells(piece, state)
+            shape = normalize(cells)
+            if shape in shapes:
+                key = (piece, spawn, shapes.index(shape), min(x for x, _ in cells))
+                self.table.setdefault(key, path)
+            for move in MOVE_KEYS:
+                following = self.rules.step(piece, state, move)
+                if following is None or following in paths:
+                    continue
+                if self.rules.depth(following, spawn) > self.max_drop:
+                    continue
+                paths[following] = path + (move,)
+                queue.append(following)
+
+    def orientation(self, piece, state, start=None):
+        """Orientation number of a piece state, counted from the orientation of `start` (default: spawn)."""
+        shapes = self.orientations[piece]
+        base = shapes.index(self._shape(piece, start)) if start is not None else 0
+        return (shapes.index(self._shape(piece, state)) - base) % len(shapes)
+
+    def macro(self, piece, orientation, column, spawn=None):
+        """
+        Shortest key sequence from `spawn` (default: the piece's spawn state)
+        to the placement, or None if it cannot be reached. `orientation`
+        counts clockwise rotations from the orientation at `spawn`.
+        """
+        piece = piece.upper()
+        if piece not in self.rules.pieces():
+            return None
+        if spawn is None:
+            spawn = self.rules.spawn(piece)
+        if (piece, spawn) not in self.searched:
+            self._search(piece, spawn)
+        shapes = self.orientations[piece]
+        orientation = (shapes.index(self._shape(piece, spawn)) + orientation) % len(shapes)
+        return self.table.get((piece, spawn, orientation, column))
+
+    def placements(self, piece):
+        """(orientation, column) pairs reachable from the piece's spawn."""
+        spawn = self.rules.spawn(piece)
+        return sorted((rotation, column) for p, s, rotation, column in self.table if p == piece and s == spawn)
+
+    def placement_actions(self, text, spawn=None):
+        """
+        Actions for every "place <piece> <orientation> <column>" line in `text`,
+        each followed by a hard drop; None if there are no placement lines.
+        Unreachable placements are reported and skipped.
+
+        `spawn` is the state of the piece in play, if it has already moved or
+        rotated; it applies to the first placement, later ones start at spawn.
+        """
+        matches = PLACEMENT_PATTERN.findall(text or "")
+        if not matches:
+            return None
+        actions = []
+        for index, (piece, orientation, column) in enumerate(matches):
+            keys = self.macro(piece, int(orientation), int(column), spawn=spawn if index == 0 else None)
+            if keys is None:
+                print(f"[Placement] No macro for place {piece} {orientation} {column}, skipped")
+                continue
+            actions.extend(("press", key) for key in keys)
+            actions.append(("press", "space"))
+        return actions
+
+    def compile(self, code, spawn=None):
+        """Placement lines expanded through the table, otherwise compile_actions(code)."""
+        actions = self.placement_actions(code, spawn)
+        if actions is None:
+            return compile_actions(code)
+        return tuple(actions)
+
+
+@functools.lru_cache(maxsize=None)
+def simple_tetris_table():
+    """Shared PlacementTable for games/tetris/simple_tetris.py."""
+    return PlacementTable(GameStateRules())
+
+
+PLACEMENT_PROMPT = """
+Instead of individual key presses you may answer with target placements, one per line:
+
+```
+place <piece> <rotation> <column>
+```
+
+<piece> is I, J, L, O, S, T or Z, <rotation> is how many times the piece is rotated clockwise
+from its current orientation, and <column> is the leftmost column (0-9) the piece should occupy.
+Each placement is moved, rotated and hard-dropped for you.
+"""
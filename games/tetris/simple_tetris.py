@@ -12,6 +12,14 @@ import time
 import os
 import threading
 
+# 添加项目根目录到Python路径，以便直接运行本文件时也能导入games包
+project_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from games.sim_clock import SimClock, FAST, add_clock_arguments, clock_from_args
+from games.key_ipc import add_ipc_arguments, server_from_args
+
 # 确保总是使用图形界面模式
 # 注释掉原来的终端检测代码
 # if os.environ.get('TERM') or os.environ.get('PROMPT'):
@@ -22,11 +30,6 @@ import threading
 # 强制使用图形界面模式
 os.environ['SDL_VIDEO_CENTERED'] = '1'  # 居中显示窗口
 
-# 增加调试输出
-print("Starting Simple Tetris game...")
-print(f"Python version: {sys.version}")
-print(f"Current directory: {os.getcwd()}")
-
 # 游戏常量
 BLOCK_SIZE = 30
 GRID_WIDTH = 10
@@ -65,7 +68,9 @@ SHAPE_COLORS = [CYAN, YELLOW, MAGENTA, GREEN, RED, BLUE, ORANGE]
 
 # 游戏状态
 class GameState:
-    def __init__(self):
+    def __init__(self, seed=None, rng=None):
+        # 独立的随机数流，保证相同seed产生相同的方块序列
+        self.rng = rng if rng is not None else random.Random(seed)
         self.score = 0
         self.level = 1
         self.lines_cleared = 0
@@ -84,8 +89,9 @@ class GameState:
         
     def generate_new_piece(self):
         # 随机选择一个方块
-        shape_idx = random.randint(0, len(SHAPES) - 1)
+        shape_idx = self.rng.randint(0, len(SHAPES) - 1)
         return {
+            'index': shape_idx,
             'shape': SHAPES[shape_idx],
             'color': SHAPE_COLORS[shape_idx],
             'rotation': 0
@@ -260,6 +266,55 @@ class GameState:
             self.last_fall_time = current_time
             self.move_down()
     
+    def snapshot(self):
+        """保存完整游戏状态（包括随机数流位置），开销为O(网格大小)
+
+        Returns:
+            dict: 可传给restore()的快照
+        """
+        return {
+            'grid': tuple(tuple(row) for row in self.grid),
+            'current_piece': dict(self.current_piece) if self.current_piece else None,
+            'next_piece': dict(self.next_piece) if self.next_piece else None,
+            'piece_x': self.piece_x,
+            'piece_y': self.piece_y,
+            'score': self.score,
+            'level': self.level,
+            'lines_cleared': self.lines_cleared,
+            'game_over': self.game_over,
+            'fall_speed': self.fall_speed,
+            'last_fall_time': self.last_fall_time,
+            'moves_made': tuple(self.moves_made),
+            'paused': self.paused,
+            'auto_fall': self.auto_fall,
+            'ai_control': self.ai_control,
+            'rng_state': self.rng.getstate(),
+        }
+
+    def restore(self, snapshot):
+        """从snapshot()返回的快照恢复游戏状态
+
+        Args:
+            snapshot (dict): 之前保存的快照
+        """
+        # 方块形状在旋转时会整体替换而不是原地修改，因此浅拷贝即可
+        self.grid = [list(row) for row in snapshot['grid']]
+        self.current_piece = dict(snapshot['current_piece']) if snapshot['current_piece'] else None
+        self.next_piece = dict(snapshot['next_piece']) if snapshot['next_piece'] else None
+        self.piece_x = snapshot['piece_x']
+        self.piece_y = snapshot['piece_y']
+        self.score = snapshot['score']
+        self.level = snapshot['level']
+        self.lines_cleared = snapshot['lines_cleared']
+        self.game_over = snapshot['game_over']
+        self.fall_speed = snapshot['fall_speed']
+        self.last_fall_time = snapshot['last_fall_time']
+        self.moves_made = list(snapshot['moves_made'])
+        self.paused = snapshot['paused']
+        self.auto_fall = snapshot['auto_fall']
+        self.ai_control = snapshot['ai_control']
+        self.rng.setstate(snapshot['rng_state'])
+
     def get_state_for_ai(self):
         """返回当前游戏状态的简洁表示，供AI分析"""
         state = {
@@ -281,21 +336,80 @@ class GameState:
 
 # 游戏渲染器
 class GameRenderer:
+    # 文字缓存的上限，分数等文字会不断变化，超过后清空重建
+    TEXT_CACHE_SIZE = 256
+
     def __init__(self, game_state):
         self.game_state = game_state
         self.font = None
-        
+        self.large_font = None
+        self.text_cache = {}
+        self.invalidate()
+
     def initialize(self):
         try:
             pygame.init()
             self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
             pygame.display.set_caption("Simple Tetris")
+            # 字体只创建一次，避免每帧调用SysFont
             self.font = pygame.font.SysFont(None, 24)
+            self.large_font = pygame.font.SysFont(None, 48)
+            self.invalidate()
             return True
         except Exception as e:
             print(f"Failed to initialize renderer: {e}")
             return False
-    
+
+    def invalidate(self):
+        """丢弃上一帧的记录，下一次render()整屏重绘（窗口被遮挡或重新显示时调用）"""
+        self.drawn_cells = None
+        self.drawn_panel = None
+        self.drawn_status = None
+        self.drawn_status_rects = []
+        self.drawn_game_over = False
+
+    def render_text(self, text, color, font=None):
+        """返回缓存的文字Surface，相同的文字只渲染一次"""
+        font = font or self.font
+        key = (text, color, id(font))
+        surface = self.text_cache.get(key)
+        if surface is None:
+            if len(self.text_cache) >= self.TEXT_CACHE_SIZE:
+                self.text_cache.clear()
+            surface = font.render(text, True, color)
+            self.text_cache[key] = surface
+        return surface
+
+    def cell_colors(self):
+        """当前帧每个格子的颜色（已放置方块加当前方块，0表示空）"""
+        colors = [row[:] for row in self.game_state.grid]
+        piece = self.game_state.current_piece
+        if piece:
+            for y, row in enumerate(piece['shape']):
+                for x, cell in enumerate(row):
+                    gx, gy = self.game_state.piece_x + x, self.game_state.piece_y + y
+                    if cell and 0 <= gx < GRID_WIDTH and 0 <= gy < GRID_HEIGHT:
+                        colors[gy][gx] = piece['color']
+        return colors
+
+    def panel_state(self):
+        """右侧信息栏的内容，变化时才重绘信息栏"""
+        state = self.game_state
+        next_piece = state.next_piece
+        preview = (tuple(map(tuple, next_piece['shape'])), next_piece['color']) if next_piece else None
+        return preview, state.score, state.level, state.lines_cleared
+
+    def status_state(self):
+        return self.game_state.ai_control, self.game_state.auto_fall, self.game_state.paused
+
+    def draw_cell(self, x, y, color):
+        rect = (x * BLOCK_SIZE, y * BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE)
+        self.screen.fill(BLACK, rect)
+        pygame.draw.rect(self.screen, GRAY, rect, 1)
+        if color:
+            pygame.draw.rect(self.screen, color, rect)
+        return pygame.Rect(rect)
+
     def draw_grid(self):
         # 绘制网格背景
         for y in range(GRID_HEIGHT):
@@ -347,7 +461,7 @@ class GameRenderer:
         preview_y = 100
         
         # 绘制预览标题
-        text = self.font.render("Next:", True, WHITE)
+        text = self.render_text("Next:", WHITE)
         self.screen.blit(text, (preview_x, preview_y - 30))
         
         # 绘制预览方块
@@ -367,15 +481,15 @@ class GameRenderer:
         score_y = 250
         
         # 分数
-        score_text = self.font.render(f"Score: {self.game_state.score}", True, WHITE)
+        score_text = self.render_text(f"Score: {self.game_state.score}", WHITE)
         self.screen.blit(score_text, (score_x, score_y))
         
         # 等级
-        level_text = self.font.render(f"Level: {self.game_state.level}", True, WHITE)
+        level_text = self.render_text(f"Level: {self.game_state.level}", WHITE)
         self.screen.blit(level_text, (score_x, score_y + 30))
         
         # 行数
-        lines_text = self.font.render(f"Lines: {self.game_state.lines_cleared}", True, WHITE)
+        lines_text = self.render_text(f"Lines: {self.game_state.lines_cleared}", WHITE)
         self.screen.blit(lines_text, (score_x, score_y + 60))
     
     def draw_game_over(self):
@@ -388,68 +502,130 @@ class GameRenderer:
         self.screen.blit(overlay, (0, 0))
         
         # 游戏结束文本
-        font = pygame.font.SysFont(None, 48)
-        text = font.render("Game Over", True, RED)
+        text = self.render_text("Game Over", RED, self.large_font)
         text_rect = text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
         self.screen.blit(text, text_rect)
         
         # 分数
-        score_text = self.font.render(f"Final Score: {self.game_state.score}", True, WHITE)
+        score_text = self.render_text(f"Final Score: {self.game_state.score}", WHITE)
         score_rect = score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
         self.screen.blit(score_text, score_rect)
         
         # 重新开始提示
-        restart_text = self.font.render("Press R to restart", True, WHITE)
+        restart_text = self.render_text("Press R to restart", WHITE)
         restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50))
         self.screen.blit(restart_text, restart_rect)
     
-    def draw_ai_status(self):
-        """绘制AI状态信息"""
+    def status_texts(self):
+        """AI状态等叠加在游戏区域上的文字及其位置"""
         # 创建状态文本
         ai_status = "AI: ON" if self.game_state.ai_control else "AI: OFF"
         auto_fall = "Auto Fall: ON" if self.game_state.auto_fall else "Auto Fall: OFF"
         
-        # 绘制AI状态
-        ai_text = self.font.render(ai_status, True, WHITE)
-        ai_rect = ai_text.get_rect()
-        ai_rect.topleft = (10, 10)
-        self.screen.blit(ai_text, ai_rect)
-        
-        # 绘制自动下落状态
-        fall_text = self.font.render(auto_fall, True, WHITE)
-        fall_rect = fall_text.get_rect()
-        fall_rect.topleft = (10, 40)
-        self.screen.blit(fall_text, fall_rect)
+        ai_text = self.render_text(ai_status, WHITE)
+        fall_text = self.render_text(auto_fall, WHITE)
+        texts = [
+            (ai_text, ai_text.get_rect(topleft=(10, 10))),
+            (fall_text, fall_text.get_rect(topleft=(10, 40))),
+        ]
         
         # 如果游戏暂停，显示暂停状态
         if self.game_state.paused:
-            pause_text = self.font.render("PAUSED", True, YELLOW)
-            pause_rect = pause_text.get_rect()
-            pause_rect.center = (SCREEN_WIDTH // 2, 50)
-            self.screen.blit(pause_text, pause_rect)
+            pause_text = self.render_text("PAUSED", YELLOW)
+            texts.append((pause_text, pause_text.get_rect(center=(SCREEN_WIDTH // 2, 50))))
+        return texts
+
+    def draw_ai_status(self):
+        """绘制AI状态信息"""
+        for text, rect in self.status_texts():
+            self.screen.blit(text, rect)
     
     def render(self):
         try:
-            # 清屏
-            self.screen.fill(BLACK)
-            
-            # 绘制游戏元素
-            self.draw_grid()
-            self.draw_current_piece()
-            self.draw_next_piece()
-            self.draw_score()
-            self.draw_ai_status()
-            self.draw_game_over()
-            
-            # 更新屏幕
-            pygame.display.flip()
+            cells = self.cell_colors()
+            panel = self.panel_state()
+            status = self.status_state()
+            game_over = self.game_state.game_over
+
+            if (self.drawn_cells is not None and cells == self.drawn_cells and panel == self.drawn_panel and
+                    status == self.drawn_status and game_over == self.drawn_game_over):
+                # 画面没有变化，不需要重绘
+                return
+
+            if self.drawn_cells is None or game_over or self.drawn_game_over:
+                # 首帧、游戏结束覆盖层或重新开始：整屏重绘
+                self.screen.fill(BLACK)
+                self.draw_grid()
+                self.draw_current_piece()
+                self.draw_next_piece()
+                self.draw_score()
+                self.draw_ai_status()
+                self.draw_game_over()
+                pygame.display.flip()
+                self.drawn_status_rects = [rect for _, rect in self.status_texts()]
+            else:
+                self.render_dirty(cells, panel, status)
+
+            self.drawn_cells = cells
+            self.drawn_panel = panel
+            self.drawn_status = status
+            self.drawn_game_over = game_over
         except Exception as e:
             print(f"Render error: {e}")
 
+    def cells_under(self, rect):
+        """与rect相交的所有格子坐标"""
+        return [(x, y)
+                for y in range(max(0, rect.top // BLOCK_SIZE), min(GRID_HEIGHT, (rect.bottom - 1) // BLOCK_SIZE + 1))
+                for x in range(max(0, rect.left // BLOCK_SIZE), min(GRID_WIDTH, (rect.right - 1) // BLOCK_SIZE + 1))]
+
+    def render_dirty(self, cells, panel, status):
+        """只重绘变化的格子和信息栏，并用pygame.display.update(rects)提交"""
+        dirty = set()
+        for y in range(GRID_HEIGHT):
+            for x in range(GRID_WIDTH):
+                if cells[y][x] != self.drawn_cells[y][x]:
+                    dirty.add((x, y))
+
+        # 状态文字叠加在格子上：文字变化、或其下方格子需要重绘时，
+        # 文字覆盖的格子全部重绘后再画文字（文字带透明度，不能在旧文字上重复叠加）
+        status_texts = self.status_texts()
+        old_rects = self.drawn_status_rects
+        new_rects = [rect for _, rect in status_texts]
+        all_rects = old_rects + new_rects
+        touched = set(range(len(all_rects))) if status != self.drawn_status else set()
+        while True:
+            for i in touched:
+                dirty.update(self.cells_under(all_rects[i]))
+            grown = {i for i, rect in enumerate(all_rects)
+                     if i not in touched and dirty.intersection(self.cells_under(rect))}
+            if not grown:
+                break
+            touched |= grown
+
+        rects = [self.draw_cell(x, y, cells[y][x]) for x, y in dirty]
+
+        if panel != self.drawn_panel:
+            panel_rect = pygame.Rect(GRID_WIDTH * BLOCK_SIZE, 0,
+                                     SCREEN_WIDTH - GRID_WIDTH * BLOCK_SIZE, SCREEN_HEIGHT)
+            self.screen.fill(BLACK, panel_rect)
+            self.draw_next_piece()
+            self.draw_score()
+            rects.append(panel_rect)
+
+        for i, (text, rect) in enumerate(status_texts):
+            if len(old_rects) + i in touched:
+                self.screen.blit(text, rect)
+
+        pygame.display.update(rects)
+        self.drawn_status_rects = new_rects
+
 # AI控制类
 class AIController:
-    def __init__(self, game_state):
+    def __init__(self, game_state, rng=None):
         self.game_state = game_state
+        # AI使用独立的随机数流，避免影响方块序列
+        self.rng = rng if rng is not None else random.Random()
         self.last_move_time = 0
         self.move_delay = 0.05  # 减少AI移动间隔时间（秒），原来为0.1
         self.command_queue = []  # 添加命令队列
@@ -488,7 +664,7 @@ class AIController:
             if not self.game_state.is_valid_position():
                 self.game_state.piece_y = current_y
                 # 如果无法下移，可能需要锁定方块
-                if random.random() < 0.1:  # 10%的概率触发drop操作
+                if self.rng.random() < 0.1:  # 10%的概率触发drop操作
                     self.execute_action("drop")
                     self.move_count_for_current_piece = 0  # 重置计数器
                     self.last_piece_move_time = current_time
@@ -516,7 +692,7 @@ class AIController:
         # 在实际应用中，这里可以由Claude等AI模型替代
         actions = ["left", "right", "rotate", "drop"]
         weights = [0.3, 0.3, 0.3, 0.1]  # 权重决定选择不同动作的概率
-        action = random.choices(actions, weights=weights, k=1)[0]
+        action = self.rng.choices(actions, weights=weights, k=1)[0]
         
         # 执行选择的动作
         success = self.execute_action(action)
@@ -528,7 +704,7 @@ class AIController:
                 self.game_state.moves_made.pop(0)  # 保持最近10次移动的记录
                 
             # 更新方块操作计数
-            self.last_piece_move_time = time.time()
+            self.last_piece_move_time = current_time
             self.move_count_for_current_piece += 1
             
             # 如果是drop命令，重置计数器
@@ -573,11 +749,13 @@ class AIController:
 
 # 主游戏类
 class SimpleTetris:
-    def __init__(self):
-        self.game_state = GameState()
+    def __init__(self, seed=None, clock=None):
+        self.game_state = GameState(seed=seed)
         self.renderer = GameRenderer(self.game_state)
-        self.ai = AIController(self.game_state)
-        self.clock = pygame.time.Clock()
+        self.ai = AIController(self.game_state,
+                               rng=random.Random(f"{seed}-ai") if seed is not None else None)
+        # 游戏时间由虚拟时钟提供：realtime与原来一致，fixed/fast按固定步长推进，保证可复现
+        self.clock = clock if clock is not None else SimClock(fps=60)
         self.running = False
     
     def handle_events(self):
@@ -585,11 +763,14 @@ class SimpleTetris:
             if event.type == pygame.QUIT:
                 self.running = False
                 print("QUIT event received. Closing the game.")
+            elif event.type == pygame.VIDEOEXPOSE:
+                # 窗口内容可能已失效，下一帧整屏重绘
+                self.renderer.invalidate()
             elif event.type == pygame.KEYDOWN:
                 print(f"Key pressed: {pygame.key.name(event.key)}")
                 if event.key == pygame.K_r and self.game_state.game_over:
-                    # 重新开始游戏
-                    self.game_state = GameState()
+                    # 重新开始游戏（沿用同一随机数流）
+                    self.game_state = GameState(rng=self.game_state.rng)
                     self.renderer.game_state = self.game_state
                     self.ai.game_state = self.game_state
                     self.game_state.spawn_piece()
@@ -635,7 +816,12 @@ class SimpleTetris:
                     elif event.key == pygame.K_SPACE:
                         self.game_state.drop_piece()
     
-    def run(self):
+    def run(self, max_frames=None):
+        """运行游戏主循环
+
+        Args:
+            max_frames (int, optional): 运行指定帧数后退出，用于快进评测；None表示一直运行
+        """
         print("Initializing SimpleTetris game...")
         
         # 初始化Pygame
@@ -663,6 +849,7 @@ class SimpleTetris:
             
         self.running = True
         print("Game running... Press ESC to quit, A to toggle AI control")
+        print(f"Clock mode: {self.clock.mode}, {self.clock.fps} FPS")
         
         # 主游戏循环
         frame_count = 0
@@ -673,8 +860,8 @@ class SimpleTetris:
                 # 处理事件
                 self.handle_events()
                 
-                # 获取当前时间
-                current_time = time.time()
+                # 获取当前游戏时间
+                current_time = self.clock.now()
                 
                 # 更新游戏状态
                 self.game_state.update(current_time)
@@ -682,15 +869,18 @@ class SimpleTetris:
                 # AI控制
                 self.ai.update(current_time)
                 
-                # 渲染游戏
-                self.renderer.render()
+                # 渲染游戏（快进模式下按设置跳过）
+                if self.clock.should_render():
+                    self.renderer.render()
                 
                 # 控制帧率
-                self.clock.tick(60)
+                self.clock.tick()
                 
                 # 计算帧率
                 frame_count += 1
-                if frame_count % 100 == 0:
+                if max_frames is not None and frame_count >= max_frames:
+                    self.running = False
+                if frame_count % (10000 if self.clock.mode == FAST else 100) == 0:
                     elapsed = time.time() - start_time
                     fps = frame_count / elapsed if elapsed > 0 else 0
                     print(f"FPS: {fps:.1f}, Frames: {frame_count}, Time: {elapsed:.1f}s")
@@ -741,6 +931,11 @@ class SimpleTetris:
 
 # 启动游戏
 if __name__ == "__main__":
+    # 增加调试输出
+    print("Starting Simple Tetris game...")
+    print(f"Python version: {sys.version}")
+    print(f"Current directory: {os.getcwd()}")
+
     print("\n---- Simple Tetris Game ----")
     print("Controls:")
     print("  Arrow keys - Move/rotate piece")
@@ -756,6 +951,14 @@ if __name__ == "__main__":
     print("  - Also supports combo moves: left_drop, right_drop, rotate_drop")
     print("  - When auto fall is OFF, pieces only move by AI/player commands")
     print("----------------------------\n")
+
+    import argparse
+    parser = argparse.ArgumentParser(description="Simple Tetris")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子，相同种子产生相同的方块序列")
+    parser.add_argument("--max-frames", type=int, default=None, help="运行指定帧数后退出")
+    add_clock_arguments(parser)
+    add_ipc_arguments(parser)
+    args = parser.parse_args()
     
     # 尝试启动游戏
     try:
@@ -764,9 +967,11 @@ if __name__ == "__main__":
             print("Warning: Running in dummy video mode. No window will be shown.")
         
         print("Creating game instance...")
-        game = SimpleTetris()
+        game = SimpleTetris(seed=args.seed, clock=clock_from_args(args))
+        # 通过 UDP 接收按键事件（--ipc-port），无需窗口焦点
+        server_from_args(args)
         print("Starting game...")
-        game.run()
+        game.run(max_frames=args.max_frames)
     except Exception as e:
         print(f"Fatal error: {e}")
         import traceback
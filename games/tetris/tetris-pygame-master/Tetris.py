@@ -1,6 +1,16 @@
+import argparse
+import os
 import random
+import sys
 import pygame
 
+# add the project root to the path so the shared game clock can be imported
+project_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from games.sim_clock import SimClock, add_clock_arguments, clock_from_args
+
 """
 10 x 20 grid
 play_height = 2 * play_width
@@ -143,6 +153,24 @@ shapes = [S, Z, I, O, J, L, T]
 shape_colors = [(0, 255, 0), (255, 0, 0), (0, 255, 255), (255, 255, 0), (255, 165, 0), (0, 0, 255), (128, 0, 128)]
 
 
+# parse the shape formats once into (x, y) offsets of the filled cells for each rotation
+# so collision checks don't re-read the '.....' strings on every key press and fall tick
+def parse_shape_cells(shape):
+    cells = []
+    for shape_format in shape:
+        offsets = []
+        for i, line in enumerate(shape_format):
+            for j, column in enumerate(line):
+                if column == '0':
+                    offsets.append((j - 2, i - 4))  # offset according to the input given with dot and zero
+        cells.append(offsets)
+    return cells
+
+
+# index represents the shape, same as shapes
+shape_cells = [parse_shape_cells(shape) for shape in shapes]
+
+
 # class to represent each of the pieces
 
 
@@ -152,77 +180,92 @@ class Piece(object):
         self.y = y
         self.shape = shape
         self.color = shape_colors[shapes.index(shape)]  # choose color from the shape_color list
+        self.cells = shape_cells[shapes.index(shape)]   # precomputed cell offsets for every rotation
         self.rotation = 0  # chooses the rotation according to index
 
 
 # initialise the grid
+# the grid only holds locked blocks and is kept up to date incrementally by lock_piece and clear_rows,
+# so it is built once per game instead of every frame
 def create_grid(locked_pos={}):
     grid = [[(0, 0, 0) for x in range(col)] for y in range(row)]  # grid represented rgb tuples
 
     # locked_positions dictionary
     # (x,y):(r,g,b)
-    for y in range(row):
-        for x in range(col):
-            if (x, y) in locked_pos:
-                color = locked_pos[
-                    (x, y)]  # get the value color (r,g,b) from the locked_positions dictionary using key (x,y)
-                grid[y][x] = color  # set grid position to color
+    for (x, y), color in locked_pos.items():
+        if 0 <= x < col and 0 <= y < row:
+            grid[y][x] = color  # set grid position to color
 
     return grid
 
 
 def convert_shape_format(piece):
-    positions = []
-    shape_format = piece.shape[piece.rotation % len(piece.shape)]  # get the desired rotated shape from piece
-
-    '''
-    e.g.
-       ['.....',
-        '.....',
-        '..00.',
-        '.00..',
-        '.....']
-    '''
-    for i, line in enumerate(shape_format):  # i gives index; line gives string
-        row = list(line)  # makes a list of char from string
-        for j, column in enumerate(row):  # j gives index of char; column gives char
-            if column == '0':
-                positions.append((piece.x + j, piece.y + i))
+    cells = piece.cells[piece.rotation % len(piece.cells)]  # get the desired rotated shape from piece
 
-    for i, pos in enumerate(positions):
-        positions[i] = (pos[0] - 2, pos[1] - 4)  # offset according to the input given with dot and zero
-
-    return positions
+    return [(piece.x + dx, piece.y + dy) for dx, dy in cells]
 
 
 # checks if current position of piece in grid is valid
+# each of the four cells is a direct grid lookup, independent of how many blocks are locked
 def valid_space(piece, grid):
-    # makes a 2D list of all the possible (x,y)
-    accepted_pos = [[(x, y) for x in range(col) if grid[y][x] == (0, 0, 0)] for y in range(row)]
-    # removes sub lists and puts (x,y) in one list; easier to search
-    accepted_pos = [x for item in accepted_pos for x in item]
+    for x, y in convert_shape_format(piece):
+        if y < 0:
+            continue                        # cells above the board are allowed while the piece enters
+        if y >= row or not 0 <= x < col or grid[y][x] != (0, 0, 0):
+            return False
+    return True
 
-    formatted_shape = convert_shape_format(piece)
 
-    for pos in formatted_shape:
-        if pos not in accepted_pos:
-            if pos[1] >= 0:
-                return False
-    return True
+# write a landed piece into the grid
+def lock_piece(grid, positions, color):
+    for x, y in positions:
+        if y >= 0:
+            grid[y][x] = color
 
 
 # check if piece is out of board
-def check_lost(positions):
-    for pos in positions:
-        x, y = pos
-        if y < 1:
+# only the piece that just locked can push the stack out, so there is no need to scan every locked block
+def check_lost(positions, grid):
+    for x, y in positions:
+        if y < 0:
             return True
-    return False
+    return any(cell != (0, 0, 0) for cell in grid[0])  # a block locked in the top row
+
+
+# chooses a shape randomly from shapes list, drawing from the game's own random stream
+def get_shape(rng=random):
+    return Piece(5, 0, rng.choice(shapes))
+
+
+def piece_state(piece):
+    return (piece.x, piece.y, shapes.index(piece.shape), piece.rotation)
 
 
-# chooses a shape randomly from shapes list
-def get_shape():
-    return Piece(5, 0, random.choice(shapes))
+def piece_from_state(state):
+    x, y, shape, rotation = state
+    piece = Piece(x, y, shapes[shape])
+    piece.rotation = rotation
+    return piece
+
+
+# capture the whole game (locked grid, both pieces, score and the position of the random stream)
+# so a game can be branched or replayed with the same piece sequence
+def snapshot(grid, current_piece, next_piece, score, rng):
+    return {
+        'grid': tuple(tuple(line) for line in grid),
+        'current_piece': piece_state(current_piece),
+        'next_piece': piece_state(next_piece),
+        'score': score,
+        'rng_state': rng.getstate(),
+    }
+
+
+# rebuild the game from snapshot() and rewind the random stream
+# returns (grid, current_piece, next_piece, score)
+def restore(snap, rng):
+    rng.setstate(snap['rng_state'])
+    return ([list(line) for line in snap['grid']], piece_from_state(snap['current_piece']),
+            piece_from_state(snap['next_piece']), snap['score'])
 
 
 # draws text in the middle
@@ -249,33 +292,15 @@ def draw_grid(surface):
 
 
 # clear a row when it is filled
-def clear_rows(grid, locked):
-    # need to check if row is clear then shift every other row above down one
-    increment = 0
-    for i in range(len(grid) - 1, -1, -1):      # start checking the grid backwards
-        grid_row = grid[i]                      # get the last row
-        if (0, 0, 0) not in grid_row:           # if there are no empty spaces (i.e. black blocks)
-            increment += 1
-            # add positions to remove from locked
-            index = i                           # row index will be constant
-            for j in range(len(grid_row)):
-                try:
-                    del locked[(j, i)]          # delete every locked element in the bottom row
-                except ValueError:
-                    continue
-
-    # shift every row one step down
-    # delete filled bottom row
-    # add another empty row on the top
-    # move down one step
+def clear_rows(grid):
+    # single compaction pass: keep every row that still has an empty space (i.e. black blocks) in order,
+    # then add one empty row on the top for every filled row removed
+    kept_rows = [grid_row for grid_row in grid if (0, 0, 0) in grid_row]
+    increment = len(grid) - len(kept_rows)
+
     if increment > 0:
-        # sort the locked list according to y value in (x,y) and then reverse
-        # reversed because otherwise the ones on the top will overwrite the lower ones
-        for key in sorted(list(locked), key=lambda a: a[1])[::-1]:
-            x, y = key
-            if y < index:                       # if the y value is above the removed index
-                new_key = (x, y + increment)    # shift position to down
-                locked[new_key] = locked.pop(key)
+        # update in place so every reference to the grid sees the cleared rows
+        grid[:] = [[(0, 0, 0) for x in range(col)] for y in range(increment)] + kept_rows
 
     return increment
 
@@ -367,15 +392,19 @@ def get_max_score():
     return score
 
 
-def main(window):
-    locked_positions = {}
-    create_grid(locked_positions)
+def main(window, clock=None, rng=None):
+    # the piece sequence comes from its own random stream (seeded with --seed)
+    if rng is None:
+        rng = random.Random()
+    grid = create_grid()
 
     change_piece = False
     run = True
-    current_piece = get_shape()
-    next_piece = get_shape()
-    clock = pygame.time.Clock()
+    current_piece = get_shape(rng)
+    next_piece = get_shape(rng)
+    # game time comes from the simulation clock (realtime, fixed-step or fast-forward)
+    if clock is None:
+        clock = SimClock(fps=60)
     fall_time = 0
     fall_speed = 0.35
     level_time = 0
@@ -383,15 +412,11 @@ def main(window):
     last_score = get_max_score()
 
     while run:
-        # need to constantly make new grid as locked positions always change
-        grid = create_grid(locked_positions)
-
         # helps run the same on every computer
-        # add time since last tick() to fall_time
-        fall_time += clock.get_rawtime()  # returns in milliseconds
-        level_time += clock.get_rawtime()
-
-        clock.tick()  # updates clock
+        # add game time since last tick() to fall_time
+        frame_time = clock.tick()  # returns in milliseconds
+        fall_time += frame_time
+        level_time += frame_time
 
         if level_time/1000 > 5:    # make the difficulty harder every 10 seconds
             level_time = 0
@@ -439,31 +464,34 @@ def main(window):
 
         piece_pos = convert_shape_format(current_piece)
 
-        # draw the piece on the grid by giving color in the piece locations
-        for i in range(len(piece_pos)):
-            x, y = piece_pos[i]
-            if y >= 0:
-                grid[y][x] = current_piece.color
-
         if change_piece:  # if the piece is locked
-            for pos in piece_pos:
-                p = (pos[0], pos[1])
-                locked_positions[p] = current_piece.color       # add the key and value in the dictionary
+            lock_piece(grid, piece_pos, current_piece.color)
             current_piece = next_piece
-            next_piece = get_shape()
+            next_piece = get_shape(rng)
             change_piece = False
-            score += clear_rows(grid, locked_positions) * 10    # increment score by 10 for every row cleared
+            score += clear_rows(grid) * 10    # increment score by 10 for every row cleared
             update_score(score)
 
             if last_score < score:
                 last_score = score
 
-        draw_window(window, grid, score, last_score)
-        draw_next_shape(next_piece, window)
-        pygame.display.update()
+            if check_lost(piece_pos, grid):
+                run = False
+            piece_pos = []
 
-        if check_lost(locked_positions):
-            run = False
+        # draw the falling piece on the grid for this frame only, then give the cells back
+        # (valid_space guarantees they were empty)
+        piece_cells = [(x, y) for x, y in piece_pos if y >= 0]
+        for x, y in piece_cells:
+            grid[y][x] = current_piece.color
+
+        if clock.should_render():
+            draw_window(window, grid, score, last_score)
+            draw_next_shape(next_piece, window)
+            pygame.display.update()
+
+        for x, y in piece_cells:
+            grid[y][x] = (0, 0, 0)
 
     draw_text_middle('You Lost', 40, (255, 255, 255), window)
     pygame.display.update()
@@ -471,7 +499,7 @@ def main(window):
     pygame.quit()
 
 
-def main_menu(window):
+def main_menu(window, clock=None, rng=None):
     run = True
     
     # 绘制启动屏幕
@@ -480,7 +508,7 @@ def main_menu(window):
     
     # 自动启动，等待2秒后自动开始游戏
     pygame.time.delay(2000)
-    main(window)
+    main(window, clock, rng)
     
     # 以下是原始代码，保留但不执行
     """
@@ -499,7 +527,12 @@ def main_menu(window):
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tetris')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for the piece sequence')
+    add_clock_arguments(parser)
+    args = parser.parse_args()
+
     win = pygame.display.set_mode((s_width, s_height))
     pygame.display.set_caption('Tetris')
     
-    main_menu(win)  # start game
+    main_menu(win, clock_from_args(args), random.Random(args.seed))  # start game
@@ -0,0 +1,107 @@
+"""
+Frame cost against stack height
+
+Times the per-frame game logic of Tetris.main (one fall tick and one key
+press, each followed by a valid_space check, and drawing the falling piece on
+the grid) for stacks of increasing height. The incremental grid should give a
+flat line; the rebuild-every-frame version it replaced is timed alongside for
+comparison.
+
+    python benchmark.py --frames 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from Tetris import col, row, shapes, shape_colors, Piece, create_grid, valid_space, convert_shape_format
+
+
+# previous implementation: rebuild the grid from locked positions every frame
+# and search a list of free cells on every check
+def legacy_create_grid(locked_pos):
+    grid = [[(0, 0, 0) for x in range(col)] for y in range(row)]
+    for y in range(row):
+        for x in range(col):
+            if (x, y) in locked_pos:
+                grid[y][x] = locked_pos[(x, y)]
+    return grid
+
+
+def legacy_valid_space(piece, grid):
+    accepted_pos = [[(x, y) for x in range(col) if grid[y][x] == (0, 0, 0)] for y in range(row)]
+    accepted_pos = [x for item in accepted_pos for x in item]
+
+    for pos in convert_shape_format(piece):
+        if pos not in accepted_pos:
+            if pos[1] >= 0:
+                return False
+    return True
+
+
+# fill the bottom rows, leaving one hole per row so nothing clears
+def build_stack(height, rng):
+    locked = {}
+    for y in range(row - height, row):
+        hole = rng.randrange(col)
+        for x in range(col):
+            if x != hole:
+                locked[(x, y)] = rng.choice(shape_colors)
+    return locked
+
+
+def run_frames(piece, grid, frames, locked=None):
+    moves = [(1, 0), (-1, 0), (0, 1)]
+    start = time.perf_counter()
+    for i in range(frames):
+        if locked is not None:
+            grid = legacy_create_grid(locked)
+            check = legacy_valid_space
+        else:
+            check = valid_space
+
+        # fall tick plus one key press, as in a typical frame of main()
+        for dx, dy in ((0, 1), moves[i % len(moves)]):
+            piece.x += dx
+            piece.y += dy
+            if not check(piece, grid):
+                piece.x -= dx
+                piece.y -= dy
+        if piece.y > 2:
+            piece.y = 2  # keep the piece near the top so every frame does the same work
+
+        # draw the piece for this frame
+        piece_cells = [(x, y) for x, y in convert_shape_format(piece) if y >= 0]
+        for x, y in piece_cells:
+            grid[y][x] = piece.color
+        if locked is None:
+            for x, y in piece_cells:
+                grid[y][x] = (0, 0, 0)
+    return (time.perf_counter() - start) / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Tetris frame cost against stack height")
+    parser.add_argument("--frames", type=int, default=2000, help="Frames to time per stack height")
+    parser.add_argument("--step", type=int, default=2, help="Stack height increment")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the stacks")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'height':>6} {'incremental (us)':>18} {'rebuild (us)':>14}")
+    for height in range(0, row - 4, args.step):
+        locked = build_stack(height, rng)
+        piece = Piece(5, 0, shapes[6])
+
+        incremental = run_frames(piece, create_grid(locked), args.frames)
+        piece.x, piece.y = 5, 0
+        rebuild = run_frames(piece, None, args.frames, locked=locked)
+        print(f"{height:>6} {incremental * 1e6:>18.1f} {rebuild * 1e6:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -50,6 +50,11 @@ except ImportError:
         print(f"Current file: {__file__}")
         sys.exit(1)
 
+from tools.input_backends import add_input_arguments, backend_from_args
+from tools.input_executor import configure_input_executor
+from tools.session_index import LiveIndexer
+from tools.session_log import close_all as close_all_logs, get_session_log
+
 # 修复全局变量声明
 # 创建一个全局变量，作为停止标志
 stop_flag = False
@@ -71,12 +76,13 @@ def get_conda_env_info():
     return conda_env, conda_prefix
 
 # 启动Tetris游戏
-def launch_tetris_game(use_simplified=True):
+def launch_tetris_game(use_simplified=True, game_args=None):
     """
     启动Tetris游戏并返回进程对象
     
     Args:
         use_simplified (bool): 是否使用简化版Tetris游戏
+        game_args (list, optional): 传给游戏脚本的额外命令行参数，如 ["--ipc-port", "47800"]
         
     Returns:
         subprocess.Popen: 游戏进程对象
@@ -126,7 +132,7 @@ def launch_tetris_game(use_simplified=True):
         
         try:
             # 直接使用subprocess.Popen启动游戏，避免使用shell=True
-            cmd = [python_executable, game_script]
+            cmd = [python_executable, game_script] + list(game_args or [])
             print(f"执行命令: {' '.join(cmd)}")
             
             tetris_process = subprocess.Popen(
@@ -156,7 +162,7 @@ def launch_tetris_game(use_simplified=True):
         # Linux/Mac系统启动游戏
         try:
             tetris_process = subprocess.Popen(
-                [sys.executable, game_script],
+                [sys.executable, game_script] + list(game_args or []),
                 env=env,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
@@ -367,6 +373,11 @@ def main():
     parser.add_argument('--screenshot_interval', type=float, default=0, help='Screenshot interval (seconds), 0 to disable')
     parser.add_argument('--save_all_states', action='store_true', help='Save all game states')
     parser.add_argument('--enhanced_logging', action='store_true', help='Enable enhanced logging')
+    parser.add_argument('--pipeline', action='store_true', help='Overlap screenshot capture/encoding with API requests (ignores --manual_mode)')
+    parser.add_argument('--request_timeout', type=float, default=None, help='Give up on a single API request after N seconds')
+    parser.add_argument('--live_animation', action='store_true', help='Keep an animation per thread (log_folder/animations) up to date while running')
+    parser.add_argument('--index_db', type=str, default=None, help='Keep this SQLite session index (tools/session_index.py) updated while running')
+    add_input_arguments(parser)
     
     args = parser.parse_args()
     
@@ -389,22 +400,21 @@ def main():
     os.makedirs(args.log_folder, exist_ok=True)
     
     # 创建主日志文件
-    log_file = os.path.join(args.log_folder, "game_log.txt")
+    log_file = os.path.join(args.log_folder, "game_log.jsonl")
     
-    # 如果启用了增强日志，记录启动信息
+    # 如果启用了增强日志，记录启动信息（JSON Lines）
     if args.enhanced_logging:
-        with open(log_file, 'w', encoding='utf-8') as f:
-            f.write(f"=== Tetris AI Agent Started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n")
-            f.write(f"Threads: {args.threads}, Policy: {args.policy}\n")
-            f.write(f"API Provider: {args.api_provider}, Model: {args.model}\n")
-            f.write(f"Plan Seconds: {args.plan_seconds}\n")
-            f.write(f"Manual Mode: {args.manual_mode}\n")
-            f.write(f"Screenshot Interval: {args.screenshot_interval}\n")
-            f.write(f"Enhanced Logging: {args.enhanced_logging}\n")
-            f.write("="*50 + "\n\n")
+        get_session_log(log_file).log("agent_start", threads=args.threads, policy=args.policy,
+                                      api_provider=args.api_provider, model=args.model,
+                                      plan_seconds=args.plan_seconds, manual_mode=args.manual_mode,
+                                      screenshot_interval=args.screenshot_interval,
+                                      enhanced_logging=args.enhanced_logging)
         
         print(f"Enhanced logging enabled. Logs will be saved to {log_file}")
     
+    # 定期把本次会话的日志增量写入SQLite索引
+    indexer = LiveIndexer(args.index_db, args.log_folder).start() if args.index_db else None
+    
     # 解析手动窗口位置（如果提供）
     manual_window_region = None
     if args.manual_window_pos:
@@ -419,8 +429,15 @@ def main():
             print(f"Invalid manual window position format. Expected: x,y,width,height")
     
     # 如果没有使用--no_launch_game参数，启动Tetris游戏
+    # 按键后端：ipc 模式下让游戏在 --ipc_port 上接收按键事件
+    game_args = []
+    if args.input_backend == "ipc" and args.simplified:
+        game_args = ["--ipc-port", str(args.ipc_port)]
+    configure_input_executor(backend_from_args(args))
+    print(f"Input backend: {args.input_backend}")
+
     if not args.no_launch_game:
-        game_process = launch_tetris_game(use_simplified=args.simplified)
+        game_process = launch_tetris_game(use_simplified=args.simplified, game_args=game_args)
         if not game_process:
             print("Failed to start Tetris game. Exiting...")
             return
@@ -476,7 +493,10 @@ def main():
                 args.enhanced_logging,
                 args.execution_mode,
                 args.piece_limit,
-                args.manual_mode  # 添加manual_mode参数
+                args.manual_mode,  # 添加manual_mode参数
+                args.pipeline,
+                args.request_timeout,
+                args.live_animation
             )
         )
         thread.daemon = True
@@ -487,17 +507,16 @@ def main():
     try:
         # 循环检查所有线程是否完成
         while any(t.is_alive() for t in threads):
-            time.sleep(0.5)
+            stop_flag.wait(0.5)
             
             # 如果停止标志被设置，尝试优雅地停止线程
             if stop_flag.is_set():
                 print("\nStop flag detected, waiting for threads to complete...")
                 
-                # 给线程一些时间优雅地关闭
-                for _ in range(10):  # 最多等待5秒
-                    if not any(t.is_alive() for t in threads):
-                        break
-                    time.sleep(0.5)
+                # 工作线程会立即放弃进行中的API请求和按键序列，通常几毫秒内退出
+                join_deadline = time.time() + 5  # 最多等待5秒
+                for t in threads:
+                    t.join(timeout=max(0, join_deadline - time.time()))
                 
                 # 如果线程仍在运行，尝试强制终止
                 if any(t.is_alive() for t in threads):
@@ -532,6 +551,10 @@ def main():
         # 停止Tetris游戏
         stop_tetris_game()
     
+    # 写出缓冲的日志并打印写入量与锁竞争统计
+    close_all_logs(report=True)
+    if indexer is not None:
+        indexer.stop()
     print("Main thread exiting...")
 
 if __name__ == "__main__":
@@ -0,0 +1,260 @@
+"""
+Gymnasium environment for Simple Tetris
+
+Wraps simple_tetris.GameState so the game can be stepped headlessly, without
+a pygame window, screenshots or key presses. Observations are either symbolic
+(board occupancy plus piece indices) or a rendered RGB frame.
+
+Usage:
+    from games.tetris.tetris_env import TetrisEnv, make_vector_env
+
+    env = TetrisEnv(obs_type="symbolic")
+    obs, info = env.reset()
+    obs, reward, terminated, truncated, info = env.step(env.action_space.sample())
+
+    envs = make_vector_env(8, asynchronous=True, obs_type="rgb")
+
+Benchmark (random policy):
+    python -m games.tetris.tetris_env --num-envs 8 --steps 20000 --async
+"""
+
+import argparse
+import functools
+import random
+import time
+
+import numpy as np
+import gymnasium as gym
+from gymnasium import spaces
+
+from games.tetris.simple_tetris import (
+    GameState, GRID_WIDTH, GRID_HEIGHT, SHAPES, BLOCK_SIZE, BLACK, GRAY
+)
+
+ENV_ID = "GamingAgent/SimpleTetris-v0"
+
+# Discrete action index -> AIController action name
+ACTIONS = ["noop", "left", "right", "down", "rotate", "drop"]
+
+# Symbolic board cell values
+EMPTY_CELL = 0
+LOCKED_CELL = 1
+PIECE_CELL = 2
+
+
+class TetrisEnv(gym.Env):
+    """
+    Headless Simple Tetris environment.
+
+    Args:
+        obs_type (str): "symbolic" for a Dict observation with the board
+            occupancy (0=empty, 1=locked, 2=current piece) and the current/next
+            piece indices, or "rgb" for a rendered frame.
+        render_mode (str, optional): "rgb_array" to enable render().
+        cell_size (int): Pixel size of one cell in rendered frames.
+        gravity_interval (int): Move the piece down one row every N steps.
+            0 disables gravity, matching the game's default auto_fall=False.
+        max_steps (int): Truncate the episode after this many steps (0=never).
+    """
+
+    metadata = {"render_modes": ["rgb_array"], "render_fps": 60}
+
+    def __init__(self, obs_type="symbolic", render_mode=None, cell_size=BLOCK_SIZE,
+                 gravity_interval=0, max_steps=0):
+        if obs_type not in ("symbolic", "rgb"):
+            raise ValueError(f"Unsupported obs_type: {obs_type}")
+        if render_mode is not None and render_mode not in self.metadata["render_modes"]:
+            raise ValueError(f"Unsupported render_mode: {render_mode}")
+
+        self.obs_type = obs_type
+        self.render_mode = render_mode
+        self.cell_size = cell_size
+        self.gravity_interval = gravity_interval
+        self.max_steps = max_steps
+
+        self.action_space = spaces.Discrete(len(ACTIONS))
+        if obs_type == "symbolic":
+            self.observation_space = spaces.Dict({
+                "board": spaces.Box(0, PIECE_CELL, (GRID_HEIGHT, GRID_WIDTH), dtype=np.int8),
+                "piece": spaces.Discrete(len(SHAPES)),
+                "next_piece": spaces.Discrete(len(SHAPES)),
+            })
+        else:
+            self.observation_space = spaces.Box(
+                0, 255, (GRID_HEIGHT * cell_size, GRID_WIDTH * cell_size, 3), dtype=np.uint8
+            )
+
+        # 网格线掩码只需计算一次
+        line_mask = np.zeros((GRID_HEIGHT * cell_size, GRID_WIDTH * cell_size), dtype=bool)
+        line_mask[::cell_size, :] = True
+        line_mask[cell_size - 1::cell_size, :] = True
+        line_mask[:, ::cell_size] = True
+        line_mask[:, cell_size - 1::cell_size] = True
+        self._line_mask = line_mask
+
+        self.game_state = None
+        self.steps = 0
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        # 方块序列由独立的随机数流生成，种子取自np_random，保证可复现
+        rng = random.Random(int(self.np_random.integers(0, 2 ** 63 - 1)))
+        self.game_state = GameState(rng=rng)
+        self.game_state.spawn_piece()
+        self.steps = 0
+        return self._get_obs(), self._get_info()
+
+    def get_state(self):
+        """
+        Snapshot the full game state, including the piece RNG position.
+
+        Returns:
+            tuple: Opaque state accepted by set_state().
+        """
+        return self.game_state.snapshot(), self.steps
+
+    def set_state(self, state):
+        """
+        Restore a state returned by get_state(), e.g. to branch a rollout.
+
+        Args:
+            state (tuple): State from get_state().
+        """
+        snapshot, self.steps = state
+        self.game_state.restore(snapshot)
+
+    def step(self, action):
+        state = self.game_state
+        score_before = state.score
+        name = ACTIONS[int(action)]
+
+        if name == "left":
+            state.move_left()
+        elif name == "right":
+            state.move_right()
+        elif name == "down":
+            state.move_down()
+        elif name == "rotate":
+            state.rotate_piece()
+        elif name == "drop":
+            state.drop_piece()
+
+        self.steps += 1
+        if (self.gravity_interval and not state.game_over and name != "drop"
+                and self.steps % self.gravity_interval == 0):
+            state.move_down()
+
+        reward = float(state.score - score_before)
+        terminated = state.game_over
+        truncated = bool(self.max_steps) and self.steps >= self.max_steps and not terminated
+        return self._get_obs(), reward, terminated, truncated, self._get_info()
+
+    def render(self):
+        if self.render_mode == "rgb_array":
+            return self._render_frame()
+        return None
+
+    def _piece_cells(self):
+        """Yield (x, y) grid cells occupied by the current piece."""
+        state = self.game_state
+        if not state.current_piece:
+            return
+        for y, row in enumerate(state.current_piece['shape']):
+            for x, cell in enumerate(row):
+                if cell:
+                    gx, gy = state.piece_x + x, state.piece_y + y
+                    if 0 <= gx < GRID_WIDTH and 0 <= gy < GRID_HEIGHT:
+                        yield gx, gy
+
+    def _board_array(self):
+        board = np.array([[1 if cell else 0 for cell in row] for row in self.game_state.grid],
+                         dtype=np.int8)
+        for x, y in self._piece_cells():
+            board[y, x] = PIECE_CELL
+        return board
+
+    def _render_frame(self):
+        state = self.game_state
+        colors = np.zeros((GRID_HEIGHT, GRID_WIDTH, 3), dtype=np.uint8)
+        colors[:] = BLACK
+        for y, row in enumerate(state.grid):
+            for x, cell in enumerate(row):
+                if cell:
+                    colors[y, x] = cell
+        if state.current_piece:
+            for x, y in self._piece_cells():
+                colors[y, x] = state.current_piece['color']
+
+        empty = ~colors.any(axis=2)
+        frame = colors.repeat(self.cell_size, axis=0).repeat(self.cell_size, axis=1)
+        empty = empty.repeat(self.cell_size, axis=0).repeat(self.cell_size, axis=1)
+        # 与GameRenderer一致：空格子显示灰色网格线，已有方块覆盖网格线
+        frame[self._line_mask & empty] = GRAY
+        return frame
+
+    def _get_obs(self):
+        if self.obs_type == "rgb":
+            return self._render_frame()
+        state = self.game_state
+        return {
+            "board": self._board_array(),
+            "piece": state.current_piece['index'] if state.current_piece else 0,
+            "next_piece": state.next_piece['index'] if state.next_piece else 0,
+        }
+
+    def _get_info(self):
+        state = self.game_state
+        return {
+            "score": state.score,
+            "level": state.level,
+            "lines_cleared": state.lines_cleared,
+            "piece_x": state.piece_x,
+            "piece_y": state.piece_y,
+        }
+
+
+def make_vector_env(num_envs, asynchronous=False, **env_kwargs):
+    """
+    Create a vectorized TetrisEnv.
+
+    Args:
+        num_envs (int): Number of environment copies.
+        asynchronous (bool): Run each copy in its own subprocess (AsyncVectorEnv)
+            instead of stepping them in-process (SyncVectorEnv).
+        **env_kwargs: Passed through to TetrisEnv.
+
+    Returns:
+        gymnasium.vector.VectorEnv: The vectorized environment.
+    """
+    env_fns = [functools.partial(TetrisEnv, **env_kwargs) for _ in range(num_envs)]
+    if asynchronous:
+        return gym.vector.AsyncVectorEnv(env_fns)
+    return gym.vector.SyncVectorEnv(env_fns)
+
+
+if ENV_ID not in gym.registry:
+    gym.register(id=ENV_ID, entry_point="games.tetris.tetris_env:TetrisEnv")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the headless Tetris environment with a random policy")
+    parser.add_argument("--num-envs", type=int, default=1, help="Number of vectorized environments")
+    parser.add_argument("--steps", type=int, default=10000, help="Total environment steps to run")
+    parser.add_argument("--obs-type", type=str, default="symbolic", choices=["symbolic", "rgb"])
+    parser.add_argument("--async", dest="asynchronous", action="store_true", help="Use AsyncVectorEnv")
+    args = parser.parse_args()
+
+    envs = make_vector_env(args.num_envs, asynchronous=args.asynchronous, obs_type=args.obs_type)
+    envs.reset(seed=0)
+    start_time = time.time()
+    for _ in range(max(1, args.steps // args.num_envs)):
+        envs.step(envs.action_space.sample())
+    elapsed = time.time() - start_time
+    envs.close()
+
+    total_steps = max(1, args.steps // args.num_envs) * args.num_envs
+    print(f"{total_steps} steps in {elapsed:.2f}s ({total_steps / elapsed:.0f} steps/s)")
+
+
+if __name__ == "__main__":
+    main()
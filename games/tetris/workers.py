@@ -94,6 +94,14 @@ except ImportError:
         # 如果什么都找不到，返回空字符串
         return ""
 
+from games.tetris.placement import simple_tetris_table
+from tools.animation import LiveAnimation
+from tools.overlay import draw_text, get_font
+from tools.input_executor import get_input_executor
+from tools.pipeline import Pipeline, Stage
+from tools.serving.cancellation import CancellationToken, RequestCancelled, call_cancellable
+from tools.session_log import get_session_log
+
 # Add this function to find Tetris window directly
 def find_tetris_window(window_title_keywords=None):
     """
@@ -295,7 +303,10 @@ def worker_tetris(
     enhanced_logging=False,  # 是否启用增强日志
     execution_mode='adaptive',  # 控制执行模式：adaptive, fast, or slow
     piece_limit=0,  # 每次API调用最多控制的方块数量，0表示不限制
-    manual_mode=True  # 新增参数：手动模式，需要用户按空格键继续
+    manual_mode=True,  # 新增参数：手动模式，需要用户按空格键继续
+    pipelined=False,  # 流水线模式：截图/编码、API请求、执行分别在独立线程中重叠运行
+    request_timeout=None,  # 单次API请求超时(秒)，None表示不限制
+    live_animation=False  # 是否在运行中实时生成本线程的动画
 ):
     """
     Tetris游戏工作线程
@@ -322,6 +333,9 @@ def worker_tetris(
         execution_mode: 控制执行模式
         piece_limit: 每次API调用最多控制的方块数量
         manual_mode: 是否启用手动模式（等待用户按下空格键）
+        pipelined: 是否使用流水线模式（下一帧的截图和编码与当前帧的API请求重叠，忽略manual_mode）
+        request_timeout: 单次API请求超时(秒)；stop_flag被设置时正在进行的请求会立即放弃
+        live_animation: 是否把每次截图实时编码进 animations/thread_{thread_id}_live.gif
         
     Returns:
         str: 执行状态
@@ -339,7 +353,7 @@ def worker_tetris(
     from io import BytesIO
     import json
     import sys
-    from PIL import Image, ImageDraw, ImageFont
+    from PIL import Image, ImageDraw
     from datetime import datetime
     
     # 存储所有响应时间以计算平均值
@@ -370,26 +384,20 @@ def worker_tetris(
         screenshot_folder = os.path.join(thread_log_folder, f"thread_{thread_id}_screenshots")
         os.makedirs(screenshot_folder, exist_ok=True)
         
-        # 创建线程日志文件
-        thread_log_file = os.path.join(thread_log_folder, f"thread_{thread_id}_log.txt")
+        # 创建线程日志文件（JSON Lines，所有写入经共享的缓冲日志完成）
+        thread_log_file = os.path.join(thread_log_folder, f"thread_{thread_id}_log.jsonl")
         log_file = thread_log_file
         
         # 创建主日志文件
-        main_log_file = os.path.join(session_folder, "game_log.txt")
+        main_log_file = os.path.join(session_folder, "game_log.jsonl")
         
         # 记录初始信息到主日志
-        with open(main_log_file, 'a', encoding='utf-8') as f:
-            f.write(f"=== Session Started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n")
-            f.write(f"Plan seconds: {plan_seconds}\n")
-            f.write(f"API Provider: {api_provider}, Model: {model_name}\n")
-            f.write("==================================================\n\n")
+        get_session_log(main_log_file).log("session_start", plan_seconds=plan_seconds,
+                                           api_provider=api_provider, model=model_name)
         
         # 记录线程启动到线程日志
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(f"=== Thread {thread_id} Started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n")
-            f.write(f"Plan seconds: {plan_seconds}\n")
-            f.write(f"API Provider: {api_provider}, Model: {model_name}\n")
-            f.write("==================================================\n\n")
+        get_session_log(log_file).log("thread_start", thread_id=thread_id, plan_seconds=plan_seconds,
+                                      api_provider=api_provider, model=model_name)
     
     # 停止标志，用于在外部控制线程停止
     local_stop_flag = False
@@ -397,18 +405,19 @@ def worker_tetris(
         # 如果没有提供外部停止标志，创建本地标志
         stop_flag = False
     
+    # 同一文件的所有线程共享一个缓冲日志，不再每条消息打开/关闭一次文件
+    session_log = get_session_log(log_file) if log_file and enhanced_logging else None
+    
+    # 实时动画：截图后立即在后台线程编码进GIF，结束时无需重新读取所有截图
+    animation = None
+    if live_animation:
+        animation = LiveAnimation(os.path.join(log_folder or output_dir, "animations", f"thread_{thread_id}_live.gif"))
+    
     def log_message(message, print_message=True):
         """记录消息到日志文件和控制台"""
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-        log_entry = f"[{timestamp}] [Thread {thread_id}] {message}"
-        
-        # 如果启用了增强日志，记录到文件
-        if log_file and enhanced_logging:
-            try:
-                with open(log_file, 'a', encoding='utf-8', errors='replace') as f:
-                    f.write(log_entry + "\n")
-            except Exception as e:
-                print(f"Error writing to log file: {e}")
+        # 如果启用了增强日志，记录到文件（由后台线程批量写入）
+        if session_log is not None:
+            session_log.log("message", thread_id=thread_id, message=message)
         
         # 同时打印到控制台（如果需要）
         if print_message:
@@ -448,19 +457,12 @@ def worker_tetris(
             # 添加时间戳和描述
             draw = ImageDraw.Draw(screenshot)
             
-            # 使用简单的字体
-            try:
-                font = ImageFont.truetype("arial.ttf", 14)
-            except:
-                # 如果找不到字体，使用默认字体
-                font = ImageFont.load_default()
-            
-            # 添加时间戳和描述
+            # 添加时间戳和描述（字体只加载一次；描述是重复的文字，使用缓存的文字贴图）
             timestamp_text = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-            draw.text((10, 10), f"{timestamp_text}", fill="white", font=font)
+            draw.text((10, 10), f"{timestamp_text}", fill="white", font=get_font(14))
             
             if description:
-                draw.text((10, 30), description, fill="white", font=font)
+                draw_text(screenshot, (10, 30), description, size=14)
             
             # 保存截图
             screenshot.save(full_path)
@@ -472,6 +474,9 @@ def worker_tetris(
             return None, None
     
     # 检查是否应该停止
+    # 取消令牌：跟随外部stop_flag（threading.Event），按下'q'后阻塞中的API调用立即返回
+    cancel_token = CancellationToken(event=stop_flag if hasattr(stop_flag, 'is_set') else None)
+    
     def should_stop():
         """检查是否应该停止线程"""
         if isinstance(stop_flag, bool):
@@ -530,6 +535,8 @@ def worker_tetris(
             )
         
         log_message(f"Initial screenshot saved to: {screenshot_path}")
+        if animation is not None:
+            animation.add(screenshot, f"Thread {thread_id} - Iteration {iteration}")
         
         # 转换为base64 - 使用BytesIO处理二进制数据
         buffered = BytesIO()
@@ -574,16 +581,21 @@ def worker_tetris(
             
             try:
                 from tools.serving.api_providers import call_anthropic_with_image
-                response = call_anthropic_with_image(
+                response = call_cancellable(
+                    call_anthropic_with_image,
                     system_prompt=system_prompt,
                     user_message=instruction,
                     image_base64=base64_image,
-                    model=model_name
+                    model=model_name,
+                    token=cancel_token,
+                    timeout=request_timeout
                 )
                 
                 # 提取生成的代码和完整响应
                 generated_code_str = response
                 full_response = response
+            except RequestCancelled:
+                raise
             except Exception as e:
                 log_message(f"Error calling Anthropic API: {e}")
                 traceback.print_exc()
@@ -600,16 +612,21 @@ def worker_tetris(
             
             try:
                 from tools.serving.api_providers import call_openai_with_image
-                response = call_openai_with_image(
+                response = call_cancellable(
+                    call_openai_with_image,
                     system_prompt=system_prompt,
                     user_message=instruction,
                     image_base64=base64_image,
-                    model=model_name
+                    model=model_name,
+                    token=cancel_token,
+                    timeout=request_timeout
                 )
                 
                 # 提取生成的代码和完整响应
                 generated_code_str = response
                 full_response = response
+            except RequestCancelled:
+                raise
             except Exception as e:
                 log_message(f"Error calling OpenAI API: {e}")
                 traceback.print_exc()
@@ -736,8 +753,58 @@ def worker_tetris(
         screenshot_thread.daemon = True
         screenshot_thread.start()
     
+    # 流水线模式：capture -> request -> execute，各阶段之间是容量为1的队列
+    if pipelined:
+        def capture_stage():
+            # 流水线模式没有主循环，由采集阶段给每一帧编号（动画标签和日志都用这个编号）
+            nonlocal iteration
+            iteration += 1
+            region, region_type = detect_game_window()
+            screenshot_path, screenshot, base64_image = capture_game_screen(region)
+            return {"iteration": iteration, "capture_time": time.time(), "base64_image": base64_image}
+        
+        def request_stage(frame):
+            try:
+                generated_code_str, full_response, latency = call_model_api(base64_image=frame["base64_image"])
+            except RequestCancelled:
+                return None
+            all_response_time.append(latency)
+            log_message(f"Request latency: {latency:.2f}s")
+            if session_log is not None:
+                session_log.log("response", iteration=frame["iteration"], model=model_name, latency=latency)
+            frame["code"] = extract_python_code(generated_code_str)
+            if responses_dict is not None:
+                response_data = {
+                    'timestamp': time.time(),
+                    'full_response': full_response,
+                    'generated_code': generated_code_str,
+                    'latency': latency
+                }
+                responses_dict[thread_id].append(response_data)
+                thread_responses.append(response_data)
+            return frame if frame["code"] else None
+        
+        def execute_stage(frame):
+            executor = get_input_executor()
+            ticket = executor.submit(
+                simple_tetris_table().compile(frame["code"]),
+                deadline=frame["capture_time"] + plan_seconds,
+                source=f"tetris thread {thread_id}",
+            )
+            executor.wait(ticket, token=cancel_token)
+            log_message(f"Actions {ticket.status}: {len(ticket.actions)} actions in {ticket.duration:.2f}s, "
+                        f"frame age {time.time() - frame['capture_time']:.2f}s")
+            return frame
+        
+        pipeline = Pipeline([
+            Stage("capture", capture_stage),
+            Stage("request", request_stage),
+            Stage("execute", execute_stage),
+        ], name=f"Tetris-{thread_id}", report_interval=30.0)
+        pipeline.run(should_stop=should_stop)
+    
     # 主循环
-    while not should_stop():
+    while not pipelined and not should_stop():
         iteration += 1
         if enhanced_logging:
             log_message(f"=== Iteration {iteration} ===")
@@ -766,6 +833,8 @@ def worker_tetris(
                 
                 log_message(f"Request latency: {latency:.2f}s")
                 log_message(f"Average latency: {avg_latency:.2f}s")
+                if session_log is not None:
+                    session_log.log("response", iteration=iteration, model=model_name, latency=latency)
                 
                 # 记录模型回复到日志文件
                 if enhanced_logging:
@@ -785,6 +854,8 @@ def worker_tetris(
                             f.write("\n\n")
                         
                         log_message(f"完整回复已保存到: {response_file}")
+                        if session_log is not None:
+                            session_log.log("artifact", iteration=iteration, kind="response", path=response_file)
                     except Exception as e:
                         log_message(f"Error saving response: {e}")
                 
@@ -799,9 +870,12 @@ def worker_tetris(
                     }
                     responses_dict[thread_id].append(response_data)
                     thread_responses.append(response_data)
+            except RequestCancelled:
+                log_message("Stop flag detected during API call. Request abandoned, exiting...")
+                break
             except Exception as e:
                 log_message(f"Error calling API: {e}")
-                time.sleep(5)
+                cancel_token.wait(5)
                 continue
             
             # 检查是否应该停止
@@ -810,6 +884,7 @@ def worker_tetris(
                 break
             
             # 提取和执行代码
+            execution_time = 0
             try:
                 # Extract Python code for execution
                 log_message(f"Extracting Python code from response...")
@@ -823,8 +898,17 @@ def worker_tetris(
                     if debug_pause:
                         input(f"[Thread {thread_id}] Press Enter to continue with code execution...")
                     
-                    # 执行代码
-                    execution_time = execute_model_code(clean_code, initial_screenshot_path, region)
+                    # 执行代码：解析为按键序列（"place T 1 3" 形式的目标位置直接展开为预计算的最短按键宏），
+                    # 交给唯一的输入执行线程，多个线程的按键不会交错
+                    executor = get_input_executor()
+                    ticket = executor.submit(
+                        simple_tetris_table().compile(clean_code),
+                        deadline=time.time() + plan_seconds,
+                        source=f"tetris thread {thread_id}",
+                    )
+                    executor.wait(ticket, token=cancel_token)
+                    execution_time = ticket.duration
+                    log_message(f"Actions {ticket.status}: {len(ticket.actions)} actions in {execution_time:.2f}s")
                 else:
                     log_message("No executable Python code found in response.")
                     execution_time = 0
@@ -847,19 +931,9 @@ def worker_tetris(
             wait_time = max(0, plan_seconds - elapsed - latency)  # 减去API调用和代码执行的时间
             log_message(f"Waiting {wait_time:.2f}s until next cycle...")
             
-            # 分段等待，便于及时响应停止请求
-            segment_size = 0.5  # 每段0.5秒
-            segments = int(wait_time / segment_size)
-            remainder = wait_time - (segments * segment_size)
-            
-            for _ in range(segments):
-                if should_stop():
-                    log_message("Stop flag detected during wait time.")
-                    break
-                time.sleep(segment_size)
-            
-            if not should_stop() and remainder > 0:
-                time.sleep(remainder)
+            # 等待期间一旦设置停止标志立即返回
+            if cancel_token.wait(wait_time):
+                log_message("Stop flag detected during wait time.")
                 
         except Exception as main_loop_error:
             log_message(f"Error in main loop: {main_loop_error}")
@@ -883,5 +957,9 @@ def worker_tetris(
         screenshot_stop_flag = True
         screenshot_thread.join(timeout=2)
     
+    if animation is not None:
+        animation.close()
+        animation.report()
+    
     log_message("Thread execution completed.")
     return "Thread execution completed."
@@ -0,0 +1,18 @@
+"""
+Cutting plans to a horizon with tools.actions.trim().
+"""
+
+from tools.actions import trim
+
+
+def test_trim_releases_keys_the_cut_part_released():
+    plan = [("keyDown", "right"), ("sleep", 1.5), ("keyUp", "right"), ("press", "a")]
+    assert trim(plan, 1.0) == [("keyDown", "right"), ("sleep", 1.0), ("keyUp", "right")]
+
+
+def test_trim_keeps_keys_held_past_the_plan():
+    # The plan itself never releases "right", so cutting it must not either
+    plan = [("keyDown", "right"), ("sleep", 0.5), ("press", "a")]
+    assert trim(plan, 1.0) == plan
+    cut = [("keyDown", "right"), ("sleep", 1.5), ("press", "a")]
+    assert trim(cut, 1.0) == [("keyDown", "right"), ("sleep", 1.0)]
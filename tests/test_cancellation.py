@@ -0,0 +1,115 @@
+"""
+Cancelled and timed-out requests: call_cancellable's on_done and the Mario
+scheduler's in-flight accounting for abandoned provider calls.
+"""
+
+import concurrent.futures
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from tools.serving.cancellation import CancellationToken, RequestCancelled, RequestTimeout, call_cancellable
+from tools.serving.concurrency import AdaptiveConcurrencyController
+
+
+def test_on_done_waits_for_abandoned_call():
+    release = threading.Event()
+    done = threading.Event()
+    token = CancellationToken()
+    threading.Timer(0.05, token.cancel).start()
+    with pytest.raises(RequestCancelled):
+        call_cancellable(release.wait, 5, token=token, on_done=done.set)
+    # The caller has given up, but the call is still running
+    assert not done.is_set()
+    release.set()
+    assert done.wait(1)
+
+
+def test_on_done_after_timeout():
+    done = threading.Event()
+    with pytest.raises(RequestTimeout):
+        call_cancellable(time.sleep, 0.2, timeout=0.02, on_done=done.set)
+    assert not done.is_set()
+    assert done.wait(1)
+
+
+def test_on_done_called_once():
+    calls = []
+    assert call_cancellable(lambda: 1, on_done=lambda: calls.append(1)) == 1
+    assert call_cancellable(lambda: 2, timeout=1, on_done=lambda: calls.append(2)) == 2
+    token = CancellationToken()
+    token.cancel()
+    with pytest.raises(RequestCancelled):
+        call_cancellable(lambda: 3, token=token, on_done=lambda: calls.append(3))
+    assert calls == [1, 2, 3]
+
+
+class SlowProvider:
+    """Stand-in completion helper: blocks for `duration` and records the peak number of concurrent calls."""
+    def __init__(self, duration):
+        self.duration = duration
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    def __call__(self, system_prompt, model_name, base64_image, prompt):
+        with self.lock:
+            self.active += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.duration)
+        with self.lock:
+            self.active -= 1
+        return "pyautogui.press('right')", None
+
+
+class NullExecutor:
+    def cancel(self, ticket):
+        pass
+
+    def report(self):
+        pass
+
+
+@pytest.mark.parametrize("mode", ["cancel", "timeout"])
+def test_scheduler_bounds_abandoned_calls(mode, monkeypatch, tmp_path):
+    pytest.importorskip("pyautogui")
+    from games.superMario import scheduler, workers
+
+    provider = SlowProvider(0.2)
+    monkeypatch.setitem(workers.COMPLETIONS, "anthropic", provider)
+    monkeypatch.setattr(scheduler.pyautogui, "size", lambda: (32, 32), raising=False)
+    monkeypatch.setattr(scheduler.pyautogui, "screenshot", lambda region=None: Image.new("RGB", (32, 32)),
+                        raising=False)
+    monkeypatch.chdir(tmp_path)
+
+    max_in_flight = 3
+    controller = AdaptiveConcurrencyController(0.01, initial_latency=1.0, max_limit=max_in_flight)
+    decision = scheduler.DecisionScheduler("system", "anthropic", "model", interval=0.01,
+                                           max_in_flight=max_in_flight, policy="short",
+                                           input_executor=NullExecutor(), controller=controller,
+                                           request_timeout=0.02 if mode == "timeout" else None)
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_in_flight)
+    try:
+        for tick in range(100):
+            decision._issue(pool, tick)
+            time.sleep(0.01)
+            if mode == "cancel":
+                # What _deliver does to requests for frames older than a new plan
+                with decision.cond:
+                    for _, token in decision.open_requests.values():
+                        token.cancel("superseded")
+    finally:
+        pool.shutdown(wait=True)
+
+    assert provider.calls > max_in_flight
+    assert provider.peak <= max_in_flight
+    assert decision.stats["skipped_ticks"] > 0
+    # Slots come back once the abandoned calls return
+    deadline = time.time() + 2
+    while decision.in_flight and time.time() < deadline:
+        time.sleep(0.01)
+    assert decision.in_flight == 0
@@ -0,0 +1,48 @@
+"""
+Placement macros started from the live piece instead of the spawn state.
+"""
+
+import pytest
+
+from games.tetris.board_renderer import PIECE_SHAPES
+from games.tetris.placement import OffsetRules, PlacementTable
+
+
+def play(rules, piece, state, keys):
+    for key in keys:
+        state = rules.step(piece, state, key) or state
+    return state
+
+
+@pytest.mark.parametrize("start", [(2, 7, 0), (1, 2, 0), (0, 4, 0), (3, 6, 1)])
+def test_placement_from_live_piece_reaches_target(start):
+    rules = OffsetRules(PIECE_SHAPES)
+    table = PlacementTable(rules)
+    for orientation in range(len(table.orientations["T"])):
+        for column in range(10):
+            keys = table.macro("T", orientation, column, spawn=start)
+            if keys is None:
+                continue
+            final = play(rules, "T", start, keys)
+            assert table.orientation("T", final, start) == orientation
+            assert min(x for x, _ in rules.cells("T", final)) == column
+
+
+def test_orientation_counts_from_current_rotation():
+    rules = OffsetRules(PIECE_SHAPES)
+    table = PlacementTable(rules)
+    # Orientation 0 keeps the piece as it is: no rotation, only moves
+    keys = table.macro("T", 0, 0, spawn=(2, 7, 0))
+    assert "up" not in keys
+    final = play(rules, "T", (2, 7, 0), keys)
+    assert final[0] == 2 and min(x for x, _ in rules.cells("T", final)) == 0
+    # From spawn the numbering is unchanged
+    assert table.macro("T", 1, 3) == table.macro("T", 1, 3, spawn=rules.spawn("T"))
+
+
+def test_compile_uses_live_piece_for_first_placement():
+    table = PlacementTable(OffsetRules(PIECE_SHAPES))
+    actions = table.compile("place T 0 0\nplace I 0 0", spawn=(2, 7, 0))
+    first = list(actions[:actions.index(("press", "space")) + 1])
+    assert first == [("press", key) for key in table.macro("T", 0, 0, spawn=(2, 7, 0))] + [("press", "space")]
+    assert list(actions[len(first):]) == [("press", key) for key in table.macro("I", 0, 0)] + [("press", "space")]
@@ -55,16 +55,28 @@ import time
 import base64
 import json
 import pyautogui
+from tools.actions import presses
+from tools.input_executor import get_input_executor
+from tools.overlay import get_font
+from games.tetris.board_renderer import PIECE_COLORS, PIECE_SHAPES, BoardRenderer
+from games.tetris.observation import (OBSERVATION_MODES, adapt_system_prompt, board_features, build_prompt,
+                                      downscale, encode_observation, prompt_family)
+from games.tetris.placement import PLACEMENT_PROMPT, OffsetRules, PlacementTable, simple_tetris_table
 import traceback
 import random
 from datetime import datetime
 from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageDraw
 from pynput import keyboard
 from pathlib import Path
 import argparse
 from dotenv import load_dotenv
 from openai import OpenAI
+from tools.animation import LiveAnimation
+from tools.pipeline import Pipeline, Stage
+from tools.replay_trace import TraceWriter
+from tools.session_index import LiveIndexer
+from tools.session_log import get_session_log
 
 # Load environment variables from .env file
 def load_env_file():
@@ -130,6 +142,20 @@ OUTPUT_DIR = OUTPUT_DIR_GEMINI  # Default output directory
 
 TETRIS_WINDOW_TITLE = "Simple Tetris"  # Window title to look for
 
+# Frame captions in the live animation (same wording as achieve_gif.py)
+FRAME_LABELS = {"screenshot": "Before Move", "pre_execution": "Before Move", "post_execution": "After Move"}
+
+
+def response_usage(response):
+    """Prompt/completion token counts of a chat completion (client object or JSON dict), if the API reported them"""
+    usage = response.get("usage") if isinstance(response, dict) else getattr(response, "usage", None)
+    if not usage:
+        return None
+    if not isinstance(usage, dict):
+        usage = {"prompt_tokens": getattr(usage, "prompt_tokens", None),
+                 "completion_tokens": getattr(usage, "completion_tokens", None)}
+    return {"prompt_tokens": usage.get("prompt_tokens"), "completion_tokens": usage.get("completion_tokens")}
+
 
 class OpenRouterProvider:
     """
@@ -150,6 +176,8 @@ class OpenRouterProvider:
                         - "openai/o3-mini-high" (OpenAI o3-mini-high)
         """
         self.model = model
+        self.last_usage = None  # token usage reported for the latest response
+        self.observation = "image"  # observation mode of the user prompt, set by the iterator
         # Verify API key is available
         self.api_key = os.getenv("OPENROUTER_API_KEY")
         if not self.api_key:
@@ -259,6 +287,7 @@ class OpenRouterProvider:
         pyautogui.press("up")
         ```
         """
+        system_prompt = adapt_system_prompt(system_prompt, self.observation)
         
         try:
             # Call the OpenRouter API using OpenAI client format
@@ -276,6 +305,8 @@ class OpenRouterProvider:
                 temperature=0.2
             )
             
+            self.last_usage = response_usage(response)
+            
             # Return the text from the response
             if hasattr(response, 'choices') and len(response.choices) > 0:
                 return response.choices[0].message.content
@@ -312,6 +343,8 @@ class OpenAIProvider:
                         - "gpt-4-turbo" - Has vision capabilities
         """
         self.model = model
+        self.last_usage = None  # token usage reported for the latest response
+        self.observation = "image"  # observation mode of the user prompt, set by the iterator
         # Verify API key is available
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
@@ -373,6 +406,7 @@ pyautogui.press("up")
 
 Here's the current Tetris game state image:
 """
+        system_prompt = adapt_system_prompt(system_prompt, self.observation)
         
         try:
             # Skip image for o3-mini model which doesn't support vision
@@ -433,6 +467,8 @@ Here's the current Tetris game state image:
             # Call the OpenAI API with the prepared parameters
             response = self.client.chat.completions.create(**request_params)
             
+            self.last_usage = response_usage(response)
+            
             # Return the text from the response
             if hasattr(response, 'choices') and len(response.choices) > 0:
                 return response.choices[0].message.content
@@ -468,6 +504,8 @@ class DashScopeProvider:
                         - "qwen-vl-max" - Qwen VL Max model (larger)
         """
         self.model = model
+        self.last_usage = None  # token usage reported for the latest response
+        self.observation = "image"  # observation mode of the user prompt, set by the iterator
         # Verify API key is available
         self.api_key = os.getenv("DASHSCOPE_API_KEY")
         if not self.api_key:
@@ -526,6 +564,7 @@ pyautogui.press("up")
 
 Here's the current Tetris game state image:
 """
+        system_prompt = adapt_system_prompt(system_prompt, self.observation)
         
         try:
             # Create message content based on whether we have an image
@@ -570,6 +609,8 @@ Here's the current Tetris game state image:
                 temperature=0.2
             )
             
+            self.last_usage = response_usage(response)
+            
             # Return the text from the response
             if hasattr(response, 'choices') and len(response.choices) > 0:
                 return response.choices[0].message.content
@@ -604,6 +645,8 @@ class ThreeZeroTwoProvider:
             model (str): The name of the model to use on 302.ai API, default is qwen2.5-vl-72b-instruct.
         """
         self.model = model
+        self.last_usage = None  # token usage reported for the latest response
+        self.observation = "image"  # observation mode of the user prompt, set by the iterator
         # Verify API key is available
         self.api_key = os.getenv("THREEZEROTWO_API_KEY")
         if not self.api_key:
@@ -660,6 +703,7 @@ pyautogui.press("up")
 
 Here's the current Tetris game state image:
 """
+        system_prompt = adapt_system_prompt(system_prompt, self.observation)
         
         try:
             # Prepare messages for API call
@@ -720,6 +764,8 @@ Here's the current Tetris game state image:
             # Parse the response
             response_data = json.loads(data.decode("utf-8"))
             
+            self.last_usage = response_usage(response_data)
+            
             # Extract the content from the response
             if "choices" in response_data and len(response_data["choices"]) > 0:
                 content = response_data["choices"][0]["message"]["content"]
@@ -744,7 +790,7 @@ Here's the current Tetris game state image:
 
 
 class TetrisAIIterator:
-    def __init__(self, model=None, output_dir=None, window_title=None, save_responses=False, use_direct_openai=False, use_dashscope=False, use_302_ai=False):
+    def __init__(self, model=None, output_dir=None, window_title=None, save_responses=False, use_direct_openai=False, use_dashscope=False, use_302_ai=False, seed=None):
         """
         Initialize the Tetris AI Iterator.
         
@@ -756,6 +802,7 @@ class TetrisAIIterator:
             use_direct_openai (bool, optional): Whether to use OpenAI API directly. Defaults to False.
             use_dashscope (bool, optional): Whether to use DashScope API directly. Defaults to False.
             use_302_ai (bool, optional): Whether to use 302.ai API directly. Defaults to False.
+            seed (int, optional): Seed for simulated boards and the piece sequence. Defaults to None.
         """
         # Create the appropriate provider
         if use_direct_openai:
@@ -788,23 +835,37 @@ class TetrisAIIterator:
         # Simulation mode flag and state
         self.use_simulated_board = True  # Default to True
         self.simulated_board = None
+        self.board_renderer = BoardRenderer()
         self.board_state = None
         self.current_piece = None
         self.next_piece = None
+        self.rng = random.Random(seed)
+        self.placement_table = None
+        
+        # Replay trace (tools/replay_trace.py); set by --trace, replaces the PNG screenshots
+        self.trace = None
+        self.last_frame = None  # trace frame number of the latest screenshot, which the next request is about
+        
+        # Session animation built as frames are captured (tools/animation.py); set by --live-animation
+        self.animation = None
+        
+        # What the model is shown (games/tetris/observation.py): "image", or the exact
+        # simulated state as "text"/"json", optionally with the board image scaled down
+        self.observation = "image"
+        self.observation_image_scale = 0.0
+        self.prompt_family = prompt_family(self.model, self.provider_name)
         
         # Create output directories
         os.makedirs(self.screenshots_dir, exist_ok=True)
         if self.save_responses:
             os.makedirs(self.responses_dir, exist_ok=True)
         
-        # Create log file
-        self.log_path = os.path.join(self.session_dir, "session_log")
-        with open(self.log_path, "w", encoding="utf-8") as f:
-            f.write(f"=== Tetris AI Iterator Session started at {datetime.now()} ===\n\n")
-            f.write(f"Model: {self.model}\n")
-            f.write(f"Provider: {self.provider_name}\n")
-            f.write(f"Window title: {self.window_title}\n")
-            f.write(f"Output directory: {self.session_dir}\n\n")
+        # Create log file (JSON lines, shared by every thread of this session)
+        self.log_path = os.path.join(self.session_dir, "session_log.jsonl")
+        self.session_log = get_session_log(self.log_path)
+        self.session_log.log("session_start", iterator="tetris_ai_iterator", model=self.model,
+                             provider=self.provider_name, window_title=self.window_title,
+                             output_dir=self.session_dir)
         
         # System prompt
         self.system_prompt = """You are an expert Tetris player. 
@@ -853,12 +914,42 @@ Here's the current Tetris game state image:
         # Print to console
         print(log_entry)
         
-        # Save to log file
-        try:
-            with open(self.log_path, "a", encoding="utf-8", errors="replace") as f:
-                f.write(log_entry + "\n")
-        except Exception as e:
-            print(f"Error writing to log file: {e}")
+        # Buffered structured record; written by the session log's flush thread
+        self.session_log.log("message", iteration=self.iteration, message=message)
+
+    def log_artifact(self, kind, path, label=None, iteration=None):
+        """Log a saved file: a message for the console (if labelled) plus an "artifact" record for the session index"""
+        if label:
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+            print(f"[{timestamp}] {label} saved to: {path}")
+        iteration = self.iteration if iteration is None else iteration
+        self.session_log.log("artifact", iteration=iteration, kind=kind, path=path)
+
+    def save_frame(self, image, kind, path, label=None, iteration=None):
+        """
+        Save a screenshot into the replay trace when one is recorded, otherwise as a PNG file.
+
+        iteration defaults to the current one; the --pipeline execute stage passes the
+        iteration of the frame it is acting on, since capture has moved on by then.
+        """
+        iteration = self.iteration if iteration is None else iteration
+        if self.animation is not None:
+            self.animation.add(image, f"Iteration {iteration}: {FRAME_LABELS.get(kind, 'Frame')}")
+        if self.trace is not None:
+            number = self.trace.add_frame(image, iteration=iteration, label=kind)
+            if kind == "screenshot":
+                self.last_frame = number
+            return None
+        image.save(path)
+        self.log_artifact(kind, path, label, iteration)
+        return path
+
+    def trace_state(self, label, iteration=None):
+        """Record the symbolic simulated-board state in the replay trace"""
+        if self.trace is not None and self.use_simulated_board:
+            iteration = self.iteration if iteration is None else iteration
+            self.trace.add_event("state", iteration=iteration, label=label, board=self.board_state,
+                                 current_piece=self.current_piece, next_piece=self.next_piece)
 
     def find_tetris_window(self):
         """Find the Tetris window coordinates"""
@@ -936,178 +1027,13 @@ Here's the current Tetris game state image:
         if self.next_piece is None:
             self.next_piece = {'type': 'I'}
             
-        # Define colors for Tetris pieces
-        colors = {
-            0: (0, 0, 0),         # Empty (black)
-            1: (0, 240, 240),     # I - Cyan
-            2: (0, 0, 240),       # J - Blue
-            3: (240, 160, 0),     # L - Orange
-            4: (240, 240, 0),     # O - Yellow
-            5: (0, 240, 0),       # S - Green
-            6: (160, 0, 240),     # T - Purple
-            7: (240, 0, 0),       # Z - Red
-            8: (100, 100, 100),   # Ghost piece (gray)
-            9: (50, 50, 50)       # Grid line (dark gray)
-        }
-        
-        # Tetris piece shapes (different rotations)
-        piece_shapes = {
-            'I': [
-                [(0, 0), (1, 0), (2, 0), (3, 0)],  # Horizontal
-                [(1, -1), (1, 0), (1, 1), (1, 2)]  # Vertical
-            ],
-            'J': [
-                [(0, 0), (0, 1), (1, 1), (2, 1)],  # ┌──
-                [(1, 0), (2, 0), (1, 1), (1, 2)],  # │└─
-                [(0, 1), (1, 1), (2, 1), (2, 2)],  # ──┘
-                [(1, 0), (1, 1), (1, 2), (0, 2)]   # ─┐
-            ],                                       # └┘
-            'L': [
-                [(0, 1), (1, 1), (2, 1), (2, 0)],  # ──┐
-                [(1, 0), (1, 1), (1, 2), (2, 2)],  # └─┘
-                [(0, 1), (1, 1), (2, 1), (0, 2)],  # ┌──
-                [(0, 0), (1, 0), (1, 1), (1, 2)]   # │└─
-            ],
-            'O': [
-                [(0, 0), (1, 0), (0, 1), (1, 1)]   # Square
-            ],
-            'S': [
-                [(1, 0), (2, 0), (0, 1), (1, 1)],  # ─┐
-                [(1, 0), (1, 1), (2, 1), (2, 2)]   # └┘
-            ],
-            'T': [
-                [(1, 0), (0, 1), (1, 1), (2, 1)],  # ─┬─
-                [(1, 0), (1, 1), (2, 1), (1, 2)],  # └┼─
-                [(0, 1), (1, 1), (2, 1), (1, 2)],  # ─┼┘
-                [(1, 0), (0, 1), (1, 1), (1, 2)]   # ─┼┐
-            ],                                      # └┘
-            'Z': [
-                [(0, 0), (1, 0), (1, 1), (2, 1)],  # ┌─┐
-                [(2, 0), (1, 1), (2, 1), (1, 2)]   # └─┘
-            ]
-        }
-        
-        # Store piece shapes for movement simulation
-        self.piece_shapes = piece_shapes
-        
-        # Mapping from piece type to color index
-        piece_colors = {
-            'I': 1,
-            'J': 2,
-            'L': 3,
-            'O': 4,
-            'S': 5,
-            'T': 6,
-            'Z': 7
-        }
-        
-        # Store piece colors for later use
-        self.piece_colors = piece_colors
-        
-        # Create image (board + UI elements)
-        # Grid cell size in pixels
-        cell_size = 30
-        
-        # Main board dimensions
-        board_width = 10 * cell_size
-        board_height = 20 * cell_size
-        
-        # UI panel width
-        ui_width = 6 * cell_size
-        
-        # Total image dimensions
-        img_width = board_width + ui_width
-        img_height = board_height
-        
-        # Create blank image with black background
-        image = Image.new('RGB', (img_width, img_height), colors[0])
-        draw = ImageDraw.Draw(image)
-        
-        # Draw grid lines
-        for x in range(11):
-            x_pos = x * cell_size
-            draw.line([(x_pos, 0), (x_pos, board_height)], fill=colors[9], width=1)
-        
-        for y in range(21):
-            y_pos = y * cell_size
-            draw.line([(0, y_pos), (board_width, y_pos)], fill=colors[9], width=1)
-        
-        # Draw board state (existing pieces)
-        for y, row in enumerate(self.board_state):
-            for x, cell in enumerate(row):
-                if cell > 0:
-                    # Draw filled cell
-                    rect = [
-                        x * cell_size + 1,
-                        y * cell_size + 1,
-                        (x + 1) * cell_size - 1,
-                        (y + 1) * cell_size - 1
-                    ]
-                    draw.rectangle(rect, fill=colors[cell])
-        
-        # Draw current piece
-        if self.current_piece:
-            piece_type = self.current_piece['type']
-            rotation = self.current_piece.get('rotation', 0) % len(piece_shapes[piece_type])
-            x_offset = self.current_piece['x']
-            y_offset = self.current_piece['y']
-            
-            for x, y in piece_shapes[piece_type][rotation]:
-                rect = [
-                    (x_offset + x) * cell_size + 1,
-                    (y_offset + y) * cell_size + 1,
-                    (x_offset + x + 1) * cell_size - 1,
-                    (y_offset + y + 1) * cell_size - 1
-                ]
-                draw.rectangle(rect, fill=colors[piece_colors[piece_type]])
-        
-        # Draw UI panel
-        ui_start_x = board_width
-        
-        # Draw panel background
-        draw.rectangle([
-            ui_start_x, 0,
-            img_width, img_height
-        ], fill=(30, 30, 30))
-        
-        # Draw "NEXT" text
-        try:
-            font = ImageFont.truetype("arial.ttf", 20)
-        except:
-            font = ImageFont.load_default()
-        
-        draw.text((ui_start_x + 20, 20), "NEXT", fill=(255, 255, 255), font=font)
-        
-        # Draw next piece
-        if self.next_piece:
-            piece_type = self.next_piece['type']
-            next_piece_color = piece_colors[piece_type]
-            
-            # Center the piece in the next piece box
-            next_x = ui_start_x + ui_width // 2 - cell_size
-            next_y = 60
-            
-            # Draw only the first rotation
-            for x, y in piece_shapes[piece_type][0]:
-                rect = [
-                    next_x + x * cell_size + 1,
-                    next_y + y * cell_size + 1,
-                    next_x + (x + 1) * cell_size - 1,
-                    next_y + (y + 1) * cell_size - 1
-                ]
-                draw.rectangle(rect, fill=colors[next_piece_color])
-        
-        # Draw score or other UI elements
-        draw.text((ui_start_x + 10, 180), "SCORE", fill=(255, 255, 255), font=font)
-        draw.text((ui_start_x + 10, 210), "0", fill=(255, 255, 255), font=font)
-        
-        # Draw level
-        draw.text((ui_start_x + 10, 260), "LEVEL", fill=(255, 255, 255), font=font)
-        draw.text((ui_start_x + 10, 290), "1", fill=(255, 255, 255), font=font)
-        
-        # Add a watermark to indicate this is a simulated board
-        draw.text((ui_start_x + 10, img_height - 30), "SIMULATED", fill=(255, 100, 100), font=font)
-        
+        # Piece tables for movement simulation
+        self.piece_shapes = PIECE_SHAPES
+        self.piece_colors = PIECE_COLORS
+
+        # Sprite-atlas renderer, redraws only what changed (games/tetris/board_renderer.py)
+        image = self.board_renderer.render_image(self.board_state, self.current_piece, self.next_piece)
+
         self.simulated_board = image
         return image
 
@@ -1122,17 +1048,15 @@ Here's the current Tetris game state image:
         Returns:
             tuple: (board_state, current_piece, next_piece)
         """
-        import random
-        
         # Generate random board
         board = [[0 for _ in range(10)] for _ in range(20)]
         
         # Fill bottom part randomly
         for y in range(20 - 1, 20 - max_height, -1):
             for x in range(10):
-                if random.randint(1, 100) <= fill_percentage:
+                if self.rng.randint(1, 100) <= fill_percentage:
                     # Random piece color (1-7)
-                    board[y][x] = random.randint(1, 7)
+                    board[y][x] = self.rng.randint(1, 7)
         
         # Make sure top few rows are empty for piece placement
         for y in range(3):
@@ -1142,18 +1066,45 @@ Here's the current Tetris game state image:
         # Generate random current piece
         piece_types = ['I', 'J', 'L', 'O', 'S', 'T', 'Z']
         current_piece = {
-            'type': random.choice(piece_types),
-            'x': random.randint(2, 7),
+            'type': self.rng.choice(piece_types),
+            'x': self.rng.randint(2, 7),
             'y': 0,
-            'rotation': random.randint(0, 3)
+            'rotation': self.rng.randint(0, 3)
         }
         
         # Generate random next piece
         next_piece = {
-            'type': random.choice(piece_types)
+            'type': self.rng.choice(piece_types)
         }
         
         return board, current_piece, next_piece
+
+    def snapshot_state(self):
+        """
+        Capture the simulated board, pieces and RNG position
+
+        Returns:
+            dict: Snapshot that can be passed to restore_state()
+        """
+        return {
+            'board_state': [row[:] for row in self.board_state] if self.board_state else None,
+            'current_piece': dict(self.current_piece) if self.current_piece else None,
+            'next_piece': dict(self.next_piece) if self.next_piece else None,
+            'rng_state': self.rng.getstate(),
+        }
+
+    def restore_state(self, snapshot):
+        """
+        Restore a snapshot taken with snapshot_state() and redraw the simulated board
+
+        Args:
+            snapshot: Dict returned by snapshot_state()
+        """
+        self.board_state = [row[:] for row in snapshot['board_state']] if snapshot['board_state'] else None
+        self.current_piece = dict(snapshot['current_piece']) if snapshot['current_piece'] else None
+        self.next_piece = dict(snapshot['next_piece']) if snapshot['next_piece'] else None
+        self.rng.setstate(snapshot['rng_state'])
+        self.create_simulated_tetris_board()
     
     def capture_screenshot(self):
         """Capture screenshot of the Tetris game"""
@@ -1161,9 +1112,10 @@ Here's the current Tetris game state image:
         if self.use_simulated_board and self.simulated_board:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
             screenshot_path = os.path.join(self.screenshots_dir, f"{timestamp}_simulated_iter_{self.iteration}")
-            self.simulated_board.save(screenshot_path + ".png")  # Still need .png for PIL to save properly
-            self.log_message(f"Simulated Tetris board saved to: {screenshot_path}")
-            return screenshot_path + ".png", self.simulated_board
+            screenshot_path = self.save_frame(self.simulated_board, "screenshot", screenshot_path + ".png",
+                                              "Simulated Tetris board")
+            self.trace_state("screenshot")
+            return screenshot_path, self.simulated_board
             
         # Otherwise capture a real screenshot
         try:
@@ -1177,21 +1129,13 @@ Here's the current Tetris game state image:
             # Save screenshot
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
             screenshot_path = os.path.join(self.screenshots_dir, f"{timestamp}_iter_{self.iteration}")
-            screenshot.save(screenshot_path + ".png")  # Still need .png for PIL to save properly
             
             # Add timestamp to screenshot
             draw = ImageDraw.Draw(screenshot)
-            try:
-                font = ImageFont.truetype("arial.ttf", 14)
-            except:
-                font = ImageFont.load_default()
+            draw.text((10, 10), f"{timestamp} - Iteration {self.iteration}", fill="white", font=get_font(14))
+            screenshot_path = self.save_frame(screenshot, "screenshot", screenshot_path + ".png", "Screenshot")
             
-            draw.text((10, 10), f"{timestamp} - Iteration {self.iteration}", fill="white", font=font)
-            screenshot.save(screenshot_path + ".png")
-            
-            self.log_message(f"Screenshot saved to: {screenshot_path}")
-            
-            return screenshot_path + ".png", screenshot
+            return screenshot_path, screenshot
             
         except Exception as e:
             self.log_message(f"Error capturing screenshot: {str(e)}")
@@ -1298,38 +1242,83 @@ Here's the current Tetris game state image:
             next_piece=self.next_piece
         )
 
-    def call_model_api(self, image):
-        """Call model API with the Tetris screenshot"""
+    def observe(self, image, state=None, base64_image=None):
+        """
+        Prompt and (optional) base64 image for one request, per the observation mode.
+
+        Args:
+            image: The board image (screenshot or simulated board).
+            state: snapshot_state() taken with the image; defaults to the current state.
+            base64_image: The image, if it is already encoded.
+
+        Returns:
+            tuple: (prompt, base64_image or None)
+        """
+        if self.observation == "image" or not self.use_simulated_board:
+            # Real screenshots have no symbolic state to encode
+            return self.instruction_prompt, base64_image or self.encode_image(image)
+        
+        state = state or {'board_state': self.board_state, 'current_piece': self.current_piece,
+                          'next_piece': self.next_piece}
+        observation = encode_observation(self.observation, state['board_state'], state['current_piece'],
+                                         state['next_piece'])
+        with_image = self.observation_image_scale > 0
+        prompt = build_prompt(self.instruction_prompt, observation, self.observation, self.prompt_family, with_image)
+        return prompt, self.encode_image(downscale(image, self.observation_image_scale)) if with_image else None
+
+    def call_model_api(self, image, base64_image=None, prompt=None, iteration=None, frame=None):
+        """
+        Call model API for the Tetris board.
+
+        Pass prompt and base64_image from observe() if they are already built (base64_image
+        None then means a text-only request); otherwise they are built here. iteration and
+        frame (trace frame number of the screenshot) default to the latest capture; the
+        --pipeline request stage passes the ones of the frame it is answering.
+        """
+        if iteration is None:
+            iteration, frame = self.iteration, self.last_frame
         try:
-            self.log_message(f"Calling {self.provider_name} API with model {self.model} (iteration {self.iteration})...")
+            self.log_message(f"Calling {self.provider_name} API with model {self.model} (iteration {iteration})...")
             start_time = time.time()
             
-            # Encode image
-            base64_image = self.encode_image(image)
+            # Build the observation
+            if prompt is None:
+                prompt, base64_image = self.observe(image, base64_image=base64_image)
             
             # Call model API
-            response = self.provider.get_response(self.instruction_prompt, base64_image)
+            self.provider.last_usage = None
+            self.provider.observation = self.observation if self.use_simulated_board else "image"
+            response = self.provider.get_response(prompt, base64_image)
             
             elapsed_time = time.time() - start_time
             self.log_message(f"{self.provider_name} API response received in {elapsed_time:.2f}s")
             
             # Log response to session log
-            self.log_message(f"=== {self.provider_name} API Response (Iteration {self.iteration}) ===")
+            self.log_message(f"=== {self.provider_name} API Response (Iteration {iteration}) ===")
             self.log_message(f"Model: {self.model}")
             self.log_message(f"API Latency: {elapsed_time:.2f}s")
+            usage = self.provider.last_usage or {}
+            self.session_log.log("response", iteration=iteration, model=self.model, latency=elapsed_time,
+                                 observation=self.observation if self.use_simulated_board else "image",
+                                 prompt_chars=len(prompt),
+                                 image_chars=len(base64_image or ""), **usage)
+            if self.trace is not None:
+                self.trace.add_event("request", iteration=iteration, ts=start_time, model=self.model,
+                                     prompt=prompt, frame=frame)
+                self.trace.add_event("response", iteration=iteration, text=response, latency=elapsed_time)
             
             # Save the response if enabled
             if self.save_responses:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                response_path = os.path.join(self.responses_dir, f"{timestamp}_response_{self.iteration}")
+                response_path = os.path.join(self.responses_dir, f"{timestamp}_response_{iteration}")
                 with open(response_path, "w", encoding="utf-8") as f:
-                    f.write(f"=== {self.provider_name} API Response (Iteration {self.iteration}) ===\n")
+                    f.write(f"=== {self.provider_name} API Response (Iteration {iteration}) ===\n")
                     f.write(f"Timestamp: {timestamp}\n")
                     f.write(f"Model: {self.model}\n")
                     f.write(f"API Latency: {elapsed_time:.2f}s\n\n")
                     f.write(response)
                 
-                self.log_message(f"Response saved to: {response_path}")
+                self.log_artifact("response", response_path, "Response", iteration)
             
             return response
             
@@ -1402,7 +1391,7 @@ Here's the current Tetris game state image:
         lines = text.split("\n")
         code_lines = []
         for line in lines:
-            if "pyautogui" in line:
+            if "pyautogui" in line or line.strip().lower().startswith("place "):
                 code_lines.append(line.strip())
         
         if code_lines:
@@ -1410,8 +1399,25 @@ Here's the current Tetris game state image:
         
         return None
 
-    def execute_code(self, code):
+    def get_placement_table(self):
+        """Placement macros for the board being played (built on first use)"""
+        if self.placement_table is None:
+            if self.use_simulated_board and getattr(self, "piece_shapes", None):
+                self.placement_table = PlacementTable(OffsetRules(self.piece_shapes))
+            else:
+                self.placement_table = simple_tetris_table()
+        return self.placement_table
+
+    def placement_spawn(self):
+        """State of the simulated piece in play, where "place" answers start from (None for the real game)"""
+        if not (self.use_simulated_board and self.current_piece):
+            return None
+        piece = self.current_piece
+        return (piece.get('rotation', 0) % len(self.piece_shapes[piece['type']]), piece['x'], piece['y'])
+
+    def execute_code(self, code, iteration=None):
         """Execute the code from Gemini's response and simulate the movement"""
+        iteration = self.iteration if iteration is None else iteration
         if not code:
             self.log_message("No executable code found in response.")
             return
@@ -1419,24 +1425,19 @@ Here's the current Tetris game state image:
         self.log_message("Executing code...")
         self.log_message(f"Code to execute:\n{code}")
         
-        # Create a new dictionary to store the actions that will be performed
-        actions = []
-        
-        # Extract actions from the code
-        lines = code.strip().split('\n')
-        for line in lines:
-            if 'pyautogui.press' in line:
-                # Extract key from the press command
-                import re
-                match = re.search(r'press\([\'"](.+?)[\'"]\)', line)
-                if match:
-                    key = match.group(1)
-                    actions.append(key)
+        # Compile the response once: the simulator steps through the key presses and
+        # the real game runs the same action list through the input executor (no exec)
+        compiled = list(self.get_placement_table().compile(code, self.placement_spawn()))
+        actions = presses(compiled)
         
         self.log_message(f"Extracted actions: {actions}")
+        self.session_log.log("actions", iteration=iteration, actions=actions)
+        if self.trace is not None:
+            self.trace.add_event("actions", iteration=iteration, actions=actions, compiled=compiled)
         
         if not actions:
             self.log_message("No valid actions found in code.")
+            self.log_quality(lines=0, pieces=0, iteration=iteration)
             return
         
         # Check if there's already a space (hard drop) in the actions
@@ -1445,15 +1446,17 @@ Here's the current Tetris game state image:
         # If no hard drop is included, add one at the end to ensure the piece drops to the floor
         if not has_hard_drop:
             actions.append('space')
+            compiled.append(("press", "space"))
             self.log_message("Automatically adding 'space' action to drop piece to floor")
         
         # Take a pre-execution screenshot of the initial state
         if self.use_simulated_board and self.simulated_board:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            pre_screenshot_path = os.path.join(self.screenshots_dir, f"{timestamp}_pre_execution_{self.iteration}")
-            self.simulated_board.save(pre_screenshot_path + ".png")
+            pre_screenshot_path = os.path.join(self.screenshots_dir, f"{timestamp}_pre_execution_{iteration}")
+            self.save_frame(self.simulated_board, "pre_execution", pre_screenshot_path + ".png", iteration=iteration)
         
         # Simulate piece movement based on actions
+        lines = pieces = 0
         if self.use_simulated_board and self.current_piece:
             # Clone the current piece for simulation
             piece = self.current_piece.copy()
@@ -1505,9 +1508,9 @@ Here's the current Tetris game state image:
                     
                     # Lock the piece in place
                     self.lock_piece(piece)
+                    pieces += 1
                     
                     # Use next piece as current piece
-                    import random
                     piece_types = ['I', 'J', 'L', 'O', 'S', 'T', 'Z']
                     self.current_piece = {
                         'type': self.next_piece['type'],
@@ -1515,13 +1518,13 @@ Here's the current Tetris game state image:
                         'y': 0,
                         'rotation': 0
                     }
-                    self.next_piece = {'type': random.choice(piece_types)}
+                    self.next_piece = {'type': self.rng.choice(piece_types)}
                     
                     # Update piece for further actions
                     piece = self.current_piece.copy()
                     
                     # Check and clear lines
-                    self.clear_lines()
+                    lines += self.clear_lines()
             
             # Update current piece with the final position
             self.current_piece = piece
@@ -1532,23 +1535,18 @@ Here's the current Tetris game state image:
         
             # Take a post-execution screenshot of the updated state
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            post_screenshot_path = os.path.join(self.screenshots_dir, f"{timestamp}_post_execution_{self.iteration}")
-            self.simulated_board.save(post_screenshot_path + ".png")
-            self.log_message(f"Post-execution screenshot saved to: {post_screenshot_path}")
+            post_screenshot_path = os.path.join(self.screenshots_dir, f"{timestamp}_post_execution_{iteration}")
+            self.save_frame(self.simulated_board, "post_execution", post_screenshot_path + ".png",
+                            "Post-execution screenshot", iteration)
+            self.trace_state("post_execution", iteration)
+            self.log_quality(lines=lines, pieces=pieces, iteration=iteration)
         
-        # Also execute the code using PyAutoGUI for real-game scenarios
+        # Also run the actions for real-game scenarios
         try:
-            # Add necessary imports
-            if "import pyautogui" not in code:
-                code = "import pyautogui\nimport time\n" + code
-            
-            # If we automatically added a space action, add it to the code too
-            if not has_hard_drop and not self.use_simulated_board:
-                code += "\n# Automatically added to drop piece to floor\npyautogui.press('space')"
-            
-            # Execute the code (only for real game mode)
+            # Execute the actions (only for real game mode)
             if not self.use_simulated_board:
-                exec(code, {"pyautogui": pyautogui, "time": time})
+                ticket = get_input_executor().submit(compiled, source=f"iteration {iteration}")
+                ticket.wait()
             
             self.log_message("Code execution completed.")
             
@@ -1556,6 +1554,19 @@ Here's the current Tetris game state image:
             self.log_message(f"Error executing code: {str(e)}")
             traceback.print_exc()
 
+    def log_quality(self, lines, pieces, iteration=None):
+        """
+        Log the simulated board after a move (lines cleared, holes, heights) to compare observation modes.
+
+        Tagged with the iteration of the answered frame so the report joins it with that "response" record.
+        """
+        if not self.use_simulated_board or not self.board_state:
+            return
+        features = board_features(self.board_state)
+        iteration = self.iteration if iteration is None else iteration
+        self.session_log.log("quality", iteration=iteration, observation=self.observation,
+                             lines=lines, pieces=pieces, **features)
+
     def run(self):
         """Main loop"""
         self.log_message("=== Starting Tetris AI Iterator ===")
@@ -1619,6 +1630,58 @@ Here's the current Tetris game state image:
             self.log_message("=== Tetris AI Iterator finished ===")
 
 
+    def run_pipelined(self, report_interval=10.0):
+        """
+        Main loop as a staged pipeline: capture -> encode -> request -> execute.
+
+        Each stage runs in its own thread with a one-item queue in between, so the
+        next screenshot is captured and encoded while the model is still answering
+        the previous one. There is no space-key pause between iterations; press Ctrl+C
+        to stop. A frame captured while the previous plan is still pending can be one
+        plan behind by the time it is answered.
+        """
+        self.log_message("=== Starting Tetris AI Iterator (pipelined) ===")
+        self.log_message(f"Output directory: {self.session_dir}")
+
+        def capture():
+            self.iteration += 1
+            screenshot_path, screenshot = self.capture_screenshot()
+            if screenshot is None:
+                time.sleep(1)
+                return None
+            # The execute stage moves the pieces meanwhile, so keep the state this frame shows
+            state = self.snapshot_state() if self.use_simulated_board else None
+            return {"iteration": self.iteration, "frame": self.last_frame, "path": screenshot_path,
+                    "image": screenshot, "state": state}
+
+        def encode(frame):
+            frame["prompt"], frame["base64_image"] = self.observe(frame["image"], frame["state"])
+            return frame
+
+        def request(frame):
+            frame["response"] = self.call_model_api(frame["image"], base64_image=frame["base64_image"],
+                                                    prompt=frame["prompt"], iteration=frame["iteration"],
+                                                    frame=frame["frame"])
+            return frame
+
+        def execute(frame):
+            self.log_message(f"\n=== Iteration {frame['iteration']} ===")
+            code = self.extract_python_code(frame["response"])
+            self.execute_code(code, frame["iteration"])
+            return frame
+
+        pipeline = Pipeline([
+            Stage("capture", capture),
+            Stage("encode", encode),
+            Stage("request", request),
+            Stage("execute", execute),
+        ], name="TetrisPipeline", report_interval=report_interval)
+        try:
+            pipeline.run(should_stop=lambda: self.stop_flag)
+        finally:
+            self.log_message("=== Tetris AI Iterator finished ===")
+
+
 def cleanup_txt_files():
     """Remove any .txt files in the gemini_tetris_outputs directory"""
     try:
@@ -1668,10 +1731,25 @@ def main():
                         help="Piece type for simple simulation (default: T)")
     parser.add_argument("--fill", type=int, default=30, help="Fill percentage for complex board (default: 30)")
     parser.add_argument("--height", type=int, default=15, help="Maximum height for complex board (default: 15)")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible simulated boards")
     
     # Output options
     parser.add_argument("--save-responses", action="store_true", help="Save API responses to files")
     parser.add_argument("--cleanup", action="store_true", help="Remove any existing .txt files in the output directory")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Overlap capture/encoding with model requests (no space-key pause between iterations)")
+    parser.add_argument("--placements", action="store_true",
+                        help="Ask the model for target placements (piece, rotation, column) instead of key presses")
+    parser.add_argument("--trace", action="store_true",
+                        help="Record a single-file replay trace (replay.gatr) instead of PNG screenshots")
+    parser.add_argument("--live-animation", action="store_true",
+                        help="Keep animations/live.gif in the session directory up to date while running")
+    parser.add_argument("--observation", choices=OBSERVATION_MODES, default="image",
+                        help="What the model is shown of a simulated board: the image, or its exact state as text/json")
+    parser.add_argument("--observation-image-scale", type=float, default=0.0,
+                        help="With --observation text/json, also send the board image scaled by this factor (e.g. 0.5)")
+    parser.add_argument("--index-db", type=str, default=None,
+                        help="Keep this SQLite session index (see tools/session_index.py) updated while running")
     
     args = parser.parse_args()
     
@@ -1747,8 +1825,18 @@ def main():
         save_responses=args.save_responses,
         use_direct_openai=use_direct_openai,
         use_dashscope=use_dashscope,
-        use_302_ai=use_302_ai
+        use_302_ai=use_302_ai,
+        seed=args.seed
     )
+    iterator.observation = args.observation
+    iterator.observation_image_scale = args.observation_image_scale
+    if args.observation != "image":
+        print(f"Sending the board as {args.observation} ({iterator.prompt_family} prompt template)"
+              + (f" with the image at {args.observation_image_scale}x" if args.observation_image_scale > 0 else ""))
+    if args.placements:
+        # Offer the placement format right before the image
+        marker = "Here's the current Tetris game state image:"
+        iterator.instruction_prompt = iterator.instruction_prompt.replace(marker, PLACEMENT_PROMPT.strip() + "\n\n" + marker)
     
     # Set manual window position if provided
     if args.window:
@@ -1786,8 +1874,35 @@ def main():
             # Create simple board with just one piece
             iterator.create_simple_tetris_board(piece_type=args.piece)
     
+    if args.trace:
+        iterator.trace = TraceWriter(os.path.join(iterator.session_dir, "replay.gatr"),
+                                     metadata={"model": iterator.model, "provider": iterator.provider_name,
+                                               "iterator": "tetris_ai_iterator"})
+        print(f"Recording replay trace to {iterator.trace.path}")
+    
+    if args.live_animation:
+        iterator.animation = LiveAnimation(os.path.join(iterator.session_dir, "animations", "live.gif"))
+        print(f"Writing live animation to {iterator.animation.output_path}")
+    
+    indexer = LiveIndexer(args.index_db, iterator.session_dir).start() if args.index_db else None
+    
     # Run the iterator
-    iterator.run()
+    try:
+        if args.pipeline:
+            iterator.run_pipelined()
+        else:
+            iterator.run()
+    finally:
+        if iterator.animation is not None:
+            iterator.animation.close()
+            iterator.animation.report()
+        if iterator.trace is not None:
+            iterator.trace.close()
+            iterator.trace.report()
+        if indexer is not None:
+            # Flush the session log so the final index pass sees every record
+            iterator.session_log.close()
+            indexer.stop()
 
 
 if __name__ == "__main__":
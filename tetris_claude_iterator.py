@@ -26,13 +26,19 @@ import time
 import base64
 import json
 import pyautogui
+from tools.actions import compile_actions, presses
+from tools.input_executor import get_input_executor
+from tools.overlay import get_font
+from games.tetris.board_renderer import PIECE_COLORS, PIECE_SHAPES, BoardRenderer
+from tools.session_log import get_session_log
 import traceback
 from datetime import datetime
 from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageDraw
 from pynput import keyboard
 from pathlib import Path
 import argparse
+import random
 
 # Load environment variables from .env file
 def load_env_file():
@@ -77,7 +83,7 @@ TETRIS_WINDOW_TITLE = "Simple Tetris"  # Window title to look for
 
 
 class TetrisClaudeIterator:
-    def __init__(self, model=None, output_dir=None, window_title=None, save_responses=False):
+    def __init__(self, model=None, output_dir=None, window_title=None, save_responses=False, seed=None):
         self.client = anthropic.Anthropic(api_key=CLAUDE_API_KEY)
         self.iteration = 0
         self.stop_flag = False
@@ -96,22 +102,22 @@ class TetrisClaudeIterator:
         # Simulation mode flag and state
         self.use_simulated_board = True  # Default to True now
         self.simulated_board = None
+        self.board_renderer = BoardRenderer()
         self.board_state = None
         self.current_piece = None
         self.next_piece = None
+        self.rng = random.Random(seed)
         
         # Create output directories
         os.makedirs(self.screenshots_dir, exist_ok=True)
         if self.save_responses:
             os.makedirs(self.responses_dir, exist_ok=True)
         
-        # Create log file
-        self.log_path = os.path.join(self.session_dir, "session_log")
-        with open(self.log_path, "w", encoding="utf-8") as f:
-            f.write(f"=== Tetris Claude Iterator Session started at {datetime.now()} ===\n\n")
-            f.write(f"Model: {self.model}\n")
-            f.write(f"Window title: {self.window_title}\n")
-            f.write(f"Output directory: {self.session_dir}\n\n")
+        # Create log file (JSON lines, shared by every thread of this session)
+        self.log_path = os.path.join(self.session_dir, "session_log.jsonl")
+        self.session_log = get_session_log(self.log_path)
+        self.session_log.log("session_start", iterator="tetris_claude_iterator", model=self.model,
+                             window_title=self.window_title, output_dir=self.session_dir)
         
         # System prompt
         self.system_prompt = """You are an expert Tetris player. 
@@ -154,12 +160,8 @@ Here's the current Tetris game state image:
         # Print to console
         print(log_entry)
         
-        # Save to log file
-        try:
-            with open(self.log_path, "a", encoding="utf-8", errors="replace") as f:
-                f.write(log_entry + "\n")
-        except Exception as e:
-            print(f"Error writing to log file: {e}")
+        # Buffered structured record; written by the session log's flush thread
+        self.session_log.log("message", iteration=self.iteration, message=message)
 
     def find_tetris_window(self):
         """Find the Tetris window coordinates"""
@@ -237,178 +239,13 @@ Here's the current Tetris game state image:
         if self.next_piece is None:
             self.next_piece = {'type': 'I'}
             
-        # Define colors for Tetris pieces
-        colors = {
-            0: (0, 0, 0),         # Empty (black)
-            1: (0, 240, 240),     # I - Cyan
-            2: (0, 0, 240),       # J - Blue
-            3: (240, 160, 0),     # L - Orange
-            4: (240, 240, 0),     # O - Yellow
-            5: (0, 240, 0),       # S - Green
-            6: (160, 0, 240),     # T - Purple
-            7: (240, 0, 0),       # Z - Red
-            8: (100, 100, 100),   # Ghost piece (gray)
-            9: (50, 50, 50)       # Grid line (dark gray)
-        }
-        
-        # Tetris piece shapes (different rotations)
-        piece_shapes = {
-            'I': [
-                [(0, 0), (1, 0), (2, 0), (3, 0)],  # Horizontal
-                [(1, -1), (1, 0), (1, 1), (1, 2)]  # Vertical
-            ],
-            'J': [
-                [(0, 0), (0, 1), (1, 1), (2, 1)],  # ┌──
-                [(1, 0), (2, 0), (1, 1), (1, 2)],  # │└─
-                [(0, 1), (1, 1), (2, 1), (2, 2)],  # ──┘
-                [(1, 0), (1, 1), (1, 2), (0, 2)]   # ─┐
-            ],                                       # └┘
-            'L': [
-                [(0, 1), (1, 1), (2, 1), (2, 0)],  # ──┐
-                [(1, 0), (1, 1), (1, 2), (2, 2)],  # └─┘
-                [(0, 1), (1, 1), (2, 1), (0, 2)],  # ┌──
-                [(0, 0), (1, 0), (1, 1), (1, 2)]   # │└─
-            ],
-            'O': [
-                [(0, 0), (1, 0), (0, 1), (1, 1)]   # Square
-            ],
-            'S': [
-                [(1, 0), (2, 0), (0, 1), (1, 1)],  # ─┐
-                [(1, 0), (1, 1), (2, 1), (2, 2)]   # └┘
-            ],
-            'T': [
-                [(1, 0), (0, 1), (1, 1), (2, 1)],  # ─┬─
-                [(1, 0), (1, 1), (2, 1), (1, 2)],  # └┼─
-                [(0, 1), (1, 1), (2, 1), (1, 2)],  # ─┼┘
-                [(1, 0), (0, 1), (1, 1), (1, 2)]   # ─┼┐
-            ],                                      # └┘
-            'Z': [
-                [(0, 0), (1, 0), (1, 1), (2, 1)],  # ┌─┐
-                [(2, 0), (1, 1), (2, 1), (1, 2)]   # └─┘
-            ]
-        }
-        
-        # Store piece shapes for movement simulation
-        self.piece_shapes = piece_shapes
-        
-        # Mapping from piece type to color index
-        piece_colors = {
-            'I': 1,
-            'J': 2,
-            'L': 3,
-            'O': 4,
-            'S': 5,
-            'T': 6,
-            'Z': 7
-        }
-        
-        # Store piece colors for later use
-        self.piece_colors = piece_colors
-        
-        # Create image (board + UI elements)
-        # Grid cell size in pixels
-        cell_size = 30
-        
-        # Main board dimensions
-        board_width = 10 * cell_size
-        board_height = 20 * cell_size
-        
-        # UI panel width
-        ui_width = 6 * cell_size
-        
-        # Total image dimensions
-        img_width = board_width + ui_width
-        img_height = board_height
-        
-        # Create blank image with black background
-        image = Image.new('RGB', (img_width, img_height), colors[0])
-        draw = ImageDraw.Draw(image)
-        
-        # Draw grid lines
-        for x in range(11):
-            x_pos = x * cell_size
-            draw.line([(x_pos, 0), (x_pos, board_height)], fill=colors[9], width=1)
-        
-        for y in range(21):
-            y_pos = y * cell_size
-            draw.line([(0, y_pos), (board_width, y_pos)], fill=colors[9], width=1)
-        
-        # Draw board state (existing pieces)
-        for y, row in enumerate(self.board_state):
-            for x, cell in enumerate(row):
-                if cell > 0:
-                    # Draw filled cell
-                    rect = [
-                        x * cell_size + 1,
-                        y * cell_size + 1,
-                        (x + 1) * cell_size - 1,
-                        (y + 1) * cell_size - 1
-                    ]
-                    draw.rectangle(rect, fill=colors[cell])
-        
-        # Draw current piece
-        if self.current_piece:
-            piece_type = self.current_piece['type']
-            rotation = self.current_piece.get('rotation', 0) % len(piece_shapes[piece_type])
-            x_offset = self.current_piece['x']
-            y_offset = self.current_piece['y']
-            
-            for x, y in piece_shapes[piece_type][rotation]:
-                rect = [
-                    (x_offset + x) * cell_size + 1,
-                    (y_offset + y) * cell_size + 1,
-                    (x_offset + x + 1) * cell_size - 1,
-                    (y_offset + y + 1) * cell_size - 1
-                ]
-                draw.rectangle(rect, fill=colors[piece_colors[piece_type]])
-        
-        # Draw UI panel
-        ui_start_x = board_width
-        
-        # Draw panel background
-        draw.rectangle([
-            ui_start_x, 0,
-            img_width, img_height
-        ], fill=(30, 30, 30))
-        
-        # Draw "NEXT" text
-        try:
-            font = ImageFont.truetype("arial.ttf", 20)
-        except:
-            font = ImageFont.load_default()
-        
-        draw.text((ui_start_x + 20, 20), "NEXT", fill=(255, 255, 255), font=font)
-        
-        # Draw next piece
-        if self.next_piece:
-            piece_type = self.next_piece['type']
-            next_piece_color = piece_colors[piece_type]
-            
-            # Center the piece in the next piece box
-            next_x = ui_start_x + ui_width // 2 - cell_size
-            next_y = 60
-            
-            # Draw only the first rotation
-            for x, y in piece_shapes[piece_type][0]:
-                rect = [
-                    next_x + x * cell_size + 1,
-                    next_y + y * cell_size + 1,
-                    next_x + (x + 1) * cell_size - 1,
-                    next_y + (y + 1) * cell_size - 1
-                ]
-                draw.rectangle(rect, fill=colors[next_piece_color])
-        
-        # Draw score or other UI elements
-        draw.text((ui_start_x + 10, 180), "SCORE", fill=(255, 255, 255), font=font)
-        draw.text((ui_start_x + 10, 210), "0", fill=(255, 255, 255), font=font)
-        
-        # Draw level
-        draw.text((ui_start_x + 10, 260), "LEVEL", fill=(255, 255, 255), font=font)
-        draw.text((ui_start_x + 10, 290), "1", fill=(255, 255, 255), font=font)
-        
-        # Add a watermark to indicate this is a simulated board
-        draw.text((ui_start_x + 10, img_height - 30), "SIMULATED", fill=(255, 100, 100), font=font)
-        
+        # Piece tables for movement simulation
+        self.piece_shapes = PIECE_SHAPES
+        self.piece_colors = PIECE_COLORS
+
+        # Sprite-atlas renderer, redraws only what changed (games/tetris/board_renderer.py)
+        image = self.board_renderer.render_image(self.board_state, self.current_piece, self.next_piece)
+
         self.simulated_board = image
         return image
 
@@ -423,17 +260,15 @@ Here's the current Tetris game state image:
         Returns:
             tuple: (board_state, current_piece, next_piece)
         """
-        import random
-        
         # Generate random board
         board = [[0 for _ in range(10)] for _ in range(20)]
         
         # Fill bottom part randomly
         for y in range(20 - 1, 20 - max_height, -1):
             for x in range(10):
-                if random.randint(1, 100) <= fill_percentage:
+                if self.rng.randint(1, 100) <= fill_percentage:
                     # Random piece color (1-7)
-                    board[y][x] = random.randint(1, 7)
+                    board[y][x] = self.rng.randint(1, 7)
         
         # Make sure top few rows are empty for piece placement
         for y in range(3):
@@ -443,18 +278,45 @@ Here's the current Tetris game state image:
         # Generate random current piece
         piece_types = ['I', 'J', 'L', 'O', 'S', 'T', 'Z']
         current_piece = {
-            'type': random.choice(piece_types),
-            'x': random.randint(2, 7),
+            'type': self.rng.choice(piece_types),
+            'x': self.rng.randint(2, 7),
             'y': 0,
-            'rotation': random.randint(0, 3)
+            'rotation': self.rng.randint(0, 3)
         }
         
         # Generate random next piece
         next_piece = {
-            'type': random.choice(piece_types)
+            'type': self.rng.choice(piece_types)
         }
         
         return board, current_piece, next_piece
+
+    def snapshot_state(self):
+        """
+        Capture the simulated board, pieces and RNG position
+
+        Returns:
+            dict: Snapshot that can be passed to restore_state()
+        """
+        return {
+            'board_state': [row[:] for row in self.board_state] if self.board_state else None,
+            'current_piece': dict(self.current_piece) if self.current_piece else None,
+            'next_piece': dict(self.next_piece) if self.next_piece else None,
+            'rng_state': self.rng.getstate(),
+        }
+
+    def restore_state(self, snapshot):
+        """
+        Restore a snapshot taken with snapshot_state() and redraw the simulated board
+
+        Args:
+            snapshot: Dict returned by snapshot_state()
+        """
+        self.board_state = [row[:] for row in snapshot['board_state']] if snapshot['board_state'] else None
+        self.current_piece = dict(snapshot['current_piece']) if snapshot['current_piece'] else None
+        self.next_piece = dict(snapshot['next_piece']) if snapshot['next_piece'] else None
+        self.rng.setstate(snapshot['rng_state'])
+        self.create_simulated_tetris_board()
     
     def capture_screenshot(self):
         """Capture screenshot of the Tetris game"""
@@ -482,12 +344,7 @@ Here's the current Tetris game state image:
             
             # Add timestamp to screenshot
             draw = ImageDraw.Draw(screenshot)
-            try:
-                font = ImageFont.truetype("arial.ttf", 14)
-            except:
-                font = ImageFont.load_default()
-            
-            draw.text((10, 10), f"{timestamp} - Iteration {self.iteration}", fill="white", font=font)
+            draw.text((10, 10), f"{timestamp} - Iteration {self.iteration}", fill="white", font=get_font(14))
             screenshot.save(screenshot_path + ".png")
             
             self.log_message(f"Screenshot saved to: {screenshot_path}")
@@ -635,19 +492,10 @@ Here's the current Tetris game state image:
         self.log_message("Executing code...")
         self.log_message(f"Code to execute:\n{code}")
         
-        # Create a new dictionary to store the actions that will be performed
-        actions = []
-        
-        # Extract actions from the code
-        lines = code.strip().split('\n')
-        for line in lines:
-            if 'pyautogui.press' in line:
-                # Extract key from the press command
-                import re
-                match = re.search(r'press\([\'"](.+?)[\'"]\)', line)
-                if match:
-                    key = match.group(1)
-                    actions.append(key)
+        # Compile the response once: the simulator steps through the key presses and
+        # the real game runs the same action list through the input executor (no exec)
+        compiled = list(compile_actions(code))
+        actions = presses(compiled)
         
         self.log_message(f"Extracted actions: {actions}")
         
@@ -714,7 +562,6 @@ Here's the current Tetris game state image:
                     self.lock_piece(piece)
                     
                     # Use next piece as current piece
-                    import random
                     piece_types = ['I', 'J', 'L', 'O', 'S', 'T', 'Z']
                     self.current_piece = {
                         'type': self.next_piece['type'],
@@ -722,7 +569,7 @@ Here's the current Tetris game state image:
                         'y': 0,
                         'rotation': 0
                     }
-                    self.next_piece = {'type': random.choice(piece_types)}
+                    self.next_piece = {'type': self.rng.choice(piece_types)}
                     
                     # Update piece for further actions
                     piece = self.current_piece.copy()
@@ -742,15 +589,12 @@ Here's the current Tetris game state image:
         self.simulated_board.save(post_screenshot_path + ".png")  # Still need .png for PIL to save properly
         self.log_message(f"Post-execution screenshot saved to: {post_screenshot_path}")
         
-        # Also execute the code using PyAutoGUI for real-game scenarios
+        # Also run the actions for real-game scenarios
         try:
-            # Add necessary imports
-            if "import pyautogui" not in code:
-                code = "import pyautogui\nimport time\n" + code
-            
-            # Execute the code (only for real game mode)
+            # Execute the actions (only for real game mode)
             if not self.use_simulated_board:
-                exec(code, {"pyautogui": pyautogui, "time": time})
+                ticket = get_input_executor().submit(compiled, source=f"iteration {self.iteration}")
+                ticket.wait()
             
             self.log_message("Code execution completed.")
             
@@ -948,6 +792,7 @@ def main():
                         help="Piece type for simple simulation (default: T)")
     parser.add_argument("--fill", type=int, default=30, help="Fill percentage for complex board (default: 30)")
     parser.add_argument("--height", type=int, default=15, help="Maximum height for complex board (default: 15)")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible simulated boards")
     
     # Output options
     parser.add_argument("--save-responses", action="store_true", help="Save API responses to files")
@@ -964,7 +809,8 @@ def main():
         model=args.model, 
         output_dir=args.output_dir, 
         window_title=args.window_title,
-        save_responses=args.save_responses
+        save_responses=args.save_responses,
+        seed=args.seed
     )
     
     # Set manual window position if provided
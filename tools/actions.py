@@ -0,0 +1,330 @@
+"""
+Restricted action language for model output
+
+Model responses are compiled once into a compact list of (op, arg) actions
+instead of being exec'd. The same action list drives the simulators (which
+only need the sequence of key taps) and the real InputExecutor (which times
+every action against a schedule), and it can be inspected, trimmed and
+merged by schedulers before it runs.
+
+Two input forms compile to the same actions:
+
+1. The action DSL, one command per line (or separated by ';'), '#' comments:
+
+       press left            tap a key
+       press left x3         tap it three times
+       hold right 0.5        hold a key for 0.5s, then release it
+       hold x                press and keep holding until "release x"
+       release x
+       wait 0.2              pause
+       combo right+x         press keys together, release in reverse order
+
+2. The PyAutoGUI code models are usually prompted for: pyautogui.press /
+   keyDown / keyUp / hotkey / write / typewrite, time.sleep and
+   pyautogui.sleep with literal arguments, and `for _ in range(n)` loops
+   around them. Nothing is ever executed; anything else is skipped.
+
+Actions are ("press", key), ("keyDown", key), ("keyUp", key) and
+("sleep", seconds).
+
+Usage:
+    from tools.actions import compile_actions, presses, trim, to_dsl
+
+    actions = compile_actions(response_code)      # cached by text
+    simulate(presses(actions))                    # ['left', 'left', 'space']
+    executor.submit(trim(actions, 1.0))
+"""
+
+import ast
+import functools
+import re
+
+# Loops in generated code are unrolled up to this many iterations
+MAX_LOOP_REPEAT = 50
+
+# Compiled plans kept by compile_actions()
+CACHE_SIZE = 256
+
+# Call name -> action for the pyautogui / time functions generated code uses
+KEY_CALLS = {"press", "keyDown", "keyUp", "hotkey", "write", "typewrite"}
+SLEEP_CALLS = {"sleep"}
+
+DSL_COMMANDS = {"press", "hold", "release", "wait", "combo"}
+_DSL_REPEAT = re.compile(r"^x(\d+)$")
+
+
+def _call_name(node):
+    """Return (module, function) for calls like pyautogui.press(...) or time.sleep(...)."""
+    if isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name):
+        return node.func.value.id, node.func.attr
+    if isinstance(node.func, ast.Name):
+        return None, node.func.id
+    return None, None
+
+
+def _call_to_actions(node):
+    module, name = _call_name(node)
+    args = [ast.literal_eval(arg) for arg in node.args]
+    kwargs = {kw.arg: ast.literal_eval(kw.value) for kw in node.keywords if kw.arg}
+
+    if name in SLEEP_CALLS and module in ("time", "pyautogui", None):
+        return [("sleep", float(args[0] if args else kwargs.get("secs", 0)))]
+
+    if module != "pyautogui" or name not in KEY_CALLS:
+        raise ValueError(f"unsupported call {module + '.' if module else ''}{name}()")
+
+    actions = []
+    if name == "press":
+        keys = args[0] if args else kwargs.get("keys")
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        presses = int(args[1] if len(args) > 1 else kwargs.get("presses", 1))
+        interval = float(args[2] if len(args) > 2 else kwargs.get("interval", 0.0))
+        for i in range(presses):
+            for key in keys:
+                if actions and interval:
+                    actions.append(("sleep", interval))
+                actions.append(("press", key))
+    elif name in ("keyDown", "keyUp"):
+        actions.append((name, args[0] if args else kwargs.get("key")))
+    elif name == "hotkey":
+        actions.extend(("keyDown", key) for key in args)
+        actions.extend(("keyUp", key) for key in reversed(args))
+    else:  # write / typewrite
+        text = args[0] if args else kwargs.get("message", "")
+        interval = float(args[1] if len(args) > 1 else kwargs.get("interval", 0.0))
+        for char in text:
+            if actions and interval:
+                actions.append(("sleep", interval))
+            actions.append(("press", char))
+    return actions
+
+
+def _statements_to_actions(statements, skipped):
+    actions = []
+    for statement in statements:
+        try:
+            if isinstance(statement, (ast.Import, ast.ImportFrom, ast.Pass)):
+                continue
+            if isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Constant):
+                continue  # docstring / bare string
+            if isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Call):
+                actions.extend(_call_to_actions(statement.value))
+                continue
+            if (isinstance(statement, ast.For) and isinstance(statement.iter, ast.Call)
+                    and _call_name(statement.iter) == (None, "range") and not statement.orelse):
+                bounds = [ast.literal_eval(arg) for arg in statement.iter.args]
+                repeat = min(len(range(*bounds)), MAX_LOOP_REPEAT)
+                body = _statements_to_actions(statement.body, skipped)
+                actions.extend(body * repeat)
+                continue
+            raise ValueError(f"unsupported statement: {ast.dump(statement)[:60]}")
+        except (ValueError, TypeError, SyntaxError) as e:
+            skipped.append(f"line {getattr(statement, 'lineno', '?')}: {e}")
+    return actions
+
+
+def _dsl_command_to_actions(words):
+    command, args = words[0].lower(), words[1:]
+    if command == "press":
+        if not args:
+            raise ValueError("press needs a key")
+        repeat = 1
+        if len(args) > 1:
+            match = _DSL_REPEAT.match(args[1].lower())
+            if not match:
+                raise ValueError(f"expected xN after the key, got '{args[1]}'")
+            repeat = min(int(match.group(1)), MAX_LOOP_REPEAT)
+        return [("press", args[0])] * repeat
+    if command == "hold":
+        if not args:
+            raise ValueError("hold needs a key")
+        if len(args) == 1:
+            return [("keyDown", args[0])]
+        return [("keyDown", args[0]), ("sleep", float(args[1])), ("keyUp", args[0])]
+    if command == "release":
+        if not args:
+            raise ValueError("release needs a key")
+        return [("keyUp", args[0])]
+    if command == "wait":
+        if not args:
+            raise ValueError("wait needs a duration")
+        return [("sleep", float(args[0]))]
+    # combo
+    keys = [key for key in "".join(args).split("+") if key]
+    if not keys:
+        raise ValueError("combo needs keys joined by '+'")
+    return [("keyDown", key) for key in keys] + [("keyUp", key) for key in reversed(keys)]
+
+
+def parse_dsl(text, skipped=None):
+    """
+    Parse the action DSL into actions. Lines that do not parse are skipped
+    (and described in `skipped` when a list is given).
+    """
+    actions = []
+    for lineno, line in enumerate(text.splitlines(), 1):
+        for command in line.split("#", 1)[0].split(";"):
+            words = command.split()
+            if not words:
+                continue
+            try:
+                if words[0].lower() not in DSL_COMMANDS:
+                    raise ValueError(f"unknown command '{words[0]}'")
+                actions.extend(_dsl_command_to_actions(words))
+            except ValueError as e:
+                if skipped is not None:
+                    skipped.append(f"line {lineno}: {e}")
+    return actions
+
+
+def is_dsl(text):
+    """True if the first command in `text` is a DSL command rather than Python."""
+    for line in text.splitlines():
+        words = line.split("#", 1)[0].split()
+        if words:
+            return words[0].lower() in DSL_COMMANDS
+    return False
+
+
+def parse_actions(code, verbose=True):
+    """
+    Compile model output (action DSL or PyAutoGUI code) into a flat list of (op, arg) actions.
+
+    Unsupported statements are skipped (and reported when verbose), never executed.
+
+    Args:
+        code (str): Text from the model.
+        verbose (bool): Print skipped statements.
+
+    Returns:
+        list: Actions such as ("press", "left"), ("keyDown", "x"), ("sleep", 0.2).
+    """
+    if not code:
+        return []
+
+    skipped = []
+    if is_dsl(code):
+        actions = parse_dsl(code, skipped)
+    else:
+        try:
+            statements = ast.parse(code).body
+        except SyntaxError as e:
+            if verbose:
+                print(f"[Actions] Could not parse code: {e}")
+            return []
+        actions = _statements_to_actions(statements, skipped)
+
+    if verbose and skipped:
+        print(f"[Actions] Skipped {len(skipped)} unsupported statement(s): {'; '.join(skipped[:3])}")
+    return actions
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _compile_cached(code):
+    return tuple(parse_actions(code, verbose=True))
+
+
+def compile_actions(code):
+    """
+    Cached parse_actions(): identical responses (common for repeated plans and
+    for the simulator and executor sharing one response) are compiled once.
+
+    Returns:
+        tuple: Immutable action sequence.
+    """
+    return _compile_cached(code or "")
+
+
+def duration(actions):
+    """Seconds of explicit waiting in a plan (key events themselves are treated as instant)."""
+    return sum(arg for op, arg in actions if op == "sleep")
+
+
+def timeline(actions):
+    """
+    Key events with their start offsets, e.g. [(0.0, "keyDown", "right"), (0.5, "keyUp", "right")].
+    Waits become offsets, so an executor can run every event at an absolute time
+    instead of accumulating the drift of one sleep after another.
+    """
+    events = []
+    offset = 0.0
+    for op, arg in actions:
+        if op == "sleep":
+            offset += arg
+        else:
+            events.append((offset, op, arg))
+    return events
+
+
+def presses(actions):
+    """
+    Keys in the order they take effect, for simulators that step a game per key:
+    taps and key-downs count, waits and releases do not.
+    """
+    return [arg for op, arg in actions if op in ("press", "keyDown")]
+
+
+def held_keys(actions):
+    """Keys still held down at the end of a plan."""
+    held = []
+    for op, arg in actions:
+        if op == "keyDown" and arg not in held:
+            held.append(arg)
+        elif op == "keyUp" and arg in held:
+            held.remove(arg)
+    return held
+
+
+def trim(actions, max_seconds):
+    """
+    Cut a plan after `max_seconds` of waiting, shortening the wait that crosses
+    the limit and releasing any key the cut-off part would have released.
+    """
+    trimmed = []
+    elapsed = 0.0
+    for index, (op, arg) in enumerate(actions):
+        if op == "sleep":
+            if elapsed + arg >= max_seconds:
+                if max_seconds - elapsed > 0:
+                    trimmed.append(("sleep", max_seconds - elapsed))
+                # Keys held on purpose past the end of the plan stay held
+                released = {key for op, key in actions[index + 1:] if op == "keyUp"}
+                trimmed.extend(("keyUp", key) for key in held_keys(trimmed) if key in released)
+                break
+            elapsed += arg
+        trimmed.append((op, arg))
+    return trimmed
+
+
+def merge(*plans):
+    """
+    Concatenate plans, dropping a release immediately followed by a press of
+    the same key so a key held across the boundary stays held.
+    """
+    merged = []
+    for plan in plans:
+        for op, arg in plan:
+            if op == "keyDown" and merged and merged[-1] == ("keyUp", arg):
+                merged.pop()
+                continue
+            merged.append((op, arg))
+    return merged
+
+
+def to_dsl(actions):
+    """Render actions back as DSL text, e.g. for logs."""
+    lines = []
+    for op, arg in actions:
+        if op == "press":
+            match = re.match(r"^press (\S+)(?: x(\d+))?$", lines[-1]) if lines else None
+            if match and match.group(1) == arg:
+                lines[-1] = f"press {arg} x{int(match.group(2) or 1) + 1}"
+            else:
+                lines.append(f"press {arg}")
+        elif op == "keyDown":
+            lines.append(f"hold {arg}")
+        elif op == "keyUp":
+            lines.append(f"release {arg}")
+        elif op == "sleep":
+            lines.append(f"wait {arg:g}")
+    return "\n".join(lines)
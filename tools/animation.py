@@ -0,0 +1,192 @@
+"""
+Incremental animation encoders
+
+GifStreamWriter and VideoStreamWriter write an animation one frame at a time,
+so neither achieve_gif.py nor a running agent ever holds a whole session of
+frames in memory. The GIF writer ends the file with a trailer after every
+frame (overwritten by the next one), so the file on disk is always a complete,
+playable GIF that a dashboard can reload while the session is running.
+
+LiveAnimation feeds frames captured by an agent loop into a GifStreamWriter
+on a background thread, so the session animation is always up to date and
+nothing has to re-read the screenshots afterwards.
+
+Usage:
+    from tools.animation import LiveAnimation
+
+    animation = LiveAnimation("session_x/animations/live.gif", fps=2)
+    animation.add(screenshot, label="Iteration 3: After Move")
+    animation.close()
+"""
+
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+from PIL import GifImagePlugin, Image
+
+from tools.overlay import draw_label
+
+# Colors taken from the first frame of a live animation; the rest of the palette
+# is a coarse color cube for colors that only show up later
+LIVE_ADAPTIVE_COLORS = 192
+
+
+def live_palette(frame, colors=LIVE_ADAPTIVE_COLORS):
+    """
+    Palette for an animation whose later frames are not known yet: the colors of
+    `frame` plus a 4x4x4 color cube so new colors still map to something close.
+    """
+    adaptive = frame.convert("RGB").quantize(colors=colors, method=Image.Quantize.MEDIANCUT)
+    used = adaptive.getpalette()[:colors * 3]
+    used += [0, 0, 0] * (colors - len(used) // 3)
+    levels = [0, 85, 170, 255]
+    cube = [channel for r in levels for g in levels for b in levels for channel in (r, g, b)]
+    palette = Image.new("P", (1, 1))
+    palette.putpalette((used + cube)[:768])
+    return palette
+
+
+class GifStreamWriter:
+    """
+    Writes a GIF one frame at a time with a single global palette. Each frame
+    after the first only stores the rectangle that changed since the previous
+    one. The file is terminated after every frame, so it is valid at any time.
+    """
+    def __init__(self, output_path, fps, palette=None):
+        self.file = open(output_path, "wb")
+        self.duration = int(1000 / fps)
+        self.palette = palette
+        self.previous = None
+        self.frames = 0
+
+    def write(self, frame):
+        if self.palette is None:
+            # No global palette given: derive it from the first frame
+            self.palette = frame.quantize(colors=256, method=Image.Quantize.MEDIANCUT)
+        indexed = frame.convert("RGB").quantize(palette=self.palette, dither=Image.Dither.NONE)
+        pixels = np.asarray(indexed)
+
+        if self.previous is None:
+            header, _ = GifImagePlugin.getheader(indexed, info={"loop": 0, "duration": self.duration})
+            self.file.write(b"".join(header))
+            box = (0, 0) + indexed.size
+        else:
+            changed = pixels != self.previous
+            rows, cols = np.nonzero(changed.any(axis=1))[0], np.nonzero(changed.any(axis=0))[0]
+            if len(rows):
+                box = (int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1)
+            else:
+                box = (0, 0, 1, 1)  # unchanged frame: repaint one pixel to keep the timing
+            # Overwrite the trailer written after the previous frame
+            self.file.seek(-1, os.SEEK_END)
+        self.previous = pixels
+
+        region = indexed if box == (0, 0) + indexed.size else indexed.crop(box)
+        region.palette = indexed.palette
+        # Disposal 1 leaves the previous frame in place under the changed rectangle
+        self.file.write(b"".join(GifImagePlugin.getdata(region, offset=box[:2], duration=self.duration, disposal=1)))
+        self.file.write(b";")
+        self.file.flush()
+        self.frames += 1
+
+    def close(self):
+        self.file.close()
+
+
+class VideoStreamWriter:
+    """Writes MP4/WebM through imageio's ffmpeg writer, one frame at a time"""
+    CODECS = {"mp4": "libx264", "webm": "libvpx-vp9"}
+
+    def __init__(self, output_path, fps, output_format):
+        import imageio
+        # Sizes are rounded to even numbers, which yuv420p requires
+        self.writer = imageio.get_writer(output_path, fps=fps, codec=self.CODECS[output_format],
+                                         macro_block_size=2, quality=8 if output_format == "mp4" else None)
+
+    def write(self, frame):
+        self.writer.append_data(np.asarray(frame.convert("RGB")))
+
+    def close(self):
+        self.writer.close()
+
+
+class LiveAnimation:
+    """
+    Session animation built while the agent runs.
+
+    add() only queues a copy of the frame; labelling, quantizing and writing
+    happen on a background thread. Frames that arrive while the queue is full
+    are dropped rather than slowing the agent down.
+
+    Args:
+        output_path (str): GIF file, rewritten in place after every frame.
+        fps (int): Playback frames per second.
+        size (tuple, optional): Frames of another size are resized to this.
+            Defaults to the size of the first frame.
+        queue_size (int): Frames waiting to be encoded before new ones are dropped.
+    """
+    def __init__(self, output_path, fps=2, size=None, queue_size=32):
+        self.output_path = output_path
+        self.fps = fps
+        self.size = size
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.writer = None
+        self.stats = {"frames": 0, "dropped": 0, "errors": 0, "encode_seconds": 0.0}
+        self.thread = threading.Thread(target=self._run, daemon=True, name="LiveAnimation")
+        self.thread.start()
+
+    def add(self, image, label=None):
+        """Queue a frame (PIL image); returns False if it was dropped."""
+        try:
+            self.queue.put_nowait((image.copy(), label))
+            return True
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            image, label = item
+            start = time.perf_counter()
+            try:
+                self._write(image, label)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[LiveAnimation] Error adding frame to {self.output_path}: {e}")
+            self.stats["encode_seconds"] += time.perf_counter() - start
+
+    def _write(self, image, label):
+        image = image.convert("RGB")
+        if self.size is None:
+            self.size = image.size
+        elif image.size != self.size:
+            image = image.resize(self.size, Image.LANCZOS)
+        if label:
+            draw_label(image, label)
+        if self.writer is None:
+            self.writer = GifStreamWriter(self.output_path, self.fps, live_palette(image))
+        self.writer.write(image)
+        self.stats["frames"] += 1
+
+    def close(self, timeout=10.0):
+        """Encode the queued frames and close the file."""
+        self.queue.put(None)
+        self.thread.join(timeout)
+        if self.writer is not None:
+            self.writer.close()
+
+    def report(self):
+        frames = max(self.stats["frames"], 1)
+        print(f"[LiveAnimation] {self.output_path}: {self.stats['frames']} frames, "
+              f"{self.stats['dropped']} dropped, {self.stats['errors']} errors, "
+              f"{self.stats['encode_seconds'] / frames * 1000:.1f}ms per frame")
@@ -0,0 +1,130 @@
+"""
+Per-board cost of the simulated Tetris board renderer, before and after the sprite atlas
+
+"before" reproduces what create_simulated_tetris_board in the tetris_*_iterator.py
+scripts used to do for every board: a new image, grid lines, one
+ImageDraw.rectangle per filled cell and the panel drawn on top. "after" uses
+games/tetris/board_renderer.py.
+
+Cases:
+    random   unrelated random boards (every cell can change between renders)
+    play     one board with a piece falling and rotating, as in a game
+
+Usage:
+    python -m tools.board_renderer_benchmark --renders 300
+"""
+
+import argparse
+import random
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from games.tetris.board_renderer import COLORS, PIECE_COLORS, PIECE_SHAPES, BoardRenderer
+from tools.overlay import draw_text
+
+PIECE_TYPES = "IJLOSTZ"
+
+
+def render_before(board_state, current_piece, next_piece, cell_size=30):
+    board_width, board_height, ui_width = 10 * cell_size, 20 * cell_size, 6 * cell_size
+    image = Image.new('RGB', (board_width + ui_width, board_height), COLORS[0])
+    draw = ImageDraw.Draw(image)
+    for x in range(11):
+        draw.line([(x * cell_size, 0), (x * cell_size, board_height)], fill=COLORS[9], width=1)
+    for y in range(21):
+        draw.line([(0, y * cell_size), (board_width, y * cell_size)], fill=COLORS[9], width=1)
+
+    def cell(x, y, color, left=0, top=0):
+        draw.rectangle([left + x * cell_size + 1, top + y * cell_size + 1,
+                        left + (x + 1) * cell_size - 1, top + (y + 1) * cell_size - 1], fill=color)
+
+    for y, row in enumerate(board_state):
+        for x, value in enumerate(row):
+            if value > 0:
+                cell(x, y, COLORS[value])
+    shapes = PIECE_SHAPES[current_piece['type']]
+    for x, y in shapes[current_piece.get('rotation', 0) % len(shapes)]:
+        cell(current_piece['x'] + x, current_piece['y'] + y, COLORS[PIECE_COLORS[current_piece['type']]])
+
+    draw.rectangle([board_width, 0, board_width + ui_width, board_height], fill=(30, 30, 30))
+    draw_text(image, (board_width + 20, 20), "NEXT", size=20)
+    for x, y in PIECE_SHAPES[next_piece['type']][0]:
+        cell(x, y, COLORS[PIECE_COLORS[next_piece['type']]], board_width + ui_width // 2 - cell_size, 60)
+    for y, text in ((180, "SCORE"), (210, "0"), (260, "LEVEL"), (290, "1")):
+        draw_text(image, (board_width + 10, y), text, size=20)
+    draw_text(image, (board_width + 10, board_height - 30), "SIMULATED", size=20, fill=(255, 100, 100))
+    return image
+
+
+def png_before(board_state, current_piece, next_piece):
+    buffer = BytesIO()
+    render_before(board_state, current_piece, next_piece).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def random_boards(rng, count):
+    boards = []
+    for _ in range(count):
+        board = [[rng.randint(1, 7) if y > 4 and rng.random() < 0.4 else 0 for x in range(10)] for y in range(20)]
+        current_piece = {'type': rng.choice(PIECE_TYPES), 'x': rng.randint(-2, 10), 'y': rng.randint(-2, 19),
+                         'rotation': rng.randint(0, 3)}
+        boards.append((board, current_piece, {'type': rng.choice(PIECE_TYPES)}))
+    return boards
+
+
+def play_boards(rng, count):
+    board = [[rng.randint(1, 7) if y > 12 and rng.random() < 0.7 else 0 for x in range(10)] for y in range(20)]
+    return [(board, {'type': PIECE_TYPES[i // 15 % 7], 'x': 3 + i % 3, 'y': i % 15 - 1, 'rotation': i % 4},
+             {'type': PIECE_TYPES[(i // 15 + 1) % 7]}) for i in range(count)]
+
+
+def measure(func, boards):
+    times = []
+    for board in boards:
+        start = time.perf_counter()
+        func(*board)
+        times.append(time.perf_counter() - start)
+    return np.array(times) * 1e6
+
+
+def run(renders, seed=0):
+    rng = random.Random(seed)
+    renderer = BoardRenderer()
+    variants = [
+        ("before", render_before),
+        ("after (image)", renderer.render_image),
+        ("after (array)", renderer.render),
+        ("before PNG", png_before),
+        ("after PNG", renderer.render_bytes),
+    ]
+    results = []
+    mismatches = 0
+    for case, boards in (("random", random_boards(rng, renders)), ("play", play_boards(rng, renders))):
+        for variant, func in variants:
+            times = measure(func, boards)
+            print(f"{case:<7} {variant:<14} mean {times.mean():8.1f}us  p50 {np.percentile(times, 50):8.1f}us  "
+                  f"p95 {np.percentile(times, 95):8.1f}us")
+            results.append({"case": case, "variant": variant, "mean_us": float(times.mean())})
+
+        # Same pixels either way, also after decoding the PNG
+        for board in boards:
+            before = np.asarray(render_before(*board))
+            after = np.asarray(Image.open(BytesIO(renderer.render_bytes(*board))))
+            mismatches += int(not np.array_equal(before, after))
+    print(f"Boards that differ from the ImageDraw renderer: {mismatches}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated board rendering before/after the sprite atlas")
+    parser.add_argument("--renders", type=int, default=300, help="Boards per case.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the random boards.")
+    args = parser.parse_args()
+    run(args.renders, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,552 @@
+"""
+Sharded datasets of Tetris and 2048 positions for offline model evaluation
+
+simulate_random_board_state() and create_simple_tetris_board() in the
+iterators produce one board per interactive session. This generator produces
+large, reproducible sets of positions, each with:
+
+- the rendered image (the simulated board of the tetris_*_iterator.py scripts,
+  or a 2048 board in the game's colours);
+- the ground-truth state (board, current/next piece or tiles);
+- solver moves, ranked: every reachable Tetris placement scored with a
+  heuristic search, or every 2048 direction scored by expectimax. The best
+  entry is the label. "Optimal" means optimal for the solver's evaluation
+  function and search depth, which are recorded in the manifest.
+
+Sample i depends only on (seed, game, i), so a dataset is identical however
+many processes produce it and whichever shards are regenerated. Shards are
+generated in parallel on a process pool. Each shard is written to a partial
+file and renamed when complete, so an interrupted run resumes by skipping
+the shards that already exist. The manifest is written before any shard, and
+a run whose seed, shard size or options differ from it is refused unless
+--force regenerates every shard.
+
+Layout of an output directory:
+    manifest.json            game, options, solver settings, shard list
+    <game>-00000.tar         <id>.png and <id>.json per sample (WebDataset layout)
+    ...
+
+Each record carries a state_key (hash of the state), so it can be looked up
+as a cached decision for the same position.
+
+Usage:
+    python -m tools.dataset_generator --game tetris --samples 20000 --output datasets/tetris
+    python -m tools.dataset_generator --game 2048 --samples 20000 --output datasets/2048 --depth 2
+    python -m tools.dataset_generator --game tetris --source played --samples 5000 --output datasets/tetris_played
+
+    from tools.dataset_generator import iter_dataset
+    for record, png in iter_dataset("datasets/tetris"):
+        ...
+"""
+
+import argparse
+import concurrent.futures
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import tarfile
+import time
+
+from PIL import Image
+
+from games.tetris.board_renderer import PIECE_COLORS, PIECE_SHAPES, BoardRenderer, encode_png
+from games.tetris.observation import board_features
+from games.tetris.placement import OffsetRules, PlacementTable
+from games.game_2048.game_2048_env import ACTIONS, CONSTANTS, Game2048Env, board_score
+from games.game_2048.logic import checkGameStatus, fillTwoOrFour, move, snapshot
+from tools.overlay import draw_text, text_sprite
+
+GAMES = ("tetris", "2048")
+TETRIS_SOURCES = ("random", "played")
+PIECE_TYPES = ['I', 'J', 'L', 'O', 'S', 'T', 'Z']
+
+DEFAULT_SHARD_SIZE = 1000
+DEFAULT_PROCESSES = os.cpu_count() or 1
+
+# Weights of the Tetris evaluation (aggregate height, lines, holes, bumpiness),
+# the widely used set tuned by a genetic search for one-piece lookahead play
+TETRIS_WEIGHTS = {"aggregate_height": -0.510066, "lines": 0.760666, "holes": -0.35663, "bumpiness": -0.184483}
+
+# Weights of the 2048 evaluation, on log2 tile values
+WEIGHTS_2048 = {"empty": 2.7, "monotonicity": 1.0, "smoothness": 0.1, "max_tile": 1.0}
+
+BOARD_WIDTH, BOARD_HEIGHT = 10, 20
+TILE_SIZE_2048 = 100
+
+
+def sample_rng(seed, game, index):
+    """Random stream of one sample, independent of sharding and process count."""
+    return random.Random(f"{seed}:{game}:{index}")
+
+
+def state_key(game, state):
+    """Stable hash of a position, to key cached decisions."""
+    canonical = json.dumps([game, state], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+# --- Tetris ---------------------------------------------------------------
+
+def tetris_valid(board, piece):
+    """Same test as TetrisAIIterator.is_valid_position: inside the board and not on a filled cell."""
+    shapes = PIECE_SHAPES[piece['type']]
+    for x, y in shapes[piece['rotation'] % len(shapes)]:
+        x, y = piece['x'] + x, piece['y'] + y
+        if x < 0 or x >= BOARD_WIDTH or y < 0 or y >= BOARD_HEIGHT or board[y][x] > 0:
+            return False
+    return True
+
+
+def tetris_play(board, piece, keys):
+    """
+    Apply key presses then a hard drop, with the movement rules of
+    TetrisAIIterator.execute_code (blocked moves are undone, rotation kicks
+    one column right, then left).
+
+    Returns:
+        tuple: (board after locking and clearing lines, lines cleared, final piece)
+    """
+    piece = dict(piece)
+    rotations = len(PIECE_SHAPES[piece['type']])
+    for key in keys:
+        if key in ("left", "right", "down"):
+            axis, step = ('y', 1) if key == "down" else ('x', -1 if key == "left" else 1)
+            piece[axis] += step
+            if not tetris_valid(board, piece):
+                piece[axis] -= step
+        elif key == "up":
+            piece['rotation'] = (piece['rotation'] + 1) % rotations
+            for kick in (0, 1, -2):
+                piece['x'] += kick
+                if tetris_valid(board, piece):
+                    break
+            else:
+                piece['x'] += 1
+                piece['rotation'] = (piece['rotation'] - 1) % rotations
+    while tetris_valid(board, piece):
+        piece['y'] += 1
+    piece['y'] -= 1
+
+    board = [row[:] for row in board]
+    shapes = PIECE_SHAPES[piece['type']]
+    for x, y in shapes[piece['rotation'] % rotations]:
+        x, y = piece['x'] + x, piece['y'] + y
+        if 0 <= x < BOARD_WIDTH and 0 <= y < BOARD_HEIGHT:
+            board[y][x] = PIECE_COLORS[piece['type']]
+    kept = [row for row in board if not all(cell > 0 for cell in row)]
+    lines = BOARD_HEIGHT - len(kept)
+    return [[0] * BOARD_WIDTH for _ in range(lines)] + kept, lines, piece
+
+
+def tetris_evaluate(board, lines):
+    features = board_features(board)
+    return (TETRIS_WEIGHTS["aggregate_height"] * features["aggregate_height"] + TETRIS_WEIGHTS["lines"] * lines
+            + TETRIS_WEIGHTS["holes"] * features["holes"] + TETRIS_WEIGHTS["bumpiness"] * features["bumpiness"])
+
+
+class TetrisSolver:
+    """
+    Ranks every reachable placement of the current piece. Each candidate is
+    the shortest key sequence from the piece's position (games/tetris/placement.py),
+    played out on the real board; with lookahead=2 its value is the best
+    placement of the next piece after it.
+    """
+    def __init__(self, lookahead=2):
+        self.lookahead = lookahead
+        self.table = PlacementTable(OffsetRules(PIECE_SHAPES))
+
+    def candidates(self, board, piece):
+        """Distinct outcomes of the piece: (keys, board, lines, final piece), shortest keys first."""
+        shapes = PIECE_SHAPES[piece['type']]
+        spawn = (piece['rotation'] % len(shapes), piece['x'], piece['y'])
+        outcomes = {}
+        for orientation in range(len(self.table.orientations[piece['type']])):
+            for column in range(-2, BOARD_WIDTH):
+                keys = self.table.macro(piece['type'], orientation, column, spawn=spawn)
+                if keys is None:
+                    continue
+                after, lines, final = tetris_play(board, piece, keys)
+                outcome = (final['rotation'] % len(shapes), final['x'], final['y'])
+                if outcome not in outcomes or len(keys) < len(outcomes[outcome][0]):
+                    outcomes[outcome] = (list(keys), after, lines, final)
+        return sorted(outcomes.values(), key=lambda outcome: (len(outcome[0]), outcome[0]))
+
+    def placement(self, piece, start):
+        """(orientation, column) of a final piece, in the numbering of "place" answers for the piece at `start`"""
+        shapes = PIECE_SHAPES[piece['type']]
+        state = (piece['rotation'] % len(shapes), piece['x'], piece['y'])
+        start = (start['rotation'] % len(shapes), start['x'], start['y'])
+        cells = self.table.rules.cells(piece['type'], state)
+        return self.table.orientation(piece['type'], state, start), min(x for x, _ in cells)
+
+    def solve(self, board, current_piece, next_piece=None):
+        """Candidates ranked best first, as dicts (orientation, column, keys, lines, value)."""
+        ranked = []
+        for keys, after, lines, final in self.candidates(board, current_piece):
+            value = tetris_evaluate(after, lines)
+            if self.lookahead > 1 and next_piece:
+                spawned = {'type': next_piece['type'], 'x': 4, 'y': 0, 'rotation': 0}
+                if tetris_valid(after, spawned):
+                    value = max((tetris_evaluate(board_2, lines + lines_2)
+                                 for _, board_2, lines_2, _ in self.candidates(after, spawned)), default=value)
+            orientation, column = self.placement(final, current_piece)
+            ranked.append({"orientation": orientation, "column": column, "keys": keys + ["space"],
+                           "lines": lines, "value": round(value, 4)})
+        ranked.sort(key=lambda move: -move["value"])
+        return ranked
+
+
+def random_tetris_position(rng, fill_percentage=30, max_height=15):
+    """A board like TetrisAIIterator.simulate_random_board_state(), with the current piece moved down if it does not fit."""
+    board = [[0] * BOARD_WIDTH for _ in range(BOARD_HEIGHT)]
+    for y in range(BOARD_HEIGHT - 1, BOARD_HEIGHT - max_height, -1):
+        for x in range(BOARD_WIDTH):
+            if rng.randint(1, 100) <= fill_percentage:
+                board[y][x] = rng.randint(1, 7)
+    current_piece = {'type': rng.choice(PIECE_TYPES), 'x': rng.randint(2, 7), 'y': 0, 'rotation': rng.randint(0, 3)}
+    current_piece['rotation'] %= len(PIECE_SHAPES[current_piece['type']])
+    while not tetris_valid(board, current_piece) and current_piece['y'] < 3:
+        current_piece['y'] += 1
+    return board, current_piece, {'type': rng.choice(PIECE_TYPES)}
+
+
+def played_tetris_position(rng, solver, max_pieces=40, epsilon=0.1):
+    """
+    A board reached by playing up to `max_pieces` pieces from an empty board,
+    choosing the solver's one-piece best placement except for a random one
+    with probability `epsilon`. Gives stacks with realistic shapes.
+    """
+    board = [[0] * BOARD_WIDTH for _ in range(BOARD_HEIGHT)]
+    current_type = rng.choice(PIECE_TYPES)
+    for _ in range(rng.randint(0, max_pieces)):
+        piece = {'type': current_type, 'x': 4, 'y': 0, 'rotation': 0}
+        outcomes = solver.candidates(board, piece)
+        if not outcomes:
+            break
+        if rng.random() < epsilon:
+            _, after, _, _ = rng.choice(outcomes)
+        else:
+            _, after, _, _ = max(outcomes, key=lambda outcome: tetris_evaluate(outcome[1], outcome[2]))
+        if not tetris_valid(after, {'type': rng.choice(PIECE_TYPES), 'x': 4, 'y': 0, 'rotation': 0}):
+            break  # the next piece would not fit: keep the last playable board
+        board = after
+        current_type = rng.choice(PIECE_TYPES)
+    return board, {'type': current_type, 'x': 4, 'y': 0, 'rotation': 0}, {'type': rng.choice(PIECE_TYPES)}
+
+
+class TetrisSampler:
+    """Builds Tetris samples; one per worker process (it owns a renderer and a placement table)."""
+    game = "tetris"
+
+    def __init__(self, source="random", lookahead=2, fill=30, height=15, max_pieces=40):
+        self.source = source
+        self.fill = fill
+        self.height = height
+        self.max_pieces = max_pieces
+        self.solver = TetrisSolver(lookahead)
+        self.renderer = BoardRenderer()
+
+    def options(self):
+        return {"source": self.source, "fill": self.fill, "height": self.height, "max_pieces": self.max_pieces,
+                "solver": {"lookahead": self.solver.lookahead, "weights": TETRIS_WEIGHTS}}
+
+    def sample(self, rng):
+        if self.source == "played":
+            board, current_piece, next_piece = played_tetris_position(rng, self.solver, self.max_pieces)
+        else:
+            board, current_piece, next_piece = random_tetris_position(rng, self.fill, self.height)
+        moves = self.solver.solve(board, current_piece, next_piece)
+        state = {"board": board, "current_piece": current_piece, "next_piece": next_piece}
+        record = dict(state, features=board_features(board), best=moves[0] if moves else None, moves=moves)
+        return record, state, self.renderer.render_bytes(board, current_piece, next_piece)
+
+
+# --- 2048 -----------------------------------------------------------------
+
+def evaluate_2048(board):
+    """Heuristic value of a 2048 board: free cells, monotone rows/columns, similar neighbours, big tiles."""
+    logs = [[math.log2(cell) if cell else 0.0 for cell in row] for row in board]
+    lines = logs + [list(column) for column in zip(*logs)]
+    empty = sum(1 for row in board for cell in row if cell == 0)
+    monotonicity = smoothness = 0.0
+    for line in lines:
+        increases = sum(max(b - a, 0) for a, b in zip(line, line[1:]))
+        decreases = sum(max(a - b, 0) for a, b in zip(line, line[1:]))
+        monotonicity -= min(increases, decreases)
+        smoothness -= sum(abs(a - b) for a, b in zip(line, line[1:]) if a and b)
+    return (WEIGHTS_2048["empty"] * empty + WEIGHTS_2048["monotonicity"] * monotonicity
+            + WEIGHTS_2048["smoothness"] * smoothness + WEIGHTS_2048["max_tile"] * max(max(row) for row in logs))
+
+
+class Solver2048:
+    """Expectimax over moves and tile spawns (2 with p=0.9, 4 with p=0.1), `depth` moves deep."""
+    def __init__(self, depth=2):
+        self.depth = depth
+
+    def _moved(self, board):
+        for direction, key in ACTIONS:
+            after = move(key, [row[:] for row in board])
+            if after != board:
+                yield direction, after
+
+    def _chance(self, board, depth, cache):
+        key = (tuple(map(tuple, board)), depth)
+        if key in cache:
+            return cache[key]
+        empty = [(y, x) for y in range(4) for x in range(4) if board[y][x] == 0]
+        if depth == 0 or not empty:
+            value = evaluate_2048(board)
+        else:
+            value = 0.0
+            for y, x in empty:
+                for tile, probability in ((2, 0.9), (4, 0.1)):
+                    board[y][x] = tile
+                    value += probability * self._max(board, depth, cache)
+                    board[y][x] = 0
+            value /= len(empty)
+        cache[key] = value
+        return value
+
+    def _max(self, board, depth, cache):
+        return max((self._chance(after, depth - 1, cache) for _, after in self._moved(board)),
+                   default=evaluate_2048(board))
+
+    def solve(self, board):
+        """Directions ranked best first, as dicts (move, value, valid, reward)."""
+        cache = {}
+        ranked = []
+        valid = dict(self._moved(board))
+        for direction, _ in ACTIONS:
+            if direction in valid:
+                after = valid[direction]
+                ranked.append({"move": direction, "valid": True,
+                               "reward": board_score(after) - board_score(board),
+                               "value": round(self._chance(after, self.depth - 1, cache), 4)})
+            else:
+                ranked.append({"move": direction, "valid": False, "reward": 0, "value": None})
+        ranked.sort(key=lambda entry: (not entry["valid"], -(entry["value"] or 0.0)))
+        return ranked
+
+
+class Sampler2048:
+    """Builds 2048 samples: boards reached by noisy greedy play, solved by expectimax."""
+    game = "2048"
+
+    def __init__(self, depth=2, max_moves=600, epsilon=0.2):
+        self.solver = Solver2048(depth)
+        self.max_moves = max_moves
+        self.epsilon = epsilon
+        self.env = Game2048Env(render_mode="rgb_array", tile_size=TILE_SIZE_2048)
+        self.colours = CONSTANTS["colour"]["light"]
+
+    def options(self):
+        return {"max_moves": self.max_moves, "epsilon": self.epsilon, "tile_size": TILE_SIZE_2048,
+                "solver": {"depth": self.solver.depth, "weights": WEIGHTS_2048}}
+
+    def position(self, rng):
+        board = fillTwoOrFour([[0] * 4 for _ in range(4)], iter=2, rng=rng)
+        for _ in range(rng.randint(0, self.max_moves)):
+            if checkGameStatus(board) != "PLAY":
+                break
+            moves = list(self.solver._moved(board))
+            if rng.random() < self.epsilon:
+                _, after = rng.choice(moves)
+            else:
+                _, after = max(moves, key=lambda item: evaluate_2048(item[1]))
+            after = fillTwoOrFour(after, rng=rng)
+            if checkGameStatus(after) == "LOSE":
+                break  # game over: keep the last board that still has a move to label
+            board = after
+        return board
+
+    def render(self, board):
+        self.env.set_state((snapshot(board), 0, 0))
+        frame = self.env.render()
+        font_size = max(TILE_SIZE_2048 // 3, 24)
+        for y, row in enumerate(board):
+            for x, value in enumerate(row):
+                if value:
+                    fill = tuple(self.colours["dark"] if value in (2, 4) else self.colours["light"])
+                    width, height = text_sprite(str(value), font_size, fill).size
+                    draw_text(frame, (x * TILE_SIZE_2048 + (TILE_SIZE_2048 - width) // 2,
+                                      y * TILE_SIZE_2048 + (TILE_SIZE_2048 - height) // 2),
+                              str(value), size=font_size, fill=fill)
+        return encode_png(Image.fromarray(frame))
+
+    def sample(self, rng):
+        board = self.position(rng)
+        moves = self.solver.solve(board)
+        state = {"board": board}
+        record = dict(state, score=board_score(board), max_tile=max(max(row) for row in board),
+                      best=moves[0] if moves[0]["valid"] else None, moves=moves)
+        return record, state, self.render(board)
+
+
+def make_sampler(game, **options):
+    if game == "tetris":
+        return TetrisSampler(**{key: options[key] for key in ("source", "lookahead", "fill", "height", "max_pieces")})
+    return Sampler2048(depth=options["depth"])
+
+
+# --- Shards ----------------------------------------------------------------
+
+def shard_name(game, shard):
+    return f"{game}-{shard:05d}.tar"
+
+
+def _add(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = 0  # byte-identical shards for the same seed
+    tar.addfile(info, io.BytesIO(data))
+
+
+def write_shard(output_dir, game, shard, start, count, seed, options):
+    """Generate samples [start, start + count) into one tar shard. Returns (shard, samples, seconds)."""
+    started = time.time()
+    sampler = make_sampler(game, **options)
+    path = os.path.join(output_dir, shard_name(game, shard))
+    partial = path + ".partial"
+    with tarfile.open(partial, "w") as tar:
+        for index in range(start, start + count):
+            record, state, png = sampler.sample(sample_rng(seed, game, index))
+            sample_id = f"{game}-{index:08d}"
+            record = dict(record, id=sample_id, index=index, state_key=state_key(game, state),
+                          image=f"{sample_id}.png")
+            _add(tar, f"{sample_id}.png", png)
+            _add(tar, f"{sample_id}.json", json.dumps(record, separators=(",", ":")).encode("utf-8"))
+    os.replace(partial, path)
+    return shard, count, time.time() - started
+
+
+def _settings(manifest):
+    return {key: manifest.get(key) for key in ("game", "seed", "shard_size", "options")}
+
+
+def _write_manifest(output_dir, manifest):
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def generate(output_dir, game, samples, shard_size=DEFAULT_SHARD_SIZE, seed=0, processes=DEFAULT_PROCESSES,
+             force=False, **options):
+    """
+    Write a sharded dataset, skipping shards that already exist (unless force).
+
+    Existing shards are only reused if the directory's manifest has the same
+    game, seed, shard size and options; otherwise this raises ValueError
+    unless force is set, in which case every shard is regenerated.
+
+    Returns:
+        dict: The manifest written to output_dir/manifest.json.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    shards = [(shard, start, min(shard_size, samples - start))
+              for shard, start in enumerate(range(0, samples, shard_size))]
+    manifest = {
+        "game": game, "samples": samples, "shard_size": shard_size, "seed": seed,
+        # Round-tripped through JSON so it compares equal to a manifest read back from disk
+        "options": json.loads(json.dumps(make_sampler(game, **options).options())),
+        "shards": [],
+    }
+
+    manifest_path = os.path.join(output_dir, "manifest.json")
+    existing = [name for name in os.listdir(output_dir) if name.endswith(".tar")]
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            previous = _settings(json.load(f))
+        changed = sorted(key for key, value in _settings(manifest).items() if previous[key] != value)
+    else:
+        changed = ["no manifest"] if existing else []
+    if changed and existing and not force:
+        raise ValueError(f"{output_dir} holds shards generated with different settings ({', '.join(changed)}); "
+                         f"use another output directory or --force to regenerate them")
+    if changed:
+        force = True
+    # Written first, so an interrupted run can only be resumed with the same settings
+    _write_manifest(output_dir, manifest)
+
+    pending = [item for item in shards
+               if force or not os.path.exists(os.path.join(output_dir, shard_name(game, item[0])))]
+    print(f"[Dataset] {game}: {samples} samples in {len(shards)} shards, {len(shards) - len(pending)} already done, "
+          f"{processes} processes")
+
+    started = time.time()
+    done = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(write_shard, output_dir, game, shard, start, count, seed, options)
+                   for shard, start, count in pending]
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                shard, count, seconds = future.result()
+            except Exception as e:
+                print(f"[Dataset] Error writing a shard: {e}")
+                continue
+            done += count
+            elapsed = time.time() - started
+            print(f"[Dataset] {shard_name(game, shard)}: {count} samples in {seconds:.1f}s "
+                  f"({done / elapsed:.1f} samples/s overall)")
+
+    manifest["shards"] = [{"file": shard_name(game, shard), "start": start, "samples": count}
+                          for shard, start, count in shards
+                          if os.path.exists(os.path.join(output_dir, shard_name(game, shard)))]
+    _write_manifest(output_dir, manifest)
+    missing = len(shards) - len(manifest["shards"])
+    if missing:
+        print(f"[Dataset] {missing} shards failed; run again to retry them")
+    return manifest
+
+
+def iter_shard(path):
+    """(record, png bytes) for every sample in a shard, in order."""
+    with tarfile.open(path) as tar:
+        images = {}
+        for member in tar:
+            data = tar.extractfile(member).read()
+            if member.name.endswith(".png"):
+                images[member.name] = data
+            elif member.name.endswith(".json"):
+                record = json.loads(data)
+                yield record, images.pop(record["image"], None)
+
+
+def iter_dataset(output_dir):
+    """(record, png bytes) for every sample of a dataset directory, in index order."""
+    with open(os.path.join(output_dir, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    for shard in manifest["shards"]:
+        yield from iter_shard(os.path.join(output_dir, shard["file"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate sharded Tetris/2048 position datasets with solver labels")
+    parser.add_argument("--game", choices=GAMES, required=True)
+    parser.add_argument("--samples", type=int, default=10000, help="Number of positions.")
+    parser.add_argument("--output", type=str, required=True, help="Output directory.")
+    parser.add_argument("--seed", type=int, default=0, help="Dataset seed; sample i depends only on (seed, game, i).")
+    parser.add_argument("--shard_size", type=int, default=DEFAULT_SHARD_SIZE, help="Samples per shard file.")
+    parser.add_argument("--processes", type=int, default=DEFAULT_PROCESSES, help="Worker processes.")
+    parser.add_argument("--force", action="store_true", help="Regenerate shards that already exist.")
+    parser.add_argument("--source", choices=TETRIS_SOURCES, default="random",
+                        help="Tetris boards: random fill like the iterators' --complex boards, or played stacks.")
+    parser.add_argument("--fill", type=int, default=30, help="Tetris random boards: fill percentage (0 for an empty board).")
+    parser.add_argument("--height", type=int, default=15, help="Tetris random boards: maximum filled height.")
+    parser.add_argument("--max_pieces", type=int, default=40, help="Tetris played boards: most pieces played.")
+    parser.add_argument("--lookahead", type=int, default=2, choices=[1, 2],
+                        help="Tetris solver: 1 = current piece, 2 = also the next piece.")
+    parser.add_argument("--depth", type=int, default=2, help="2048 solver: expectimax depth in moves.")
+    args = parser.parse_args()
+
+    try:
+        generate(args.output, args.game, args.samples, args.shard_size, args.seed, args.processes, args.force,
+                 source=args.source, fill=args.fill, height=args.height, max_pieces=args.max_pieces,
+                 lookahead=args.lookahead, depth=args.depth)
+    except ValueError as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    main()
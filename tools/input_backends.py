@@ -0,0 +1,218 @@
+"""
+Pluggable key-injection backends for the InputExecutor
+
+pyautogui sleeps pyautogui.PAUSE (0.1s) after every call, so a ten-key plan
+spends a second doing nothing before the model's own timing is considered.
+Every backend here has the same press/keyDown/keyUp interface the
+InputExecutor calls, with explicit per-key hold and gap times instead.
+Backends that can deliver a run of taps at once also implement
+press_batch(keys), which the InputExecutor uses for back-to-back presses
+(e.g. a Tetris placement macro):
+
+- "pyautogui": pyautogui with its per-call pause disabled.
+- "pynput":    low-level OS injector (pynput.keyboard.Controller).
+- "pygame":    posts pygame KEYDOWN/KEYUP events into the current process,
+               for agents running inside the game process.
+- "ipc":       sends key commands to a game started with --ipc-port
+               (games/key_ipc.py), no window focus or OS injection needed.
+
+Usage:
+    from tools.input_backends import make_backend
+    from tools.input_executor import configure_input_executor
+
+    configure_input_executor(make_backend("ipc", port=47800))
+
+Benchmark: python -m tools.input_benchmark
+"""
+
+import socket
+import time
+
+BACKENDS = ("pyautogui", "pynput", "pygame", "ipc")
+DEFAULT_IPC_PORT = 47800
+
+
+class KeyBackend:
+    """
+    Base class: press() is keyDown, hold, keyUp, gap.
+
+    Args:
+        hold (float): Seconds a tapped key stays down.
+        gap (float): Seconds to wait after a tap before the next action.
+    """
+    name = "base"
+
+    def __init__(self, hold=0.0, gap=0.0):
+        self.hold = hold
+        self.gap = gap
+
+    def press(self, key):
+        self.keyDown(key)
+        if self.hold:
+            time.sleep(self.hold)
+        self.keyUp(key)
+        if self.gap:
+            time.sleep(self.gap)
+
+    def press_batch(self, keys):
+        for key in keys:
+            self.press(key)
+
+    def keyDown(self, key):
+        raise NotImplementedError
+
+    def keyUp(self, key):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PyAutoGUIBackend(KeyBackend):
+    """pyautogui without its fixed PAUSE after every call."""
+    name = "pyautogui"
+
+    def __init__(self, hold=0.0, gap=0.0):
+        super().__init__(hold, gap)
+        import pyautogui
+        self.pyautogui = pyautogui
+
+    def keyDown(self, key):
+        self.pyautogui.keyDown(key, _pause=False)
+
+    def keyUp(self, key):
+        self.pyautogui.keyUp(key, _pause=False)
+
+
+class PynputBackend(KeyBackend):
+    """Low-level OS key injection through pynput."""
+    name = "pynput"
+
+    # pyautogui key names -> pynput Key attribute names
+    SPECIAL_KEYS = {
+        "left": "left", "right": "right", "up": "up", "down": "down",
+        "space": "space", "enter": "enter", "return": "enter", "esc": "esc", "escape": "esc",
+        "shift": "shift", "shiftleft": "shift_l", "shiftright": "shift_r",
+        "ctrl": "ctrl", "ctrlleft": "ctrl_l", "ctrlright": "ctrl_r",
+        "alt": "alt", "altleft": "alt_l", "altright": "alt_r",
+        "tab": "tab", "backspace": "backspace", "delete": "delete",
+        "pageup": "page_up", "pagedown": "page_down", "home": "home", "end": "end",
+    }
+
+    def __init__(self, hold=0.01, gap=0.0):
+        super().__init__(hold, gap)
+        from pynput.keyboard import Controller, Key
+        self.controller = Controller()
+        self.Key = Key
+        self.cache = {}
+
+    def _key(self, name):
+        if name not in self.cache:
+            special = self.SPECIAL_KEYS.get(name.lower())
+            self.cache[name] = getattr(self.Key, special) if special else name
+        return self.cache[name]
+
+    def keyDown(self, key):
+        self.controller.press(self._key(key))
+
+    def keyUp(self, key):
+        self.controller.release(self._key(key))
+
+
+class PygameEventBackend(KeyBackend):
+    """Posts key events into this process's pygame event queue."""
+    name = "pygame"
+
+    def __init__(self, hold=0.0, gap=0.0):
+        super().__init__(hold, gap)
+        from games.key_ipc import post_key
+        self.post_key = post_key
+
+    def press(self, key):
+        if self.hold:
+            super().press(key)
+            return
+        self.post_key("press", key)
+        if self.gap:
+            time.sleep(self.gap)
+
+    def press_batch(self, keys):
+        if self.hold or self.gap:
+            super().press_batch(keys)
+            return
+        for key in keys:
+            self.post_key("press", key)
+
+    def keyDown(self, key):
+        self.post_key("keyDown", key)
+
+    def keyUp(self, key):
+        self.post_key("keyUp", key)
+
+
+class IPCBackend(KeyBackend):
+    """Sends key commands over UDP to a game's KeyEventServer."""
+    name = "ipc"
+
+    def __init__(self, hold=0.0, gap=0.0, port=DEFAULT_IPC_PORT, host="127.0.0.1"):
+        super().__init__(hold, gap)
+        self.address = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _send(self, op, key):
+        self.sock.sendto(f"{op} {key}".encode("utf-8"), self.address)
+
+    def press(self, key):
+        if self.hold:
+            super().press(key)
+            return
+        self._send("press", key)
+        if self.gap:
+            time.sleep(self.gap)
+
+    def press_batch(self, keys):
+        """All taps in one datagram; the game posts them within a single frame."""
+        if self.hold or self.gap:
+            super().press_batch(keys)
+            return
+        self.sock.sendto("\n".join(f"press {key}" for key in keys).encode("utf-8"), self.address)
+
+    def keyDown(self, key):
+        self._send("keyDown", key)
+
+    def keyUp(self, key):
+        self._send("keyUp", key)
+
+    def close(self):
+        self.sock.close()
+
+
+def make_backend(name, hold=None, gap=None, **kwargs):
+    """
+    Create a backend by name ("pyautogui", "pynput", "pygame" or "ipc").
+    hold/gap default to each backend's own defaults; extra kwargs (port, host)
+    go to the IPC backend.
+    """
+    classes = {"pyautogui": PyAutoGUIBackend, "pynput": PynputBackend,
+               "pygame": PygameEventBackend, "ipc": IPCBackend}
+    if name not in classes:
+        raise ValueError(f"Unsupported input backend: {name} (expected one of {', '.join(BACKENDS)})")
+    timing = {key: value for key, value in (("hold", hold), ("gap", gap)) if value is not None}
+    if name == "ipc":
+        timing.update(kwargs)
+    return classes[name](**timing)
+
+
+def add_input_arguments(parser):
+    """Add --input_backend, --key_hold, --key_gap and --ipc_port options to an argparse parser."""
+    parser.add_argument("--input_backend", type=str, default="pyautogui", choices=BACKENDS,
+                        help="How key presses are delivered (default: pyautogui without its 0.1s pause).")
+    parser.add_argument("--key_hold", type=float, default=None, help="Seconds each tapped key is held down.")
+    parser.add_argument("--key_gap", type=float, default=None, help="Seconds to wait after each tapped key.")
+    parser.add_argument("--ipc_port", type=int, default=DEFAULT_IPC_PORT,
+                        help="UDP port of the game's key event server for --input_backend ipc.")
+
+
+def backend_from_args(args):
+    """Build a backend from options added by add_input_arguments()."""
+    return make_backend(args.input_backend, hold=args.key_hold, gap=args.key_gap, port=args.ipc_port)
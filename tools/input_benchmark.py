@@ -0,0 +1,157 @@
+"""
+Action-to-effect latency microbenchmark for the key input backends
+
+For the "pygame" and "ipc" backends a headless pygame loop (SDL dummy video
+driver) stands in for the game: each key is sent from a separate thread and
+the latency is measured until the loop sees the KEYDOWN event. --fps limits
+the loop like a real game frame rate; 0 polls as fast as possible.
+
+OS-level injectors ("pyautogui", "pynput") have no observable effect in a
+headless process, so for them the cost of the call itself is measured, with
+pyautogui's default PAUSE and without it. Backends that are not installed or
+cannot reach a display are skipped.
+
+Usage:
+    python -m tools.input_benchmark --presses 200 --fps 60
+"""
+
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+from tools.input_backends import BACKENDS, DEFAULT_IPC_PORT, make_backend
+
+
+def summarize(name, latencies):
+    latencies_ms = np.array(latencies) * 1000
+    print(f"{name:<24} n={len(latencies_ms):<5} mean {latencies_ms.mean():8.3f}ms  "
+          f"p50 {np.percentile(latencies_ms, 50):8.3f}ms  p95 {np.percentile(latencies_ms, 95):8.3f}ms  "
+          f"max {latencies_ms.max():8.3f}ms")
+    return {"name": name, "n": len(latencies_ms), "mean_ms": float(latencies_ms.mean()),
+            "p95_ms": float(np.percentile(latencies_ms, 95))}
+
+
+def measure_event_latency(backend, presses, fps, key="left"):
+    """
+    Send `presses` key taps through `backend` and time how long each takes to
+    show up as a KEYDOWN in a pygame loop running on this thread.
+    """
+    import pygame
+    from games.key_ipc import key_code
+
+    expected = key_code(key)
+    sent = {}
+    latencies = []
+    received = threading.Event()
+    done = threading.Event()
+
+    def sender():
+        for i in range(presses):
+            received.clear()
+            sent["time"] = time.perf_counter()
+            backend.press(key)
+            if not received.wait(1.0):
+                print(f"  press {i} was not received within 1s")
+        done.set()
+
+    thread = threading.Thread(target=sender, daemon=True)
+    thread.start()
+    clock = pygame.time.Clock()
+    deadline = time.perf_counter() + presses * 1.5 + 5
+    while not done.is_set() and time.perf_counter() < deadline:
+        for event in pygame.event.get():
+            if event.type == pygame.KEYDOWN and event.key == expected:
+                latencies.append(time.perf_counter() - sent["time"])
+                received.set()
+        if fps:
+            clock.tick(fps)
+    thread.join(1.0)
+    return latencies
+
+
+def measure_call_latency(backend, presses, key="shift"):
+    """Time the press() call itself for OS-level injectors."""
+    latencies = []
+    for _ in range(presses):
+        start = time.perf_counter()
+        backend.press(key)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run(backends, presses, fps, port):
+    results = []
+    if {"pygame", "ipc"} & set(backends):
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        import pygame
+        from games.key_ipc import KeyEventServer
+        pygame.init()
+        pygame.display.set_mode((1, 1))
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed([pygame.KEYDOWN, pygame.KEYUP])
+
+        print(f"Action-to-KEYDOWN latency in a pygame loop ({'uncapped' if not fps else f'{fps} fps'}):")
+        if "pygame" in backends:
+            latencies = measure_event_latency(make_backend("pygame"), presses, fps)
+            if latencies:
+                results.append(summarize("pygame (in-process)", latencies))
+        if "ipc" in backends:
+            server = KeyEventServer(port=port).start()
+            backend = make_backend("ipc", port=port)
+            try:
+                latencies = measure_event_latency(backend, presses, fps)
+                if latencies:
+                    results.append(summarize("ipc (udp)", latencies))
+            finally:
+                backend.close()
+                server.stop()
+        pygame.quit()
+
+    injectors = [name for name in ("pyautogui", "pynput") if name in backends]
+    if injectors:
+        print("\nCall latency of OS-level injectors (key: shift):")
+    for name in injectors:
+        try:
+            backend = make_backend(name)
+        except Exception as e:
+            print(f"{name:<24} skipped: {e}")
+            continue
+        try:
+            if name == "pyautogui":
+                # The default path: pyautogui.press() followed by the 0.1s PAUSE
+                pyautogui = backend.pyautogui
+                default_presses = min(presses, 10)
+                latencies = []
+                for _ in range(default_presses):
+                    start = time.perf_counter()
+                    pyautogui.press("shift")
+                    latencies.append(time.perf_counter() - start)
+                results.append(summarize(f"pyautogui (PAUSE={pyautogui.PAUSE})", latencies))
+            results.append(summarize(f"{name} (hold {backend.hold}s)", measure_call_latency(backend, presses)))
+        except Exception as e:
+            print(f"{name:<24} failed: {e}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Key input backend latency benchmark")
+    parser.add_argument("--backends", type=str, default=",".join(BACKENDS),
+                        help="Comma-separated backends to measure.")
+    parser.add_argument("--presses", type=int, default=200, help="Key presses per backend.")
+    parser.add_argument("--fps", type=int, default=0,
+                        help="Frame rate of the pygame loop (0 polls as fast as possible).")
+    parser.add_argument("--ipc_port", type=int, default=DEFAULT_IPC_PORT, help="UDP port for the ipc backend.")
+    args = parser.parse_args()
+
+    backends = [name.strip() for name in args.backends.split(",") if name.strip()]
+    unknown = [name for name in backends if name not in BACKENDS]
+    if unknown:
+        parser.error(f"unknown backend(s): {', '.join(unknown)}")
+    run(backends, args.presses, args.fps, args.ipc_port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""
+Single input-executor thread that owns the keyboard
+
+Model responses are compiled into flat action sequences (key presses, key
+down/up and sleeps, see tools/actions.py) instead of being exec'd by every
+worker thread, and submitted to one executor thread. The executor runs one
+sequence at a time, highest priority first, drops sequences whose deadline
+passed while queued, and supports cancel-and-replace when a fresher plan
+arrives. Keys held down by a cancelled sequence are released so nothing stays
+stuck.
+
+Each sequence is turned into key events at absolute times on the monotonic
+clock (start + offset, see tools.actions.timeline), so slow key calls and
+thread contention do not push every later event back the way chained sleeps
+do. Presses that are already later than max_lateness are skipped, and the
+scheduled-vs-actual error of every event is recorded on the ticket.
+
+Usage:
+    from tools.actions import compile_actions
+    from tools.input_executor import get_input_executor
+
+    executor = get_input_executor()
+    ticket = executor.submit(compile_actions(clean_code), priority=1,
+                             deadline=time.time() + 2, replace=True)
+    ticket.wait()
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+import numpy as np
+
+from tools.actions import duration, timeline
+
+
+class ActionTicket:
+    """
+    Handle for a submitted action sequence.
+
+    status is one of "queued", "running", "done", "cancelled", "replaced" or "expired".
+    timing holds one (offset, op, key, error, executed) entry per key event, where
+    error is how many seconds after its scheduled time the event was issued.
+    """
+    def __init__(self, seq, actions, priority, deadline, source, on_start, max_lateness=None):
+        self.seq = seq
+        self.actions = actions
+        self.priority = priority
+        self.deadline = deadline
+        self.source = source
+        self.on_start = on_start
+        self.max_lateness = max_lateness
+        self.timing = []
+        self.status = "queued"
+        self.submit_time = time.time()
+        self.start_time = None
+        self.end_time = None
+        self.cancel_requested = False
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Block until the sequence finished, was cancelled or expired."""
+        return self.done.wait(timeout)
+
+    @property
+    def duration(self):
+        if self.start_time is None or self.end_time is None:
+            return 0.0
+        return self.end_time - self.start_time
+
+    @property
+    def skipped(self):
+        return sum(1 for entry in self.timing if not entry[4])
+
+    def timing_summary(self):
+        """Short description of the scheduled-vs-actual error of the executed events."""
+        errors = [entry[3] * 1000 for entry in self.timing if entry[4]]
+        if not errors:
+            return f"no events executed, {self.skipped} skipped"
+        return (f"timing error mean {np.mean(errors):.2f}ms, max {np.max(errors):.2f}ms, "
+                f"{self.skipped} late event(s) skipped")
+
+
+class InputExecutor:
+    """
+    Owns the keyboard and applies submitted action sequences one at a time.
+
+    Args:
+        backend: Object with press/keyDown/keyUp methods (tools/input_backends.py).
+            Defaults to pyautogui.
+        spin_threshold (float): Busy-wait for the last few milliseconds before an
+            action is due instead of relying on time.sleep granularity.
+        max_lateness (float, optional): Skip presses and key-downs issued more than
+            this many seconds after their scheduled time. None never skips.
+    """
+    def __init__(self, backend=None, spin_threshold=0.002, max_lateness=None):
+        if backend is None:
+            import pyautogui
+            backend = pyautogui
+        self.backend = backend
+        self.spin_threshold = spin_threshold
+        self.max_lateness = max_lateness
+
+        self.cond = threading.Condition()
+        self.queue = []
+        self.counter = itertools.count()
+        self.current = None
+        self.held_keys = set()
+        self.stopped = False
+
+        self.stats = {"submitted": 0, "done": 0, "cancelled": 0, "replaced": 0, "expired": 0, "errors": 0,
+                      "late_skipped": 0}
+        self.lateness = []
+
+        self.thread = threading.Thread(target=self._run, daemon=True, name="InputExecutor")
+        self.thread.start()
+
+    def submit(self, actions, priority=0, deadline=None, replace=False, source="", on_start=None,
+               max_lateness=None):
+        """
+        Queue an action sequence.
+
+        Args:
+            actions (list): Actions from tools.actions.compile_actions() / parse_actions().
+            priority (int): Higher runs first among queued sequences.
+            deadline (float, optional): time.time() after which the sequence is
+                dropped if it has not started yet.
+            replace (bool): Cancel the running sequence and drop everything queued
+                (cancel-and-replace for a fresher plan).
+            source (str): Label used in logs.
+            on_start (callable, optional): Called with the ticket when it starts running.
+            max_lateness (float, optional): Overrides the executor's max_lateness for this sequence.
+
+        Returns:
+            ActionTicket: Handle to wait on or cancel.
+        """
+        with self.cond:
+            ticket = ActionTicket(next(self.counter), actions, priority, deadline, source, on_start,
+                                  max_lateness if max_lateness is not None else self.max_lateness)
+            self.stats["submitted"] += 1
+            if replace:
+                for _, _, queued in self.queue:
+                    self._finish(queued, "replaced")
+                self.queue = []
+                if self.current is not None:
+                    self.current.cancel_requested = True
+            heapq.heappush(self.queue, (-priority, ticket.seq, ticket))
+            self.cond.notify_all()
+        return ticket
+
+    def cancel(self, ticket):
+        """Cancel a queued or running sequence."""
+        with self.cond:
+            if ticket.status == "queued":
+                self.queue = [entry for entry in self.queue if entry[2] is not ticket]
+                heapq.heapify(self.queue)
+                self._finish(ticket, "cancelled")
+            elif ticket.status == "running":
+                ticket.cancel_requested = True
+            self.cond.notify_all()
+
+    def wait(self, ticket, token=None, timeout=None):
+        """
+        Block until a ticket finishes, cancelling it as soon as `token` (a
+        CancellationToken) is cancelled.
+
+        Returns:
+            bool: True if the ticket finished (done, cancelled, replaced or expired).
+        """
+        if token is None:
+            return ticket.wait(timeout)
+        deadline = None if timeout is None else time.time() + timeout
+        while not ticket.wait(0.01):
+            if token.is_cancelled:
+                self.cancel(ticket)
+                return ticket.wait(1.0)
+            if deadline is not None and time.time() >= deadline:
+                return False
+        return True
+
+    def stop(self, timeout=2.0):
+        """Cancel everything, release held keys and stop the thread."""
+        with self.cond:
+            self.stopped = True
+            for _, _, queued in self.queue:
+                self._finish(queued, "cancelled")
+            self.queue = []
+            if self.current is not None:
+                self.current.cancel_requested = True
+            self.cond.notify_all()
+        self.thread.join(timeout)
+        self.release_all()
+
+    def release_all(self):
+        for key in list(self.held_keys):
+            try:
+                self.backend.keyUp(key)
+            except Exception as e:
+                print(f"[InputExecutor] Error releasing key {key}: {e}")
+        self.held_keys.clear()
+
+    def _finish(self, ticket, status):
+        ticket.status = status
+        ticket.end_time = time.time()
+        self.stats[status] += 1
+        ticket.done.set()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.queue and not self.stopped:
+                    self.cond.wait()
+                if self.stopped:
+                    return
+                _, _, ticket = heapq.heappop(self.queue)
+                if ticket.deadline is not None and time.time() > ticket.deadline:
+                    self._finish(ticket, "expired")
+                    print(f"[InputExecutor] Dropping expired sequence #{ticket.seq} {ticket.source}")
+                    continue
+                ticket.status = "running"
+                ticket.start_time = time.time()
+                self.current = ticket
+
+            if ticket.on_start is not None:
+                try:
+                    ticket.on_start(ticket)
+                except Exception as e:
+                    print(f"[InputExecutor] on_start callback failed: {e}")
+
+            status = self._execute(ticket)
+            with self.cond:
+                self.current = None
+                self._finish(ticket, status)
+
+    def _execute(self, ticket):
+        events = timeline(ticket.actions)
+        batch = getattr(self.backend, "press_batch", None)
+        skipped_downs = set()
+        start = time.perf_counter()
+        i = 0
+        while i < len(events) and not ticket.cancel_requested:
+            offset, op, arg = events[i]
+            i += 1
+            due = start + offset
+            self._wait_until(due, ticket)
+            if ticket.cancel_requested:
+                break
+
+            error = time.perf_counter() - due
+            if op in ("press", "keyDown") and ticket.max_lateness is not None and error > ticket.max_lateness:
+                # Too late to matter any more; its release is skipped too unless the key was already held
+                if op == "keyDown" and arg not in self.held_keys:
+                    skipped_downs.add(arg)
+                ticket.timing.append((offset, op, arg, error, False))
+                self.stats["late_skipped"] += 1
+                continue
+            if op == "keyUp" and arg in skipped_downs:
+                skipped_downs.discard(arg)
+                ticket.timing.append((offset, op, arg, error, False))
+                self.stats["late_skipped"] += 1
+                continue
+
+            keys = [arg]
+            if op == "press" and batch is not None:
+                # Taps scheduled for the same instant go out in one injection
+                while i < len(events) and events[i][:2] == (offset, "press"):
+                    keys.append(events[i][2])
+                    i += 1
+            try:
+                if len(keys) > 1:
+                    batch(keys)
+                elif op == "press":
+                    self.backend.press(arg)
+                elif op == "keyDown":
+                    self.backend.keyDown(arg)
+                    self.held_keys.add(arg)
+                elif op == "keyUp":
+                    self.backend.keyUp(arg)
+                    self.held_keys.discard(arg)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[InputExecutor] Error executing {op}({arg!r}): {e}")
+            for key in keys:
+                ticket.timing.append((offset, op, key, error, True))
+                self.lateness.append(error)
+
+        # A plan ending in a wait still occupies the keyboard until its end
+        self._wait_until(start + duration(ticket.actions), ticket)
+
+        if ticket.cancel_requested:
+            # Don't leave keys held down by a plan that was cut short
+            self.release_all()
+            return "cancelled"
+        return "done"
+
+    def _wait_until(self, due, ticket):
+        while not ticket.cancel_requested:
+            remaining = due - time.perf_counter()
+            if remaining <= 0:
+                return
+            if remaining > self.spin_threshold:
+                # Sleep in short slices so cancellation is noticed quickly
+                time.sleep(min(remaining - self.spin_threshold, 0.01))
+
+    def report(self):
+        print("[InputExecutor] " + ", ".join(f"{key}: {value}" for key, value in self.stats.items()))
+        if self.lateness:
+            lateness_ms = np.array(self.lateness) * 1000
+            print(f"[InputExecutor] Timing error (actual - scheduled): mean {lateness_ms.mean():.2f}ms, "
+                  f"p95 {np.percentile(lateness_ms, 95):.2f}ms, max {lateness_ms.max():.2f}ms, "
+                  f"{self.stats['late_skipped']} late event(s) skipped")
+
+
+_shared_executor = None
+_shared_lock = threading.Lock()
+
+
+def get_input_executor():
+    """Return the process-wide InputExecutor, creating it on first use."""
+    global _shared_executor
+    with _shared_lock:
+        if _shared_executor is None:
+            _shared_executor = InputExecutor()
+        return _shared_executor
+
+
+def configure_input_executor(backend=None, max_lateness=None):
+    """
+    Set the key backend (see tools/input_backends.py) and the late-event limit of
+    the process-wide InputExecutor, creating the executor if needed. Call before
+    submitting actions; None leaves a setting unchanged.
+    """
+    global _shared_executor
+    with _shared_lock:
+        if _shared_executor is None:
+            _shared_executor = InputExecutor(backend=backend, max_lateness=max_lateness)
+        else:
+            with _shared_executor.cond:
+                if backend is not None:
+                    _shared_executor.backend = backend
+                if max_lateness is not None:
+                    _shared_executor.max_lateness = max_lateness
+        return _shared_executor
@@ -0,0 +1,113 @@
+"""
+Shared font and text-overlay cache
+
+Screenshots, simulated boards and animation frames are all annotated with
+text, and every one of those paths used to call ImageFont.truetype() (inside
+a bare try/except) for every image, then rasterize the same few words
+("NEXT", "SCORE", "SIMULATED", ...) again with FreeType. Here fonts are
+loaded once per size, and each (text, size, color) is rendered once into a
+sprite: an alpha mask plus a solid color tile. Drawing a sprite is a single
+alpha-composited paste for PIL images, or a NumPy blend for frames held as
+arrays, which gives the same pixels as ImageDraw.text.
+
+Text that changes on every call (timestamps, iteration numbers) should still
+go through ImageDraw.text with get_font(), since caching it would only fill
+the cache.
+python -m tools.overlay_benchmark compares the per-call cost with the old
+per-image font loading.
+
+Usage:
+    from tools.overlay import draw_text, get_font
+
+    draw_text(image, (310, 180), "SCORE", size=20)          # PIL image or HxWx3 uint8 array
+    ImageDraw.Draw(image).text((10, 10), timestamp, fill="white", font=get_font(14))
+"""
+
+import functools
+
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+FONT_PATH = "arial.ttf"
+
+# Distinct (text, size, color) sprites kept in memory
+SPRITE_CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=None)
+def get_font(size=16):
+    """The annotation font at `size`, loaded once per process (default font if arial is missing)."""
+    try:
+        return ImageFont.truetype(FONT_PATH, size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+class TextSprite:
+    """Pre-rendered text: an "L" mask, a color tile of the same size and the mask as alpha for NumPy."""
+    def __init__(self, text, size, fill):
+        font = get_font(size)
+        left, top, right, bottom = font.getbbox(text)
+        # Rendered from the text origin, so the sprite lands exactly where ImageDraw.text would draw it
+        width, height = max(right, 1), max(bottom, 1)
+        self.mask = Image.new("L", (width, height))
+        ImageDraw.Draw(self.mask).text((0, 0), text, fill=255, font=font)
+        self.color = fill
+        self.tile = Image.new("RGB", (width, height), fill)
+        self.alpha = np.asarray(self.mask, dtype=np.float32)[..., None] / 255.0
+        self.size = (width, height)
+
+
+@functools.lru_cache(maxsize=SPRITE_CACHE_SIZE)
+def text_sprite(text, size=16, fill=(255, 255, 255)):
+    return TextSprite(text, size, fill)
+
+
+def draw_text(target, xy, text, size=16, fill=(255, 255, 255)):
+    """
+    Draw cached text at `xy` (same placement as ImageDraw.text) onto a PIL
+    image or an HxWx3 uint8 array, in place. Returns the target.
+    """
+    if isinstance(fill, str):
+        fill = ImageColor.getrgb(fill)
+    sprite = text_sprite(text, size, tuple(fill[:3]))
+    x, y = int(xy[0]), int(xy[1])
+    if isinstance(target, Image.Image):
+        target.paste(sprite.tile, (x, y), sprite.mask)
+        return target
+
+    # NumPy frame: blend the clipped overlap of sprite and frame
+    height, width = target.shape[:2]
+    sprite_width, sprite_height = sprite.size
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + sprite_width, width), min(y + sprite_height, height)
+    if x0 >= x1 or y0 >= y1:
+        return target
+    alpha = sprite.alpha[y0 - y:y1 - y, x0 - x:x1 - x]
+    region = target[y0:y1, x0:x1]
+    region[:] = (region * (1.0 - alpha) + np.asarray(sprite.color, dtype=np.float32) * alpha + 0.5).astype(np.uint8)
+    return target
+
+
+def draw_label(img, label, size=16):
+    """
+    Draw a label box in the top-left corner of `img` (in place).
+
+    Labels look like "Iteration 12: After Move": only the part after ": " is
+    drawn from a cached sprite, the iteration part (different on every frame)
+    is drawn with ImageDraw.text so it does not fill the sprite cache.
+    """
+    draw = ImageDraw.Draw(img)
+
+    # Add semi-transparent background for text
+    text_width = len(label) * 8
+    text_height = 20
+    draw.rectangle([(10, 10), (10 + text_width, 10 + text_height)], fill=(0, 0, 0, 128))
+
+    # Draw text
+    head, separator, tail = label.partition(": ")
+    font = get_font(size)
+    draw.text((15, 12), head, fill=(255, 255, 255), font=font)
+    if separator:
+        draw_text(img, (15 + round(font.getlength(head)), 12), separator + tail, size=size)
+    return img
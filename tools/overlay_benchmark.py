@@ -0,0 +1,129 @@
+"""
+Per-call cost of text annotation, before and after the overlay cache
+
+"before" reproduces what the annotation paths used to do for every image:
+ImageFont.truetype("arial.ttf") in a try/except (falling back to the default
+font) followed by ImageDraw.text. "after" uses tools/overlay.py: fonts loaded
+once and repeated labels drawn from cached sprites, onto a PIL image or a
+NumPy frame.
+
+Cases:
+    board_panel   the six UI labels of a simulated board (NEXT, SCORE, 0, LEVEL, 1, SIMULATED)
+    frame_label   the achieve_gif label box ("Iteration N: After Move"), a new N every call
+    screenshot    timestamp plus description on a captured screenshot
+
+Usage:
+    python -m tools.overlay_benchmark --calls 500
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from tools.overlay import FONT_PATH, draw_label, draw_text, get_font
+
+PANEL_TEXT = [((320, 20), "NEXT", (255, 255, 255)), ((310, 180), "SCORE", (255, 255, 255)),
+              ((310, 210), "0", (255, 255, 255)), ((310, 260), "LEVEL", (255, 255, 255)),
+              ((310, 290), "1", (255, 255, 255)), ((310, 570), "SIMULATED", (255, 100, 100))]
+
+
+def load_font_uncached(size):
+    try:
+        return ImageFont.truetype(FONT_PATH, size)
+    except:
+        return ImageFont.load_default()
+
+
+def board_panel_before(image, i=0):
+    draw = ImageDraw.Draw(image)
+    font = load_font_uncached(20)
+    for xy, text, fill in PANEL_TEXT:
+        draw.text(xy, text, fill=fill, font=font)
+
+
+def board_panel_after(image, i=0):
+    for xy, text, fill in PANEL_TEXT:
+        draw_text(image, xy, text, size=20, fill=fill)
+
+
+def frame_label_before(image, i):
+    draw = ImageDraw.Draw(image)
+    label = f"Iteration {i}: After Move"
+    font = load_font_uncached(16)
+    draw.rectangle([(10, 10), (10 + len(label) * 8, 30)], fill=(0, 0, 0, 128))
+    draw.text((15, 12), label, fill=(255, 255, 255), font=font)
+
+
+def frame_label_after(image, i):
+    draw_label(image, f"Iteration {i}: After Move")
+
+
+def screenshot_before(image, i=0):
+    draw = ImageDraw.Draw(image)
+    font = load_font_uncached(14)
+    draw.text((10, 10), datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3], fill="white", font=font)
+    draw.text((10, 30), "Initial Game State", fill="white", font=font)
+
+
+def screenshot_after(image, i=0):
+    draw = ImageDraw.Draw(image)
+    draw.text((10, 10), datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3], fill="white", font=get_font(14))
+    draw_text(image, (10, 30), "Initial Game State", size=14)
+
+
+def measure(func, calls, make_target):
+    times = []
+    for i in range(calls):
+        target = make_target()
+        start = time.perf_counter()
+        func(target, i)
+        times.append(time.perf_counter() - start)
+    return np.array(times) * 1e6
+
+
+def run(calls):
+    new_image = lambda: Image.new("RGB", (480, 600), (30, 30, 30))
+    new_array = lambda: np.full((600, 480, 3), 30, dtype=np.uint8)
+    cases = [
+        ("board_panel", "before", board_panel_before, new_image),
+        ("board_panel", "after (PIL)", board_panel_after, new_image),
+        ("board_panel", "after (NumPy)", board_panel_after, new_array),
+        ("frame_label", "before", frame_label_before, new_image),
+        ("frame_label", "after", frame_label_after, new_image),
+        ("screenshot", "before", screenshot_before, new_image),
+        ("screenshot", "after", screenshot_after, new_image),
+    ]
+    # Warm the caches so "after" shows the steady state
+    board_panel_after(new_image())
+    board_panel_after(new_array())
+
+    results = []
+    for case, variant, func, make_target in cases:
+        times = measure(func, calls, make_target)
+        print(f"{case:<12} {variant:<14} mean {times.mean():8.1f}us  p50 {np.percentile(times, 50):8.1f}us  "
+              f"p95 {np.percentile(times, 95):8.1f}us")
+        results.append({"case": case, "variant": variant, "mean_us": float(times.mean())})
+
+    # Same pixels either way
+    before, after, array = new_image(), new_image(), new_array()
+    board_panel_before(before)
+    board_panel_after(after)
+    board_panel_after(array)
+    diff_pil = np.abs(np.asarray(before, dtype=int) - np.asarray(after, dtype=int)).max()
+    diff_numpy = np.abs(np.asarray(before, dtype=int) - array.astype(int)).max()
+    print(f"Max pixel difference vs ImageDraw.text: PIL {diff_pil}, NumPy {diff_numpy}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text overlay cost before/after the shared overlay cache")
+    parser.add_argument("--calls", type=int, default=500, help="Calls per case.")
+    args = parser.parse_args()
+    run(args.calls)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Staged capture -> encode -> request -> parse -> execute pipeline
+
+The agent loops used to run every step of an iteration back to back in one
+thread, so the screen sat idle while the model was thinking and the model sat
+idle while frames were captured and moves executed. A Pipeline runs each stage
+in its own worker thread(s) with a small bounded queue in between, so
+capturing and encoding frame N+1 overlaps the request for frame N, while the
+bounded queues keep a slow stage from piling up stale work upstream.
+
+Each stage tracks occupancy (fraction of wall time its workers were busy,
+excluding time blocked on a full downstream queue) and throughput, which
+shows at a glance which stage is the bottleneck.
+
+Usage:
+    from tools.pipeline import Pipeline, Stage
+
+    pipeline = Pipeline([
+        Stage("capture", capture_frame),    # source: called with no arguments
+        Stage("request", ask_model, workers=2),
+        Stage("execute", run_actions),
+    ])
+    pipeline.run()      # until Ctrl+C or pipeline.stop(), then prints a report
+
+A stage function returns the item for the next stage, or None to drop it.
+"""
+
+import queue
+import threading
+import time
+
+
+class Stage:
+    """
+    One step of a Pipeline.
+
+    Args:
+        name (str): Label used in logs and reports.
+        func (callable): Called with the previous stage's output (or with no
+            arguments for the first stage) and returns the item for the next
+            stage, or None to drop it.
+        workers (int): Number of threads running this stage.
+        queue_size (int): Capacity of the queue feeding this stage.
+    """
+    def __init__(self, name, func, workers=1, queue_size=1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.input = None
+        self.output = None
+
+        self.lock = threading.Lock()
+        self.stats = {"processed": 0, "dropped": 0, "errors": 0}
+        self.busy_time = 0.0
+        self.blocked_time = 0.0
+        self.active = 0
+
+    def _add(self, key, busy=0.0, blocked=0.0):
+        with self.lock:
+            if key:
+                self.stats[key] += 1
+            self.busy_time += busy
+            self.blocked_time += blocked
+
+    def status(self, elapsed):
+        """Occupancy, throughput and queue depth over `elapsed` seconds."""
+        elapsed = max(elapsed, 1e-9)
+        with self.lock:
+            return {
+                "name": self.name,
+                "processed": self.stats["processed"],
+                "dropped": self.stats["dropped"],
+                "errors": self.stats["errors"],
+                "occupancy": self.busy_time / (elapsed * self.workers),
+                "blocked": self.blocked_time / (elapsed * self.workers),
+                "throughput": self.stats["processed"] / elapsed,
+                "queued": self.input.qsize() if self.input is not None else 0,
+                "active": self.active,
+            }
+
+
+class Pipeline:
+    """
+    Runs a list of Stages connected by bounded queues.
+
+    The first stage is the source and is called repeatedly with no arguments;
+    it blocks once the queue to the second stage is full, which is what
+    throttles capturing to the pace of the slowest stage.
+
+    Args:
+        stages (list): Stage objects in order.
+        name (str): Label used in logs.
+        report_interval (float): Print a one-line status every this many
+            seconds while running (0 disables).
+    """
+    def __init__(self, stages, name="Pipeline", report_interval=0.0):
+        if not stages:
+            raise ValueError("a pipeline needs at least one stage")
+        self.stages = stages
+        self.name = name
+        self.report_interval = report_interval
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.start_time = None
+
+        for i, stage in enumerate(stages):
+            stage.input = queue.Queue(maxsize=stage.queue_size) if i > 0 else None
+        for i, stage in enumerate(stages):
+            stage.output = stages[i + 1].input if i + 1 < len(stages) else None
+
+    def start(self):
+        self.start_time = time.time()
+        for stage in self.stages:
+            for i in range(stage.workers):
+                thread = threading.Thread(target=self._work, args=(stage,), daemon=True,
+                                          name=f"{self.name}-{stage.name}-{i}")
+                thread.start()
+                self.threads.append(thread)
+
+    def stop(self, timeout=2.0):
+        """Ask all stages to finish their current item and exit."""
+        self.stop_event.set()
+        deadline = time.time() + timeout
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join(max(0.0, deadline - time.time()))
+
+    def run(self, duration=None, should_stop=None):
+        """
+        Start the pipeline and block until stop() is called, Ctrl+C is pressed,
+        `duration` seconds have passed or `should_stop()` returns True, then
+        print a report.
+        """
+        self.start()
+        last_report = time.time()
+        try:
+            while not self.stop_event.is_set():
+                if duration is not None and time.time() - self.start_time >= duration:
+                    break
+                if should_stop is not None and should_stop():
+                    break
+                time.sleep(0.1)
+                if self.report_interval and time.time() - last_report >= self.report_interval:
+                    last_report = time.time()
+                    self.print_status()
+        except KeyboardInterrupt:
+            print(f"\n[{self.name}] Interrupted by user. Exiting...")
+        finally:
+            self.stop()
+            self.report()
+
+    def _work(self, stage):
+        while not self.stop_event.is_set():
+            if stage.input is None:
+                args = ()
+            else:
+                try:
+                    args = (stage.input.get(timeout=0.1),)
+                except queue.Empty:
+                    continue
+
+            with stage.lock:
+                stage.active += 1
+            start = time.perf_counter()
+            try:
+                result = stage.func(*args)
+            except Exception as e:
+                stage._add("errors", busy=time.perf_counter() - start)
+                print(f"[{self.name}] Error in stage '{stage.name}': {e}")
+                # Back off a little so a persistently failing source does not spin
+                self.stop_event.wait(0.5)
+                continue
+            finally:
+                with stage.lock:
+                    stage.active -= 1
+            busy = time.perf_counter() - start
+
+            if result is None:
+                stage._add("dropped", busy=busy)
+                continue
+
+            blocked_start = time.perf_counter()
+            if stage.output is not None and not self._put(stage.output, result):
+                return
+            stage._add("processed", busy=busy, blocked=time.perf_counter() - blocked_start)
+
+    def _put(self, output, item):
+        while not self.stop_event.is_set():
+            try:
+                output.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def status(self):
+        elapsed = time.time() - (self.start_time or time.time())
+        return [stage.status(elapsed) for stage in self.stages]
+
+    def print_status(self):
+        print(f"[{self.name}] " + " | ".join(
+            f"{s['name']}: {s['occupancy']:.0%} busy, {s['throughput']:.2f}/s, {s['queued']} queued"
+            for s in self.status()))
+
+    def report(self):
+        elapsed = time.time() - (self.start_time or time.time())
+        print(f"\n[{self.name}] ---- Stage summary ({elapsed:.1f}s) ----")
+        for s in self.status():
+            print(f"[{self.name}] {s['name']:>10}: {s['processed']} processed, {s['dropped']} dropped, "
+                  f"{s['errors']} errors, occupancy {s['occupancy']:.0%}, "
+                  f"blocked {s['blocked']:.0%}, throughput {s['throughput']:.2f}/s")
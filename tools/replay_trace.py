@@ -0,0 +1,533 @@
+"""
+Single-file replay traces with delta-encoded frames
+
+A session used to leave hundreds of PNGs behind (pre-execution,
+post-execution and interval screenshots), and reconstructing a run meant
+matching filenames against the log. A replay trace keeps everything about a
+session in one file:
+
+- frames: a full keyframe every keyframe_interval frames (PNG) and, in
+  between, the changed region of the difference to the previous frame
+  (zlib). Consecutive game screens differ in a few cells, so a delta is
+  usually a few hundred bytes and an unchanged frame costs nothing;
+- events: symbolic state, model requests and responses, executed actions,
+  each with iteration and timestamp. Long strings (the prompt is the same
+  every iteration) are stored once and referenced afterwards.
+
+The file is a sequence of chunks followed by an index, so a reader can jump
+to any iteration without decoding what comes before it (a delta frame needs
+only the frames since its keyframe):
+
+    b"GATRACE1"
+    chunk*        struct "<BII" (type, meta length, data length), meta JSON, data
+    index chunk   JSON list of (type, offset, meta) for every chunk
+    footer        struct "<Q8s" (index offset, b"GATRACE1")
+
+Chunks are flushed as they are written, so a trace from a crashed session
+has no index or footer but can still be read; the reader rebuilds the index
+by scanning the chunks.
+
+Usage:
+    from tools.replay_trace import TraceWriter, TraceReader
+
+    trace = TraceWriter("session_x/replay.gatr")
+    frame = trace.add_frame(image, iteration=3, label="pre_execution")
+    trace.add_event("response", iteration=3, text=response, latency=2.4)
+    trace.add_event("actions", iteration=3, actions=["left", "up", "space"])
+    trace.close()
+
+    reader = TraceReader("session_x/replay.gatr")
+    image = reader.frame(reader.iteration(3)["frames"][0])
+
+    python -m tools.replay_trace info session_x/replay.gatr
+    python -m tools.replay_trace play session_x/replay.gatr --iteration 3
+    python -m tools.replay_trace export session_x/replay.gatr --iteration 3 --out frames/
+    python -m tools.replay_trace convert claude_tetris_outputs/session_20250308_030050
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+MAGIC = b"GATRACE1"
+CHUNK_HEADER = struct.Struct("<BII")
+FOOTER = struct.Struct("<Q8s")
+
+KEYFRAME, DELTA, EVENT, INDEX, BLOB = 1, 2, 3, 4, 5
+
+DEFAULT_KEYFRAME_INTERVAL = 30
+
+# Strings at least this long are stored once as a blob and referenced by hash
+BLOB_MIN_LENGTH = 256
+
+
+class TraceWriter:
+    """
+    Appends frames and events to a replay trace.
+
+    Args:
+        path (str): Trace file to create.
+        keyframe_interval (int): Store a full frame every this many frames.
+        metadata (dict, optional): Session information stored in a leading "session" event.
+    """
+    def __init__(self, path, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL, metadata=None):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.lock = threading.Lock()
+        self.index = []
+        self.blobs = set()
+        self.frame_count = 0
+        self.last_key = 0
+        self.previous = None
+        self.closed = False
+        self.stats = {"keyframes": 0, "deltas": 0, "events": 0, "blobs": 0, "frame_bytes": 0, "raw_bytes": 0}
+
+        if metadata:
+            self.add_event("session", **metadata)
+
+    def _write_chunk(self, chunk_type, meta, data=b""):
+        meta_bytes = json.dumps(meta, ensure_ascii=False, default=str).encode("utf-8")
+        offset = self.file.tell()
+        self.file.write(CHUNK_HEADER.pack(chunk_type, len(meta_bytes), len(data)))
+        self.file.write(meta_bytes)
+        self.file.write(data)
+        self.file.flush()
+        self.index.append((chunk_type, offset, meta))
+
+    def add_frame(self, image, iteration=None, label="", ts=None):
+        """
+        Append a frame (PIL image or HxWxC uint8 array).
+
+        Returns:
+            int: Frame number, for events that refer to it.
+        """
+        pixels = np.asarray(image.convert("RGB") if isinstance(image, Image.Image) else image, dtype=np.uint8)
+        with self.lock:
+            number = self.frame_count
+            meta = {"frame": number, "iteration": iteration, "label": label,
+                    "ts": ts if ts is not None else time.time(), "shape": list(pixels.shape)}
+            keyframe = (self.previous is None or self.previous.shape != pixels.shape
+                        or number - self.last_key >= self.keyframe_interval)
+            if keyframe:
+                buffer = BytesIO()
+                Image.fromarray(pixels).save(buffer, format="PNG")
+                data = buffer.getvalue()
+                self.last_key = number
+                self._write_chunk(KEYFRAME, meta, data)
+                self.stats["keyframes"] += 1
+            else:
+                # Only the bounding box of the changed pixels is stored; differences
+                # wrap around in uint8 and are added back the same way
+                meta["key"] = self.last_key
+                diff = pixels - self.previous
+                changed = np.any(diff.reshape(diff.shape[0], diff.shape[1], -1) != 0, axis=2)
+                rows, cols = np.nonzero(changed.any(axis=1))[0], np.nonzero(changed.any(axis=0))[0]
+                if len(rows):
+                    top, bottom, left, right = int(rows[0]), int(rows[-1]) + 1, int(cols[0]), int(cols[-1]) + 1
+                    meta["box"] = [top, left, bottom, right]
+                    data = zlib.compress(np.ascontiguousarray(diff[top:bottom, left:right]).tobytes(), 6)
+                else:
+                    meta["box"] = None
+                    data = b""
+                self._write_chunk(DELTA, meta, data)
+                self.stats["deltas"] += 1
+            self.previous = pixels
+            self.frame_count += 1
+            self.stats["frame_bytes"] += len(data)
+            self.stats["raw_bytes"] += pixels.nbytes
+            return number
+
+    def _store_blobs(self, value):
+        if isinstance(value, str) and len(value) >= BLOB_MIN_LENGTH:
+            digest = hashlib.sha1(value.encode("utf-8")).hexdigest()
+            if digest not in self.blobs:
+                self._write_chunk(BLOB, {"sha1": digest}, zlib.compress(value.encode("utf-8"), 6))
+                self.blobs.add(digest)
+                self.stats["blobs"] += 1
+            return {"$blob": digest}
+        if isinstance(value, dict):
+            return {key: self._store_blobs(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._store_blobs(item) for item in value]
+        return value
+
+    def add_event(self, kind, iteration=None, ts=None, **data):
+        """Append an event such as "state", "request", "response" or "actions"."""
+        with self.lock:
+            payload = self._store_blobs(data)
+            meta = {"kind": kind, "iteration": iteration, "ts": ts if ts is not None else time.time()}
+            body = zlib.compress(json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8"), 6)
+            self._write_chunk(EVENT, meta, body)
+            self.stats["events"] += 1
+
+    def close(self):
+        """Write the index and footer."""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            index_offset = self.file.tell()
+            data = zlib.compress(json.dumps(self.index, ensure_ascii=False, default=str).encode("utf-8"), 6)
+            self.file.write(CHUNK_HEADER.pack(INDEX, 0, len(data)))
+            self.file.write(data)
+            self.file.write(FOOTER.pack(index_offset, MAGIC))
+            self.file.close()
+
+    def report(self):
+        ratio = self.stats["raw_bytes"] / max(self.stats["frame_bytes"], 1)
+        print(f"[ReplayTrace] {self.path}: {self.stats['keyframes']} keyframes, {self.stats['deltas']} deltas, "
+              f"{self.stats['events']} events, frames {self.stats['frame_bytes'] / 1024:.1f}KB "
+              f"({ratio:.0f}x smaller than raw)")
+
+
+class TraceReader:
+    """
+    Random access to a replay trace.
+
+    Attributes:
+        frames (list): Frame metadata (frame, iteration, label, ts, shape) in order.
+        events (list): Event metadata (kind, iteration, ts) in order.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        if self.file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a replay trace")
+        self.complete = True
+        entries = self._read_index()
+        if entries is None:
+            self.complete = False
+            entries = self._scan()
+
+        self.frames = []
+        self.events = []
+        self.blob_offsets = {}
+        self.frame_offsets = []
+        self.event_offsets = []
+        for chunk_type, offset, meta in entries:
+            if chunk_type in (KEYFRAME, DELTA):
+                meta = dict(meta, keyframe=chunk_type == KEYFRAME)
+                self.frames.append(meta)
+                self.frame_offsets.append(offset)
+            elif chunk_type == EVENT:
+                self.events.append(meta)
+                self.event_offsets.append(offset)
+            elif chunk_type == BLOB:
+                self.blob_offsets[meta["sha1"]] = offset
+        self.cached = None  # (frame number, pixels) of the last decoded frame
+
+    def close(self):
+        self.file.close()
+
+    def _read_index(self):
+        self.file.seek(0, os.SEEK_END)
+        size = self.file.tell()
+        if size < len(MAGIC) + FOOTER.size:
+            return None
+        self.file.seek(size - FOOTER.size)
+        index_offset, magic = FOOTER.unpack(self.file.read(FOOTER.size))
+        if magic != MAGIC:
+            return None
+        self.file.seek(index_offset)
+        chunk_type, _, data_length = CHUNK_HEADER.unpack(self.file.read(CHUNK_HEADER.size))
+        if chunk_type != INDEX:
+            return None
+        return json.loads(zlib.decompress(self.file.read(data_length)))
+
+    def _scan(self):
+        """Rebuild the index of a trace that was not closed (stops at a truncated chunk)."""
+        entries = []
+        self.file.seek(len(MAGIC))
+        while True:
+            offset = self.file.tell()
+            header = self.file.read(CHUNK_HEADER.size)
+            if len(header) < CHUNK_HEADER.size:
+                break
+            chunk_type, meta_length, data_length = CHUNK_HEADER.unpack(header)
+            meta_bytes = self.file.read(meta_length)
+            self.file.seek(data_length, os.SEEK_CUR)
+            if len(meta_bytes) < meta_length or self.file.tell() > os.fstat(self.file.fileno()).st_size:
+                break
+            entries.append((chunk_type, offset, json.loads(meta_bytes)))
+        return entries
+
+    def _read_data(self, offset):
+        self.file.seek(offset)
+        _, meta_length, data_length = CHUNK_HEADER.unpack(self.file.read(CHUNK_HEADER.size))
+        self.file.seek(meta_length, os.SEEK_CUR)
+        return self.file.read(data_length)
+
+    def _pixels(self, number):
+        meta = self.frames[number]
+        if meta["keyframe"]:
+            start, pixels = number, None
+        else:
+            # Continue from the cached frame when it lies between the keyframe and this one
+            if self.cached is not None and meta["key"] <= self.cached[0] <= number:
+                start, pixels = self.cached
+            else:
+                start, pixels = meta["key"], None
+        if pixels is None:
+            data = self._read_data(self.frame_offsets[start])
+            pixels = np.asarray(Image.open(BytesIO(data)).convert("RGB"), dtype=np.uint8)
+        for i in range(start + 1, number + 1):
+            box = self.frames[i]["box"]
+            if box is None:
+                continue
+            top, left, bottom, right = box
+            delta = np.frombuffer(zlib.decompress(self._read_data(self.frame_offsets[i])), dtype=np.uint8)
+            pixels = pixels.copy()
+            pixels[top:bottom, left:right] += delta.reshape((bottom - top, right - left) + pixels.shape[2:])
+        self.cached = (number, pixels)
+        return pixels
+
+    def frame(self, number):
+        """Decode frame `number` as a PIL image."""
+        return Image.fromarray(self._pixels(number))
+
+    def blob(self, digest):
+        return zlib.decompress(self._read_data(self.blob_offsets[digest])).decode("utf-8")
+
+    def _resolve(self, value):
+        if isinstance(value, dict):
+            if set(value) == {"$blob"}:
+                return self.blob(value["$blob"])
+            return {key: self._resolve(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._resolve(item) for item in value]
+        return value
+
+    def event(self, number):
+        """Event `number` as a dict (kind, iteration, ts and its data)."""
+        payload = json.loads(zlib.decompress(self._read_data(self.event_offsets[number])))
+        return dict(self.events[number], **self._resolve(payload))
+
+    def iterations(self):
+        found = {meta["iteration"] for meta in self.frames + self.events if meta.get("iteration") is not None}
+        return sorted(found)
+
+    def iteration(self, iteration):
+        """Frame numbers and decoded events of one iteration."""
+        return {
+            "frames": [meta["frame"] for meta in self.frames if meta.get("iteration") == iteration],
+            "events": [self.event(i) for i, meta in enumerate(self.events) if meta.get("iteration") == iteration],
+        }
+
+
+def describe_event(event):
+    """One-line summary of an event for the player and info output."""
+    kind = event["kind"]
+    if kind == "response":
+        latency = event.get("latency")
+        text = " ".join(str(event.get("text", "")).split())
+        return f"response{f' ({latency:.2f}s)' if latency is not None else ''}: {text[:100]}"
+    if kind == "actions":
+        return f"actions: {event.get('actions')}"
+    if kind == "request":
+        return f"request: model {event.get('model')}, frame {event.get('frame')}"
+    fields = {key: value for key, value in event.items() if key not in ("kind", "iteration", "ts")}
+    return f"{kind}: {json.dumps(fields, default=str)[:100]}"
+
+
+def convert_session(session_dir, out_path=None, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL):
+    """
+    Build a trace from an existing session directory: screenshots/*.png in
+    filename order, responses/* and the "Extracted actions" lines of the log.
+
+    Returns:
+        tuple: (trace path, total size of the PNGs it replaces)
+    """
+    out_path = out_path or os.path.join(session_dir, "replay.gatr")
+    trace = TraceWriter(out_path, keyframe_interval, metadata={"source": os.path.abspath(session_dir)})
+    iteration_pattern = re.compile(r"_(\d+)(?:\.\w+)?$")
+
+    png_bytes = 0
+    screenshots_dir = os.path.join(session_dir, "screenshots")
+    if os.path.isdir(screenshots_dir):
+        for name in sorted(os.listdir(screenshots_dir)):
+            if not name.endswith(".png"):
+                continue
+            path = os.path.join(screenshots_dir, name)
+            match = iteration_pattern.search(name)
+            label = ("pre_execution" if "pre_execution" in name else
+                     "post_execution" if "post_execution" in name else "screenshot")
+            trace.add_frame(Image.open(path), iteration=int(match.group(1)) if match else None,
+                            label=label, ts=os.path.getmtime(path))
+            png_bytes += os.path.getsize(path)
+
+    responses_dir = os.path.join(session_dir, "responses")
+    if os.path.isdir(responses_dir):
+        for name in sorted(os.listdir(responses_dir)):
+            path = os.path.join(responses_dir, name)
+            match = iteration_pattern.search(name)
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                text = f.read()
+            latency = re.search(r"(?:API Latency|Latency):\s*([\d.]+)s", text)
+            trace.add_event("response", iteration=int(match.group(1)) if match else None,
+                            ts=os.path.getmtime(path), text=text,
+                            latency=float(latency.group(1)) if latency else None)
+
+    for name in ("session_log.jsonl", "session_log.txt", "session_log"):
+        log_path = os.path.join(session_dir, name)
+        if not os.path.exists(log_path):
+            continue
+        iteration = None
+        with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if name.endswith(".jsonl"):
+                    record = json.loads(line)
+                    if record.get("event") == "actions":
+                        trace.add_event("actions", iteration=record.get("iteration"), ts=record.get("ts"),
+                                        actions=record.get("actions"))
+                    continue
+                match = re.search(r"=== Iteration (\d+) ===", line)
+                if match:
+                    iteration = int(match.group(1))
+                match = re.search(r"Extracted actions:\s*(\[.*\])", line)
+                if match:
+                    trace.add_event("actions", iteration=iteration, actions=ast.literal_eval(match.group(1)))
+        break
+
+    trace.close()
+    return out_path, png_bytes
+
+
+def play(reader, iteration=None, scale=1.0):
+    """
+    Step through a trace in a pygame window: left/right for the previous/next
+    frame, up/down for the previous/next iteration, Esc to quit. The events of
+    the current iteration are printed when it changes.
+    """
+    import pygame
+
+    if not reader.frames:
+        print("Trace has no frames.")
+        return
+    number = 0
+    if iteration is not None:
+        matching = [meta["frame"] for meta in reader.frames if meta.get("iteration") == iteration]
+        if not matching:
+            print(f"Iteration {iteration} has no frames.")
+            return
+        number = matching[0]
+
+    pygame.init()
+    screen = None
+    shown_iteration = object()
+    clock = pygame.time.Clock()
+    running = True
+    while running:
+        meta = reader.frames[number]
+        image = reader.frame(number)
+        if scale != 1.0:
+            image = image.resize((int(image.width * scale), int(image.height * scale)))
+        if screen is None or screen.get_size() != image.size:
+            screen = pygame.display.set_mode(image.size)
+        pygame.display.set_caption(f"{os.path.basename(reader.path)} - frame {number}, "
+                                   f"iteration {meta.get('iteration')} {meta.get('label', '')}")
+        screen.blit(pygame.image.frombuffer(image.tobytes(), image.size, "RGB"), (0, 0))
+        pygame.display.flip()
+        if meta.get("iteration") != shown_iteration:
+            shown_iteration = meta.get("iteration")
+            print(f"\n=== Iteration {shown_iteration} ===")
+            for event in reader.iteration(shown_iteration)["events"]:
+                print("  " + describe_event(event))
+
+        waiting = True
+        while waiting and running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                    running = False
+                elif event.type == pygame.KEYDOWN:
+                    iteration_starts = [i for i, m in enumerate(reader.frames)
+                                        if i == 0 or m.get("iteration") != reader.frames[i - 1].get("iteration")]
+                    if event.key == pygame.K_RIGHT and number < len(reader.frames) - 1:
+                        number += 1
+                    elif event.key == pygame.K_LEFT and number > 0:
+                        number -= 1
+                    elif event.key == pygame.K_DOWN:
+                        number = next((i for i in iteration_starts if i > number), number)
+                    elif event.key == pygame.K_UP:
+                        number = max([i for i in iteration_starts if i < number] or [0])
+                    else:
+                        continue
+                    waiting = False
+            clock.tick(60)
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect, play, export and create replay traces")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    info = commands.add_parser("info", help="Summarize a trace")
+    info.add_argument("trace", type=str)
+
+    player = commands.add_parser("play", help="Step through a trace in a window")
+    player.add_argument("trace", type=str)
+    player.add_argument("--iteration", type=int, default=None, help="Start at this iteration")
+    player.add_argument("--scale", type=float, default=1.0)
+
+    export = commands.add_parser("export", help="Write the frames of one iteration (or all) as PNGs")
+    export.add_argument("trace", type=str)
+    export.add_argument("--iteration", type=int, default=None)
+    export.add_argument("--out", type=str, default="trace_frames")
+
+    convert = commands.add_parser("convert", help="Build a trace from an existing session directory")
+    convert.add_argument("session_dir", type=str)
+    convert.add_argument("--out", type=str, default=None, help="Trace path (default: <session_dir>/replay.gatr)")
+    convert.add_argument("--keyframe_interval", type=int, default=DEFAULT_KEYFRAME_INTERVAL)
+
+    args = parser.parse_args()
+    if args.command == "convert":
+        start = time.perf_counter()
+        path, png_bytes = convert_session(args.session_dir, args.out, args.keyframe_interval)
+        size = os.path.getsize(path)
+        print(f"Wrote {path}: {size / 1024:.1f}KB (PNG screenshots: {png_bytes / 1024:.1f}KB) "
+              f"in {time.perf_counter() - start:.2f}s")
+        return
+
+    reader = TraceReader(args.trace)
+    try:
+        if args.command == "info":
+            keyframes = sum(1 for meta in reader.frames if meta["keyframe"])
+            kinds = {}
+            for meta in reader.events:
+                kinds[meta["kind"]] = kinds.get(meta["kind"], 0) + 1
+            print(f"{args.trace}: {os.path.getsize(args.trace) / 1024:.1f}KB"
+                  f"{'' if reader.complete else ' (not closed, index rebuilt)'}")
+            print(f"Frames: {len(reader.frames)} ({keyframes} keyframes), iterations: {len(reader.iterations())}")
+            print("Events: " + ", ".join(f"{kind} {count}" for kind, count in kinds.items()))
+        elif args.command == "play":
+            play(reader, args.iteration, args.scale)
+        else:
+            os.makedirs(args.out, exist_ok=True)
+            for meta in reader.frames:
+                if args.iteration is not None and meta.get("iteration") != args.iteration:
+                    continue
+                path = os.path.join(args.out, f"frame_{meta['frame']:05d}_iter_{meta.get('iteration')}_{meta.get('label') or 'frame'}.png")
+                reader.frame(meta["frame"]).save(path)
+            print(f"Frames written to {args.out}")
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
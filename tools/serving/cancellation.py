@@ -0,0 +1,152 @@
+"""
+Cooperative cancellation for blocking model requests
+
+The provider SDK calls block for the whole round trip and cannot be
+interrupted from another thread, so a stop request or a fresher plan used to
+wait for every in-flight call to come back. call_cancellable() runs the
+blocking call on a helper thread and returns to the caller as soon as the
+request's CancellationToken is cancelled or its timeout expires; the
+abandoned call finishes in the background and its result is dropped.
+An abandoned call still holds a connection and is still billed, so callers
+that bound concurrency pass `on_done` and release their slot only when the
+call has really returned.
+
+Usage:
+    from tools.serving.cancellation import CancellationToken, RequestCancelled, call_cancellable
+
+    stop_token = CancellationToken()
+    request_token = stop_token.child()       # cancelled with its parent, or on its own
+    try:
+        result = call_cancellable(anthropic_completion, system_prompt, model_name, image, prompt,
+                                  token=request_token, timeout=30)
+    except RequestCancelled:
+        ...
+"""
+
+import threading
+import time
+
+# How often a waiting caller re-checks tokens that wrap an external flag
+POLL_INTERVAL = 0.005
+
+
+class RequestCancelled(Exception):
+    """Raised by call_cancellable() when the request's token was cancelled."""
+
+
+class RequestTimeout(Exception):
+    """Raised by call_cancellable() when the request did not finish within its timeout."""
+
+
+class CancellationToken:
+    """
+    Shared flag that requests check to give up early.
+
+    Args:
+        parent (CancellationToken, optional): Cancelling the parent cancels this token too.
+        event (threading.Event, optional): Existing stop flag to follow, e.g. the
+            one set by a key listener. The token counts as cancelled once it is set.
+    """
+    def __init__(self, parent=None, event=None):
+        self.parent = parent
+        self.external = event
+        self.event = threading.Event()
+        self.reason = None
+
+    def cancel(self, reason="cancelled"):
+        if not self.event.is_set():
+            self.reason = reason
+            self.event.set()
+
+    @property
+    def is_cancelled(self):
+        if self.event.is_set():
+            return True
+        if self.external is not None and self.external.is_set():
+            self.cancel("stop flag set")
+            return True
+        if self.parent is not None and self.parent.is_cancelled:
+            self.cancel(self.parent.reason)
+            return True
+        return False
+
+    def child(self):
+        """New token that is cancelled whenever this one is."""
+        return CancellationToken(parent=self)
+
+    def raise_if_cancelled(self):
+        if self.is_cancelled:
+            raise RequestCancelled(self.reason)
+
+    def wait(self, timeout=None):
+        """
+        Sleep until the token is cancelled or the timeout expires.
+
+        Returns:
+            bool: True if the token was cancelled.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.is_cancelled:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            self.event.wait(POLL_INTERVAL if remaining is None else min(POLL_INTERVAL, remaining))
+        return True
+
+
+def call_cancellable(func, *args, token=None, timeout=None, on_done=None, **kwargs):
+    """
+    Call a blocking function, giving up as soon as `token` is cancelled or
+    `timeout` seconds have passed.
+
+    Args:
+        func (callable): Blocking call, e.g. a provider completion helper.
+        token (CancellationToken, optional): Token to watch.
+        timeout (float, optional): Seconds before giving up with RequestTimeout.
+        on_done (callable, optional): Called exactly once with no arguments when
+            func has returned or raised, which for an abandoned call is after
+            this function has already raised; immediately if func never started.
+
+    Returns:
+        Whatever func returns; exceptions raised by func are re-raised.
+
+    Raises:
+        RequestCancelled: The token was cancelled first.
+        RequestTimeout: The timeout expired first.
+    """
+    if token is not None and token.is_cancelled:
+        if on_done is not None:
+            on_done()
+        raise RequestCancelled(token.reason)
+    if token is None and timeout is None:
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if on_done is not None:
+                on_done()
+
+    outcome = {}
+    finished = threading.Event()
+
+    def target():
+        try:
+            outcome["result"] = func(*args, **kwargs)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            finished.set()
+            if on_done is not None:
+                on_done()
+
+    threading.Thread(target=target, daemon=True, name=f"cancellable-{getattr(func, '__name__', 'call')}").start()
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while not finished.wait(POLL_INTERVAL):
+        if token is not None and token.is_cancelled:
+            raise RequestCancelled(token.reason)
+        if deadline is not None and time.monotonic() >= deadline:
+            raise RequestTimeout(f"no response after {timeout:.1f}s")
+
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
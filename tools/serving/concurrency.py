@@ -0,0 +1,119 @@
+import math
+import threading
+import time
+
+
+class AdaptiveConcurrencyController:
+    """
+    AIMD controller for the number of in-flight model requests.
+
+    To get one decision every `target_interval` seconds while each request takes
+    `latency` seconds, about latency / target_interval requests must be in flight
+    (Little's law). The controller keeps a moving average of the measured latency
+    and error rate and moves its limit towards that number:
+
+    - successful responses grow the limit additively (about +additive_increase
+      per round of requests) while it is below what the latency requires, and
+      shrink it the same way when it is more than one request above it, so
+      threads are not over-provisioned when the model gets faster;
+    - failed requests, or an error rate above error_rate_threshold, cut the limit
+      multiplicatively (at most once per latency window);
+    - with a rate limiter the limit never exceeds what its rate can feed
+      (rate * latency in flight).
+
+    Args:
+        target_interval (float): Desired seconds between decisions.
+        initial_latency (float, optional): Latency estimate to start from.
+        min_limit (int): Lower bound on in-flight requests.
+        max_limit (int): Upper bound on in-flight requests (size the thread pool with this).
+        additive_increase (float): Limit change per round of successful requests.
+        multiplicative_decrease (float): Factor applied to the limit on errors.
+        error_rate_threshold (float): Error rate (0-1) treated as overload.
+        smoothing (float): Weight of the newest sample in the moving averages.
+        rate_limiter (RateLimiter, optional): Limiter the dispatcher draws from.
+    """
+    def __init__(self, target_interval, initial_latency=None, min_limit=1, max_limit=16,
+                 additive_increase=1.0, multiplicative_decrease=0.5, error_rate_threshold=0.2,
+                 smoothing=0.2, rate_limiter=None):
+        self.target_interval = target_interval
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.additive_increase = additive_increase
+        self.multiplicative_decrease = multiplicative_decrease
+        self.error_rate_threshold = error_rate_threshold
+        self.smoothing = smoothing
+        self.rate_limiter = rate_limiter
+
+        self.latency = initial_latency
+        self.error_rate = 0.0
+        self.limit = float(self._clamp(self.required() if initial_latency else self.min_limit))
+        self.last_decrease = 0.0
+        self.samples = 0
+        self.lock = threading.Lock()
+
+    def _clamp(self, value):
+        ceiling = self.max_limit
+        if self.rate_limiter is not None and self.latency:
+            ceiling = min(ceiling, max(self.min_limit, math.ceil(self.rate_limiter.rate * self.latency)))
+        return max(self.min_limit, min(ceiling, value))
+
+    def required(self):
+        """In-flight requests needed to hold the target interval at the current latency."""
+        if not self.latency:
+            return self.min_limit
+        return math.ceil(self.latency / self.target_interval - 1e-6)
+
+    @property
+    def in_flight_limit(self):
+        """Current limit as a whole number of requests."""
+        with self.lock:
+            return int(self.limit)
+
+    def record(self, latency, ok=True):
+        """
+        Feed back one finished request.
+
+        Args:
+            latency (float): Seconds the request took.
+            ok (bool): False for errors, timeouts and rate-limit responses.
+
+        Returns:
+            int: The new in-flight limit.
+        """
+        with self.lock:
+            self.samples += 1
+            self.error_rate += self.smoothing * ((0.0 if ok else 1.0) - self.error_rate)
+            if ok:
+                if self.latency is None:
+                    self.latency = latency
+                else:
+                    self.latency += self.smoothing * (latency - self.latency)
+
+            now = time.monotonic()
+            if not ok or self.error_rate > self.error_rate_threshold:
+                # Multiplicative decrease, once per latency window so one burst of failures
+                # from the same round does not collapse the limit
+                if now - self.last_decrease >= (self.latency or 0.0):
+                    self.limit *= self.multiplicative_decrease
+                    self.last_decrease = now
+            else:
+                step = self.additive_increase / max(self.limit, 1.0)
+                required = self.required()
+                if self.limit < required:
+                    self.limit = min(self.limit + step, required)
+                elif self.limit > required + 1:
+                    self.limit = max(self.limit - step, required)
+
+            self.limit = float(self._clamp(self.limit))
+            return int(self.limit)
+
+    def status(self):
+        """Snapshot of the controller state for logging."""
+        with self.lock:
+            return {
+                "limit": int(self.limit),
+                "required": self.required(),
+                "latency": self.latency,
+                "error_rate": self.error_rate,
+                "samples": self.samples,
+            }
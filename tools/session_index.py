@@ -0,0 +1,487 @@
+"""
+SQLite index over recorded sessions
+
+Sessions end up in claude_tetris_outputs/, gemini_tetris_outputs/,
+game_logs/session_*/thread_* and so on, each with its own log and response
+files. This module ingests their logs into one SQLite database so questions
+like "p95 latency for model X over the last week" are a single query.
+
+Both log formats are understood:
+- JSONL session logs (tools/session_log.py): "session_start" / "thread_start"
+  records carry the model and provider, and "response", "actions",
+  "artifact" and "score" records carry per-iteration data.
+- Older plain-text logs ("[2025-03-08 03:01:08.155] Claude API response
+  received in 4.91s"): iterations, latencies, extracted actions and saved
+  file paths are recovered from the messages.
+
+Ingestion is incremental. Each log file's byte offset is stored, and only
+data appended since the last run is read, so re-running over a large output
+tree is cheap. LiveIndexer does the same on a timer for a session that is
+still running.
+
+Tables:
+    sessions(id, log_path, directory, source, model, provider, started_at, ended_at, iterations)
+    iterations(session_id, iteration, ts, latency, actions, n_actions, score)
+    artifacts(session_id, iteration, kind, path, ts)
+    files(path, session_id, size, offset, state)
+
+Usage:
+    python -m tools.session_index ingest claude_tetris_outputs game_logs --db sessions.db
+    python -m tools.session_index sessions --db sessions.db --model claude --since 7d
+    python -m tools.session_index latency --db sessions.db --model claude-3-7 --since 7d
+    python -m tools.session_index sql --db sessions.db "SELECT model, COUNT(*) FROM sessions GROUP BY model"
+"""
+
+import argparse
+import ast
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+DEFAULT_DB = "sessions.db"
+
+# Log files picked up while walking a directory tree
+LOG_NAMES = {"session_log.jsonl", "session_log.txt", "session_log", "game_log.jsonl", "game_log.txt"}
+THREAD_LOG = re.compile(r"^thread_\d+_log\.(jsonl|txt)$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    log_path TEXT UNIQUE NOT NULL,
+    directory TEXT,
+    source TEXT,
+    model TEXT,
+    provider TEXT,
+    started_at REAL,
+    ended_at REAL,
+    iterations INTEGER DEFAULT 0,
+    ingested_at REAL
+);
+CREATE TABLE IF NOT EXISTS iterations (
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    iteration INTEGER NOT NULL,
+    ts REAL,
+    latency REAL,
+    actions TEXT,
+    n_actions INTEGER,
+    score REAL,
+    PRIMARY KEY (session_id, iteration)
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    iteration INTEGER,
+    kind TEXT,
+    path TEXT,
+    ts REAL,
+    UNIQUE (session_id, path)
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    size INTEGER,
+    offset INTEGER,
+    state TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_model ON sessions(model, started_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_started ON sessions(started_at);
+CREATE INDEX IF NOT EXISTS idx_iterations_ts ON iterations(ts);
+CREATE INDEX IF NOT EXISTS idx_artifacts_session ON artifacts(session_id, kind);
+"""
+
+# Plain-text log patterns
+TEXT_TIMESTAMP = re.compile(r"^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(?:\.\d+)?)\]\s?(.*)$")
+ITERATION = re.compile(r"=== Iteration (\d+) ===")
+LATENCY = re.compile(r"(?:response received in|API Latency:|Request latency:)\s*([\d.]+)s")
+MODEL = re.compile(r"^(?:Model:\s*|.*with model\s+)([\w./:-]+)")
+PROVIDER = re.compile(r"^Provider:\s*(\S+)")
+ACTIONS = re.compile(r"Extracted actions:\s*(\[.*\])")
+SAVED = re.compile(r"^(.*?)\s*saved to:\s*(.+)$")
+
+
+def parse_since(text):
+    """'7d', '12h', '30m' or an ISO date -> epoch seconds."""
+    match = re.match(r"^(\d+(?:\.\d+)?)([dhm])$", text.strip())
+    if match:
+        seconds = float(match.group(1)) * {"d": 86400, "h": 3600, "m": 60}[match.group(2)]
+        return time.time() - seconds
+    return datetime.fromisoformat(text.strip()).timestamp()
+
+
+def artifact_kind(label):
+    label = label.lower()
+    if "response" in label:
+        return "response"
+    if "post-execution" in label or "post_execution" in label:
+        return "post_execution"
+    if "pre-execution" in label or "pre_execution" in label:
+        return "pre_execution"
+    return "screenshot"
+
+
+def find_logs(root):
+    """Session log files under `root` (or `root` itself if it is a file), excluding rotated parts."""
+    if os.path.isfile(root):
+        return [root]
+    found = []
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if name in LOG_NAMES or THREAD_LOG.match(name):
+                found.append(os.path.join(directory, name))
+    return sorted(found)
+
+
+class SessionIndex:
+    """
+    Ingests session logs into SQLite and answers queries.
+
+    Args:
+        db_path (str): SQLite database file (created if missing).
+    """
+    def __init__(self, db_path=DEFAULT_DB):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def close(self):
+        self.conn.close()
+
+    # ---- ingestion ----
+
+    def ingest(self, roots, verbose=True):
+        """
+        Ingest every log file found under `roots`, reading only data appended
+        since the previous run.
+
+        Returns:
+            dict: Files scanned/updated and records read.
+        """
+        totals = {"files": 0, "updated": 0, "records": 0}
+        for root in roots:
+            for path in find_logs(root):
+                totals["files"] += 1
+                records = self.ingest_file(path)
+                if records:
+                    totals["updated"] += 1
+                    totals["records"] += records
+                    if verbose:
+                        print(f"[SessionIndex] {path}: {records} new record(s)")
+        return totals
+
+    def ingest_file(self, path):
+        """Ingest new data from one log file; returns the number of records/lines read."""
+        path = os.path.abspath(path)
+        size = os.path.getsize(path)
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT * FROM files WHERE path = ?", (path,)).fetchone()
+            if row is None:
+                session_id = self._create_session(path)
+                offset, state = 0, {}
+            else:
+                session_id, offset, state = row["session_id"], row["offset"], json.loads(row["state"] or "{}")
+                if size == offset:
+                    return 0
+                if size < offset:
+                    # Rotated or rewritten: earlier data is already indexed, continue from the start
+                    offset = 0
+
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+            # Only complete lines; a partial last line is picked up next time
+            end = data.rfind(b"\n") + 1
+            lines = data[:end].decode("utf-8", errors="replace").splitlines()
+
+            parser = SessionParser(self.conn, session_id, state)
+            if path.endswith(".jsonl"):
+                for line in lines:
+                    parser.record(line)
+            else:
+                for line in lines:
+                    parser.text_line(line)
+            parser.finish()
+
+            self.conn.execute(
+                "INSERT INTO files(path, session_id, size, offset, state) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET size = excluded.size, offset = excluded.offset, state = excluded.state",
+                (path, session_id, size, offset + end, json.dumps(parser.state)))
+        return len(lines)
+
+    def _create_session(self, path):
+        directory = os.path.dirname(path)
+        parts = os.path.normpath(os.path.relpath(path)).split(os.sep)
+        source = parts[0] if len(parts) > 1 and parts[0] != ".." else os.path.basename(directory)
+        cursor = self.conn.execute(
+            "INSERT INTO sessions(log_path, directory, source, ingested_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(log_path) DO UPDATE SET ingested_at = excluded.ingested_at RETURNING id",
+            (path, directory, source, time.time()))
+        return cursor.fetchone()[0]
+
+    # ---- queries ----
+
+    def sessions(self, model=None, since=None, limit=50):
+        query = "SELECT * FROM sessions WHERE 1 = 1"
+        params = []
+        if model:
+            query += " AND model LIKE ?"
+            params.append(f"%{model}%")
+        if since is not None:
+            query += " AND started_at >= ?"
+            params.append(since)
+        query += " ORDER BY started_at DESC LIMIT ?"
+        params.append(limit)
+        return self.conn.execute(query, params).fetchall()
+
+    def latencies(self, model=None, since=None):
+        query = ("SELECT i.latency FROM iterations i JOIN sessions s ON s.id = i.session_id "
+                 "WHERE i.latency IS NOT NULL")
+        params = []
+        if model:
+            query += " AND s.model LIKE ?"
+            params.append(f"%{model}%")
+        if since is not None:
+            query += " AND i.ts >= ?"
+            params.append(since)
+        return [row[0] for row in self.conn.execute(query, params)]
+
+    def latency_stats(self, model=None, since=None):
+        latencies = self.latencies(model, since)
+        if not latencies:
+            return None
+        values = np.array(latencies)
+        return {"count": len(values), "mean": float(values.mean()), "p50": float(np.percentile(values, 50)),
+                "p95": float(np.percentile(values, 95)), "max": float(values.max())}
+
+    def sql(self, query, params=()):
+        return self.conn.execute(query, params).fetchall()
+
+
+class SessionParser:
+    """
+    Turns log records into rows for one session. `state` (current iteration,
+    last timestamp) is persisted between incremental runs.
+    """
+    def __init__(self, conn, session_id, state):
+        self.conn = conn
+        self.session_id = session_id
+        self.state = state
+        self.meta = {}
+        self.first_ts = None
+
+    @property
+    def iteration(self):
+        return self.state.get("iteration", 0)
+
+    def _seen(self, ts):
+        if ts is None:
+            return
+        self.state["ts"] = ts
+        if self.first_ts is None:
+            self.first_ts = ts
+
+    def _iteration(self, iteration, ts, latency=None, actions=None, score=None):
+        actions_json = json.dumps(actions) if actions is not None else None
+        self.conn.execute(
+            "INSERT INTO iterations(session_id, iteration, ts, latency, actions, n_actions, score) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(session_id, iteration) DO UPDATE SET "
+            "ts = COALESCE(iterations.ts, excluded.ts), latency = COALESCE(excluded.latency, iterations.latency), "
+            "actions = COALESCE(excluded.actions, iterations.actions), "
+            "n_actions = COALESCE(excluded.n_actions, iterations.n_actions), "
+            "score = COALESCE(excluded.score, iterations.score)",
+            (self.session_id, iteration, ts, latency, actions_json,
+             len(actions) if actions is not None else None, score))
+
+    def _artifact(self, kind, path, ts, iteration=None):
+        self.conn.execute(
+            "INSERT OR IGNORE INTO artifacts(session_id, iteration, kind, path, ts) VALUES (?, ?, ?, ?, ?)",
+            (self.session_id, iteration if iteration is not None else self.iteration, kind, path.strip(), ts))
+
+    def record(self, line):
+        """One JSONL record."""
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return
+        ts = record.get("ts")
+        self._seen(ts)
+        event = record.get("event")
+        if "iteration" in record and isinstance(record["iteration"], int):
+            self.state["iteration"] = record["iteration"]
+
+        if event in ("session_start", "thread_start", "agent_start"):
+            self.meta["model"] = record.get("model") or self.meta.get("model")
+            self.meta["provider"] = record.get("provider") or record.get("api_provider") or self.meta.get("provider")
+            if record.get("iterator"):
+                self.meta["source"] = record["iterator"]
+        elif event == "response":
+            self._iteration(self.iteration, ts, latency=record.get("latency"))
+            if record.get("model") and not self.meta.get("model"):
+                self.meta["model"] = record["model"]
+            if record.get("response_path"):
+                self._artifact("response", record["response_path"], ts)
+        elif event == "actions":
+            self._iteration(self.iteration, ts, actions=record.get("actions"))
+        elif event == "score":
+            self._iteration(self.iteration, ts, score=record.get("score"))
+        elif event == "artifact":
+            self._artifact(record.get("kind", "file"), record.get("path", ""), ts, record.get("iteration"))
+        elif event == "message":
+            self.message(str(record.get("message", "")), ts)
+
+    def text_line(self, line):
+        """One line of a plain-text log; continuation lines inherit the last timestamp."""
+        match = TEXT_TIMESTAMP.match(line)
+        if match:
+            try:
+                ts = datetime.strptime(match.group(1)[:23], "%Y-%m-%d %H:%M:%S.%f").timestamp()
+            except ValueError:
+                ts = datetime.strptime(match.group(1)[:19], "%Y-%m-%d %H:%M:%S").timestamp()
+            self._seen(ts)
+            line = match.group(2)
+        self.message(line, self.state.get("ts"))
+
+    def message(self, text, ts):
+        """Recover structured data from a free-text message."""
+        for line in text.splitlines() or [text]:
+            match = ITERATION.search(line)
+            if match:
+                self.state["iteration"] = int(match.group(1))
+                self._iteration(self.iteration, ts)
+                continue
+            match = LATENCY.search(line)
+            if match:
+                self._iteration(self.iteration, ts, latency=float(match.group(1)))
+                continue
+            match = ACTIONS.search(line)
+            if match:
+                try:
+                    self._iteration(self.iteration, ts, actions=ast.literal_eval(match.group(1)))
+                except (ValueError, SyntaxError):
+                    pass
+                continue
+            match = SAVED.search(line)
+            if match:
+                self._artifact(artifact_kind(match.group(1)), match.group(2), ts)
+                continue
+            match = MODEL.match(line.strip())
+            if match and not self.meta.get("model"):
+                self.meta["model"] = match.group(1)
+                continue
+            match = PROVIDER.match(line.strip())
+            if match and not self.meta.get("provider"):
+                self.meta["provider"] = match.group(1)
+
+    def finish(self):
+        """Update the session row with metadata, time range and iteration count."""
+        self.conn.execute(
+            "UPDATE sessions SET model = COALESCE(model, ?), provider = COALESCE(provider, ?), "
+            "source = COALESCE(?, source), started_at = COALESCE(started_at, ?), "
+            "ended_at = COALESCE(?, ended_at), ingested_at = ?, "
+            "iterations = (SELECT COUNT(*) FROM iterations WHERE session_id = ?) WHERE id = ?",
+            (self.meta.get("model"), self.meta.get("provider"), self.meta.get("source"), self.first_ts,
+             self.state.get("ts"), time.time(), self.session_id, self.session_id))
+
+
+class LiveIndexer:
+    """
+    Keeps the index up to date for a running session by ingesting its logs
+    every `interval` seconds (and once more on stop).
+
+    Args:
+        db_path (str): SQLite database file.
+        root (str): Session directory (or log file) to follow.
+        interval (float): Seconds between ingestion passes.
+    """
+    def __init__(self, db_path, root, interval=5.0):
+        self.index = SessionIndex(db_path)
+        self.root = root
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True, name="LiveIndexer")
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self._ingest()
+
+    def _ingest(self):
+        try:
+            self.index.ingest([self.root], verbose=False)
+        except (sqlite3.Error, OSError) as e:
+            print(f"[LiveIndexer] Error indexing {self.root}: {e}")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join(self.interval + 5)
+        self._ingest()
+        self.index.close()
+
+
+def print_rows(rows):
+    if not rows:
+        print("(no rows)")
+        return
+    columns = rows[0].keys()
+    print("\t".join(columns))
+    for row in rows:
+        print("\t".join("" if row[column] is None else str(row[column]) for column in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index recorded sessions into SQLite and query them")
+    parser.add_argument("--db", type=str, default=DEFAULT_DB, help=f"SQLite database (default: {DEFAULT_DB})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Index new or grown session logs")
+    ingest.add_argument("roots", nargs="*", default=["."], help="Directories or log files to scan")
+
+    sessions = commands.add_parser("sessions", help="List sessions")
+    latency = commands.add_parser("latency", help="Model latency statistics")
+    for command in (sessions, latency):
+        command.add_argument("--model", type=str, default=None, help="Substring of the model name")
+        command.add_argument("--since", type=str, default=None, help="e.g. 7d, 12h or 2025-03-01")
+    sessions.add_argument("--limit", type=int, default=50)
+
+    sql = commands.add_parser("sql", help="Run a SQL query")
+    sql.add_argument("query", type=str)
+
+    args = parser.parse_args()
+    index = SessionIndex(args.db)
+    try:
+        if args.command == "ingest":
+            start = time.perf_counter()
+            totals = index.ingest(args.roots)
+            print(f"[SessionIndex] Scanned {totals['files']} log file(s), updated {totals['updated']}, "
+                  f"read {totals['records']} record(s) in {time.perf_counter() - start:.2f}s")
+        elif args.command == "sessions":
+            since = parse_since(args.since) if args.since else None
+            print_rows(index.sessions(args.model, since, args.limit))
+        elif args.command == "latency":
+            since = parse_since(args.since) if args.since else None
+            stats = index.latency_stats(args.model, since)
+            if stats is None:
+                print("No latencies recorded for this selection.")
+            else:
+                print(f"count {stats['count']}, mean {stats['mean']:.2f}s, p50 {stats['p50']:.2f}s, "
+                      f"p95 {stats['p95']:.2f}s, max {stats['max']:.2f}s")
+        else:
+            print_rows(index.sql(args.query))
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Buffered structured session log shared across threads
+
+Every log call used to open the log file, append a line and close it again,
+from several threads at once. A SessionLog is one sink per file: log() only
+appends a small dict to an in-memory buffer under a lock, and a background
+thread serializes the records as JSON lines and writes them in batches every
+flush_interval seconds (or as soon as the buffer fills). Files are rotated by
+size (session_log.jsonl -> session_log.jsonl.1 -> ...). How often and how long
+callers wait for the buffer lock is measured and shown by report().
+
+Record format, one JSON object per line:
+    {"ts": 1718000000.123, "thread": "MainThread", "event": "message", "message": "..."}
+
+Usage:
+    from tools.session_log import get_session_log
+
+    log = get_session_log("game_logs/session_x/session_log.jsonl")
+    log.log("message", message="Executing code...")
+    log.log("response", iteration=3, latency=2.1, text=full_response)
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+DEFAULT_BUFFER_SIZE = 1000
+
+
+class SessionLog:
+    """
+    Thread-safe buffered JSONL writer.
+
+    Args:
+        path (str): JSONL file to append to.
+        flush_interval (float): Seconds between background flushes.
+        max_bytes (int): Rotate when the file grows beyond this size; 0 disables rotation.
+        backup_count (int): Rotated files kept (path.1 is the newest).
+        buffer_size (int): Flush early once this many records are buffered.
+    """
+    def __init__(self, path, flush_interval=DEFAULT_FLUSH_INTERVAL, max_bytes=DEFAULT_MAX_BYTES,
+                 backup_count=DEFAULT_BACKUP_COUNT, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.buffer_size = buffer_size
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.Lock()        # guards the buffer (hot path)
+        self.write_lock = threading.Lock()  # serializes file writes and rotation
+        self.buffer = []
+        self.wakeup = threading.Event()
+        self.closed = False
+
+        self.stats = {"records": 0, "flushes": 0, "bytes": 0, "rotations": 0, "contended": 0, "errors": 0}
+        self.lock_waits = []
+
+        self.thread = threading.Thread(target=self._run, daemon=True, name=f"SessionLog-{os.path.basename(path)}")
+        self.thread.start()
+
+    def log(self, event="message", **fields):
+        """Buffer one record; serialization and I/O happen on the flush thread."""
+        record = {"ts": time.time(), "thread": threading.current_thread().name, "event": event}
+        record.update(fields)
+        if not self.lock.acquire(blocking=False):
+            start = time.perf_counter()
+            self.lock.acquire()
+            self.lock_waits.append(time.perf_counter() - start)
+            self.stats["contended"] += 1
+        try:
+            self.buffer.append(record)
+            self.stats["records"] += 1
+            full = len(self.buffer) >= self.buffer_size
+        finally:
+            self.lock.release()
+        if full:
+            self.wakeup.set()
+
+    def _run(self):
+        while not self.closed:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Write everything buffered so far."""
+        with self.lock:
+            records, self.buffer = self.buffer, []
+        if not records:
+            return
+        lines = []
+        for record in records:
+            try:
+                lines.append(json.dumps(record, ensure_ascii=False, default=str))
+            except (TypeError, ValueError) as e:
+                self.stats["errors"] += 1
+                lines.append(json.dumps({"ts": record.get("ts"), "event": "log_error", "error": str(e)}))
+        data = ("\n".join(lines) + "\n").encode("utf-8", errors="replace")
+        with self.write_lock:
+            try:
+                if self.max_bytes and os.path.exists(self.path) and \
+                        os.path.getsize(self.path) + len(data) > self.max_bytes:
+                    self._rotate()
+                with open(self.path, "ab") as f:
+                    f.write(data)
+                self.stats["flushes"] += 1
+                self.stats["bytes"] += len(data)
+            except OSError as e:
+                self.stats["errors"] += 1
+                print(f"[SessionLog] Error writing {self.path}: {e}")
+
+    def _rotate(self):
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            older = f"{self.path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+        self.stats["rotations"] += 1
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.wakeup.set()
+        self.thread.join(2.0)
+        self.flush()
+
+    def report(self):
+        print(f"[SessionLog] {self.path}: " + ", ".join(f"{key}: {value}" for key, value in self.stats.items()))
+        if self.lock_waits:
+            waits_us = np.array(self.lock_waits) * 1e6
+            print(f"[SessionLog] Lock contention: {len(waits_us)} of {self.stats['records']} calls waited, "
+                  f"mean {waits_us.mean():.1f}us, p95 {np.percentile(waits_us, 95):.1f}us, max {waits_us.max():.1f}us")
+
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def get_session_log(path, **kwargs):
+    """Return the process-wide SessionLog for `path`, creating it on first use."""
+    key = os.path.abspath(path)
+    with _logs_lock:
+        log = _logs.get(key)
+        if log is None or log.closed:
+            log = _logs[key] = SessionLog(path, **kwargs)
+        return log
+
+
+def close_all(report=False):
+    """Flush and close every shared SessionLog (also runs at interpreter exit)."""
+    with _logs_lock:
+        logs = list(_logs.values())
+    for log in logs:
+        log.close()
+        if report:
+            log.report()
+
+
+atexit.register(close_all)
@@ -0,0 +1,399 @@
+"""
+Process-pool runner for many parallel headless game sessions
+
+Spreads N sessions of a headless environment (games/tetris/tetris_env.py,
+games/game_2048/game_2048_env.py) across a process pool. Every worker process
+owns its own environment and agent; model calls from all workers go through
+one ProviderCoordinator living in a manager process, which owns the rate
+limiter and bounds how many provider requests are open at once, so N sessions
+share a single API budget instead of each hammering the provider. Progress and
+per-session results stream back to the parent through a queue and are
+aggregated into a summary.
+
+Usage:
+    # 64 random-policy 2048 games on all cores
+    python -m tools.session_runner --game 2048 --sessions 64
+
+    # 8 model-driven Tetris sessions sharing 4 connections and 2 requests/s
+    python -m tools.session_runner --game tetris --sessions 8 --agent llm \\
+        --api_provider anthropic --model_name claude-3-7-sonnet-20250219 \\
+        --pool_size 4 --rate_limit 2 --max_steps 200 --output results.json
+"""
+
+import argparse
+import base64
+import concurrent.futures
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from io import BytesIO
+from multiprocessing.managers import BaseManager
+
+import numpy as np
+from PIL import Image
+
+from tools.serving.rate_limiter import RateLimiter
+
+GAMES = ("tetris", "2048")
+AGENTS = ("random", "llm")
+
+SYSTEM_PROMPT = "You are an expert game-playing agent. Answer only in the requested format."
+
+GAME_PROMPTS = {
+    "2048": (
+        "This is a 2048 board. Choose the best move: 'up', 'down', 'left' or 'right'. "
+        "Keep the highest tile in a corner and prefer moves that merge tiles.\n"
+        'Respond in the strict format: move: "<direction>"'
+    ),
+    "tetris": (
+        "This is a Tetris board. Choose the next action for the falling piece: "
+        "'left', 'right', 'down', 'rotate' or 'drop'. Prefer placements that clear lines "
+        "and keep the stack low and flat.\n"
+        'Respond in the strict format: move: "<action>"'
+    ),
+}
+
+
+def make_env(game, obs_type="symbolic", render_mode=None, max_steps=0):
+    """Create the headless environment for `game`."""
+    if game == "tetris":
+        from games.tetris.tetris_env import TetrisEnv
+        return TetrisEnv(obs_type=obs_type, render_mode=render_mode, max_steps=max_steps)
+    if game == "2048":
+        from games.game_2048.game_2048_env import Game2048Env
+        return Game2048Env(obs_type=obs_type, render_mode=render_mode, max_steps=max_steps)
+    raise ValueError(f"Unsupported game: {game} (expected one of {', '.join(GAMES)})")
+
+
+def action_names(game):
+    if game == "tetris":
+        from games.tetris.tetris_env import ACTIONS
+        return list(ACTIONS)
+    from games.game_2048.game_2048_env import ACTIONS
+    return [direction for direction, _ in ACTIONS]
+
+
+class ProviderCoordinator:
+    """
+    Single point through which every session process calls the model.
+
+    Lives in the manager process; each proxy connection is served by its own
+    thread there, so calls from different sessions run concurrently up to
+    `pool_size`, and each call first draws a token from the shared rate limiter.
+
+    Args:
+        pool_size (int): Maximum provider requests open at once.
+        rate_limit (float): Requests started per second across all sessions (0 disables).
+    """
+    def __init__(self, pool_size=4, rate_limit=0.0):
+        self.slots = threading.BoundedSemaphore(max(1, pool_size))
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit > 0 else None
+        self.lock = threading.Lock()
+        self.counts = {"calls": 0, "errors": 0}
+        self.latencies = []
+
+    def complete(self, api_provider, model_name, system_prompt, base64_image, prompt):
+        """
+        Call the provider's completion helper.
+
+        Returns:
+            tuple: (full_response, latency). full_response is "error" if the call failed.
+        """
+        from tools.serving.api_providers import anthropic_completion, openai_completion, gemini_completion
+        completions = {"anthropic": anthropic_completion, "openai": openai_completion, "gemini": gemini_completion}
+        if api_provider not in completions:
+            raise NotImplementedError(f"API provider '{api_provider}' is not supported.")
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        with self.slots:
+            start_time = time.time()
+            generated_code_str, full_response = completions[api_provider](
+                system_prompt, model_name, base64_image, prompt)
+            latency = time.time() - start_time
+
+        with self.lock:
+            self.counts["calls"] += 1
+            self.latencies.append(latency)
+            if generated_code_str == "error":
+                self.counts["errors"] += 1
+                full_response = "error"
+        return full_response, latency
+
+    def stats(self):
+        with self.lock:
+            latencies = self.latencies or [0.0]
+            return dict(self.counts, mean_latency=float(np.mean(latencies)),
+                        p95_latency=float(np.percentile(latencies, 95)))
+
+
+class CoordinatorManager(BaseManager):
+    pass
+
+
+CoordinatorManager.register("ProviderCoordinator", ProviderCoordinator)
+CoordinatorManager.register("Queue", queue.Queue)
+
+
+class RandomAgent:
+    """Uniformly random actions, for throughput baselines."""
+    def __init__(self, game, seed=None):
+        self.rng = random.Random(seed)
+        self.num_actions = len(action_names(game))
+
+    def act(self, env, obs):
+        return self.rng.randrange(self.num_actions)
+
+
+class LLMAgent:
+    """
+    Renders the board, asks the model for a move through the coordinator and
+    maps the answer back to an action index. Unparseable answers fall back
+    to a random action.
+    """
+    def __init__(self, game, coordinator, api_provider, model_name, seed=None):
+        self.game = game
+        self.coordinator = coordinator
+        self.api_provider = api_provider
+        self.model_name = model_name
+        self.names = action_names(game)
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.fallbacks = 0
+        self.latency = 0.0
+
+    def act(self, env, obs):
+        buffered = BytesIO()
+        Image.fromarray(env.render()).save(buffered, format="PNG")
+        base64_image = base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+        response, latency = self.coordinator.complete(self.api_provider, self.model_name, SYSTEM_PROMPT,
+                                                      base64_image, GAME_PROMPTS[self.game])
+        self.calls += 1
+        self.latency += latency
+
+        match = re.search(r'move:\s*"?(' + "|".join(self.names) + r')"?', response, re.IGNORECASE)
+        if match:
+            return self.names.index(match.group(1).lower())
+        self.fallbacks += 1
+        return self.rng.randrange(len(self.names))
+
+
+def run_session(session_id, game, agent_type, seed, max_steps, coordinator=None, results=None,
+                api_provider=None, model_name=None, progress_every=0):
+    """
+    Play one session to the end (or max_steps) in the current process.
+
+    Args:
+        session_id (int): Index of the session.
+        game (str): "tetris" or "2048".
+        agent_type (str): "random" or "llm".
+        seed (int): Seed for the environment and agent.
+        max_steps (int): Truncate after this many steps (0 = play until game over).
+        coordinator: ProviderCoordinator proxy (required for "llm").
+        results: Queue that progress and the final result are streamed to.
+        progress_every (int): Send a progress message every N steps (0 disables).
+
+    Returns:
+        dict: Session result.
+    """
+    env = make_env(game, render_mode="rgb_array" if agent_type == "llm" else None, max_steps=max_steps)
+    if agent_type == "llm":
+        agent = LLMAgent(game, coordinator, api_provider, model_name, seed=seed)
+    else:
+        agent = RandomAgent(game, seed=seed)
+
+    start_time = time.time()
+    obs, info = env.reset(seed=seed)
+    steps = 0
+    total_reward = 0.0
+    terminated = truncated = False
+    while not (terminated or truncated):
+        obs, reward, terminated, truncated, info = env.step(agent.act(env, obs))
+        total_reward += reward
+        steps += 1
+        if results is not None and progress_every and steps % progress_every == 0:
+            results.put({"type": "progress", "session": session_id, "steps": steps, "score": info["score"]})
+    elapsed = time.time() - start_time
+    env.close()
+
+    result = {
+        "type": "result",
+        "session": session_id,
+        "game": game,
+        "agent": agent_type,
+        "seed": seed,
+        "pid": os.getpid(),
+        "steps": steps,
+        "score": info["score"],
+        "reward": total_reward,
+        "terminated": bool(terminated),
+        "elapsed": elapsed,
+        "steps_per_sec": steps / max(elapsed, 1e-9),
+    }
+    if game == "2048":
+        result["max_tile"] = info["max_tile"]
+    else:
+        result["lines_cleared"] = info["lines_cleared"]
+    if agent_type == "llm":
+        result["model_calls"] = agent.calls
+        result["fallbacks"] = agent.fallbacks
+        result["mean_latency"] = agent.latency / max(agent.calls, 1)
+    if results is not None:
+        results.put(result)
+    return result
+
+
+class SessionRunner:
+    """
+    Runs `num_sessions` headless sessions across a process pool and aggregates the results.
+
+    Args:
+        game (str): "tetris" or "2048".
+        num_sessions (int): Number of sessions to play.
+        processes (int, optional): Worker processes. Defaults to the number of cores.
+        agent (str): "random" or "llm".
+        max_steps (int): Truncate every session after this many steps (0 = until game over).
+        seed (int): Session i is seeded with seed + i.
+        api_provider (str): Provider for the "llm" agent.
+        model_name (str): Model for the "llm" agent.
+        pool_size (int): Concurrent provider requests across all sessions.
+        rate_limit (float): Provider requests per second across all sessions (0 disables).
+        progress_every (int): Steps between progress messages from each session (0 disables).
+    """
+    def __init__(self, game, num_sessions, processes=None, agent="random", max_steps=0, seed=0,
+                 api_provider="anthropic", model_name=None, pool_size=4, rate_limit=0.0, progress_every=0):
+        if game not in GAMES:
+            raise ValueError(f"Unsupported game: {game} (expected one of {', '.join(GAMES)})")
+        if agent not in AGENTS:
+            raise ValueError(f"Unsupported agent: {agent} (expected one of {', '.join(AGENTS)})")
+        self.game = game
+        self.num_sessions = num_sessions
+        self.processes = processes or os.cpu_count() or 1
+        self.agent = agent
+        self.max_steps = max_steps
+        self.seed = seed
+        self.api_provider = api_provider
+        self.model_name = model_name
+        self.pool_size = pool_size
+        self.rate_limit = rate_limit
+        self.progress_every = progress_every
+        self.results = []
+        self.coordinator_stats = None
+        self.elapsed = 0.0
+
+    def run(self):
+        """
+        Play all sessions and return the per-session results, sorted by session id.
+        """
+        with CoordinatorManager() as manager:
+            results_queue = manager.Queue()
+            coordinator = None
+            if self.agent == "llm":
+                coordinator = manager.ProviderCoordinator(self.pool_size, self.rate_limit)
+            self._run_pool(coordinator, results_queue)
+            if coordinator is not None:
+                self.coordinator_stats = coordinator.stats()
+        self.results.sort(key=lambda result: result["session"])
+        return self.results
+
+    def _run_pool(self, coordinator, results_queue):
+        start_time = time.time()
+        print(f"[SessionRunner] {self.num_sessions} {self.game} sessions ({self.agent} agent) "
+              f"on {self.processes} processes")
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.processes) as pool:
+            futures = [
+                pool.submit(run_session, i, self.game, self.agent, self.seed + i, self.max_steps,
+                            coordinator, results_queue, self.api_provider, self.model_name, self.progress_every)
+                for i in range(self.num_sessions)
+            ]
+            pending = set(futures)
+            while pending or not results_queue.empty():
+                try:
+                    self._handle(results_queue.get(timeout=0.2))
+                except queue.Empty:
+                    pass
+                for future in [f for f in pending if f.done()]:
+                    pending.discard(future)
+                    if future.exception() is not None:
+                        print(f"[SessionRunner] Session failed: {future.exception()}")
+        self.elapsed = time.time() - start_time
+
+    def _handle(self, message):
+        if message["type"] == "progress":
+            print(f"[SessionRunner] Session {message['session']}: step {message['steps']}, "
+                  f"score {message['score']}")
+            return
+        self.results.append(message)
+        print(f"[SessionRunner] Session {message['session']} finished ({len(self.results)}/{self.num_sessions}): "
+              f"score {message['score']}, {message['steps']} steps, {message['steps_per_sec']:.0f} steps/s")
+
+    def summary(self):
+        """Aggregate statistics over all finished sessions."""
+        if not self.results:
+            return {}
+        scores = np.array([result["score"] for result in self.results])
+        total_steps = sum(result["steps"] for result in self.results)
+        summary = {
+            "game": self.game,
+            "agent": self.agent,
+            "sessions": len(self.results),
+            "processes": self.processes,
+            "elapsed": self.elapsed,
+            "total_steps": total_steps,
+            "steps_per_sec": total_steps / max(self.elapsed, 1e-9),
+            "score_mean": float(scores.mean()),
+            "score_median": float(np.median(scores)),
+            "score_max": int(scores.max()),
+            "score_min": int(scores.min()),
+        }
+        if self.game == "2048":
+            summary["max_tile"] = max(result["max_tile"] for result in self.results)
+        else:
+            summary["lines_cleared_mean"] = float(np.mean([result["lines_cleared"] for result in self.results]))
+        if self.coordinator_stats is not None:
+            summary["provider"] = self.coordinator_stats
+        return summary
+
+    def report(self):
+        summary = self.summary()
+        print("\n[SessionRunner] ---- Summary ----")
+        for key, value in summary.items():
+            print(f"[SessionRunner] {key}: {value:.2f}" if isinstance(value, float) else f"[SessionRunner] {key}: {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many headless game sessions in parallel and aggregate results")
+    parser.add_argument("--game", type=str, default="2048", choices=GAMES)
+    parser.add_argument("--sessions", type=int, default=16, help="Number of sessions to play")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--agent", type=str, default="random", choices=AGENTS)
+    parser.add_argument("--max_steps", type=int, default=0, help="Truncate sessions after N steps (0 = until game over)")
+    parser.add_argument("--seed", type=int, default=0, help="Session i uses seed + i")
+    parser.add_argument("--api_provider", type=str, default="anthropic", help="API provider for the llm agent")
+    parser.add_argument("--model_name", type=str, default="claude-3-7-sonnet-20250219", help="Model for the llm agent")
+    parser.add_argument("--pool_size", type=int, default=4, help="Concurrent provider requests across all sessions")
+    parser.add_argument("--rate_limit", type=float, default=0.0, help="Provider requests per second (0 disables)")
+    parser.add_argument("--progress_every", type=int, default=0, help="Progress message every N steps (0 disables)")
+    parser.add_argument("--output", type=str, default=None, help="Write per-session results and summary to this JSON file")
+    args = parser.parse_args()
+
+    runner = SessionRunner(args.game, args.sessions, processes=args.processes, agent=args.agent,
+                           max_steps=args.max_steps, seed=args.seed, api_provider=args.api_provider,
+                           model_name=args.model_name, pool_size=args.pool_size, rate_limit=args.rate_limit,
+                           progress_every=args.progress_every)
+    runner.run()
+    runner.report()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"summary": runner.summary(), "sessions": runner.results}, f, indent=2)
+        print(f"[SessionRunner] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
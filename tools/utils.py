@@ -9,6 +9,8 @@ import re
 from datetime import datetime
 from PIL import Image, ImageDraw
 
+from tools.session_log import get_session_log
+
 # 确保这些函数可以被其他模块导入
 __all__ = ['encode_image', 'log_output', 'extract_python_code', 'extract_code']
 
@@ -19,16 +21,13 @@ def encode_image(image_path):
     with open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode("utf-8")
 
-def log_output(thread_id, log_text, game):
+def log_output(thread_id, log_text, game="default"):
     """
-    Logs output to `cache/thread_{thread_id}/output.log`
+    Appends a record to `cache/{game}/thread_{thread_id}/output.jsonl` through
+    the shared buffered session log (tools/session_log.py).
     """
-    thread_folder = f"cache/{game}/thread_{thread_id}"
-    os.makedirs(thread_folder, exist_ok=True)
-    
-    log_path = os.path.join(thread_folder, "output.log")
-    with open(log_path, "w", encoding="utf-8") as log_file:
-        log_file.write(log_text + "\n\n")
+    log_path = os.path.join(f"cache/{game}/thread_{thread_id}", "output.jsonl")
+    get_session_log(log_path).log("output", thread_id=thread_id, game=game, text=log_text)
 
 def extract_python_code(content):
     """